@@ -0,0 +1,397 @@
+"""Benchmarks for the Docker credential helpers, driven by a fake ``bw``.
+
+Every helper command runs in a fresh process, exactly as Docker starts it,
+with the scripted fake Bitwarden CLI from ``tests/fake_bw.py`` first on PATH.
+For each vault size, helper and command the harness measures:
+
+    wall_seconds: Wall time of the helper process.
+    peak_rss_mb: Peak resident memory of the helper process.
+    bw_calls: Number of bw subprocesses started.
+
+Every command runs twice against the same vault and cache directories: the
+"cold" run starts with empty caches, the "warm" run sees whatever the cold run
+left behind, like the second ``docker pull`` of a session.
+
+Results are printed as JSON and checked against ``thresholds.json``:
+
+    bw_calls: Maximum bw subprocesses per scenario. Counts do not depend on
+        the machine, so these catch e.g. an extra ``bw list items``.
+    wall_seconds: Maximum wall time per vault size, not counting the
+        configured startup delay of each bw call.
+    peak_rss_mb: Maximum peak memory of any scenario.
+
+The exit status is 1 if any threshold is exceeded.
+
+Usage:
+    uv run python benchmarks/docker_credential.py
+    uv run python benchmarks/docker_credential.py --sizes 10 1000 --delay 0.2
+    uv run python benchmarks/docker_credential.py --output results.json
+"""
+
+import argparse
+import json
+import os
+import shlex
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import Sequence
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any
+
+_ROOT = Path(__file__).resolve().parents[1]
+_FAKE_BW = _ROOT / "tests" / "fake_bw.py"
+_THRESHOLDS = Path(__file__).with_name("thresholds.json")
+
+_DEFAULT_SIZES = (10, 1000, 10000)
+_HELPER_CODE = "from cli import main; main()"
+
+_ITEM_NAME = "docker-credentials"
+_DOCKER_HUB_URL = "https://index.docker.io/v1/"
+_STORED_URL = "https://ghcr.io"
+_PHASES = ("cold", "warm")
+
+# Helper, command and the stdin of each phase
+_SCENARIOS: tuple[tuple[str, str, dict[str, str]], ...] = (
+    (
+        "docker-credential-bw",
+        "get",
+        {"cold": _STORED_URL, "warm": _STORED_URL},
+    ),
+    ("docker-credential-bw", "list", {"cold": "", "warm": ""}),
+    (
+        "docker-credential-bw",
+        "store",
+        {
+            phase: json.dumps(
+                {"ServerURL": _STORED_URL, "Username": "u", "Secret": phase}
+            )
+            for phase in _PHASES
+        },
+    ),
+    (
+        "docker-credential-bw",
+        "erase",
+        {phase: f"https://{phase}.example.com" for phase in _PHASES},
+    ),
+    (
+        "docker-credential-bw-docker",
+        "get",
+        {"cold": _DOCKER_HUB_URL, "warm": _DOCKER_HUB_URL},
+    ),
+    ("docker-credential-bw-docker", "list", {"cold": "", "warm": ""}),
+    (
+        "docker-credential-bw-docker",
+        "store",
+        {
+            phase: json.dumps(
+                {"ServerURL": _DOCKER_HUB_URL, "Username": "u", "Secret": "p"}
+            )
+            for phase in _PHASES
+        },
+    ),
+    (
+        "docker-credential-bw-docker",
+        "erase",
+        {"cold": _DOCKER_HUB_URL, "warm": _DOCKER_HUB_URL},
+    ),
+)
+
+
+@dataclass
+class Result:
+    """Measurements of one helper invocation."""
+
+    size: int
+    helper: str
+    command: str
+    phase: str
+    exit_code: int
+    wall_seconds: float
+    peak_rss_mb: float
+    bw_calls: int
+    bw_commands: list[str]
+
+    @property
+    def scenario(self) -> str:
+        """Name of the scenario, as used in the thresholds."""
+        return f"{self.helper} {self.command} {self.phase}"
+
+
+def make_vault(size: int) -> list[dict[str, Any]]:
+    """
+    Build a vault of the given number of items.
+
+    The credential note comes last, so finding it by listing reads every item.
+    """
+    credentials = {
+        url: {"Username": "u", "Secret": "s"}
+        for url in (
+            _STORED_URL,
+            "https://cold.example.com",
+            "https://warm.example.com",
+        )
+    }
+    items: list[dict[str, Any]] = [
+        {
+            "id": "dockerhub",
+            "name": "DockerHub",
+            "type": 1,
+            "login": {"username": "u", "password": "p", "uris": []},
+        }
+    ]
+    items += [
+        {
+            "id": f"login-{n}",
+            "name": f"Login {n}",
+            "type": 1,
+            "notes": None,
+            "login": {
+                "username": f"user{n}",
+                "password": f"password-{n}",
+                "uris": [{"uri": f"https://host{n}.example.com/login"}],
+            },
+        }
+        for n in range(max(0, size - 2))
+    ]
+    items.append(
+        {
+            "id": "credential-note",
+            "name": _ITEM_NAME,
+            "type": 2,
+            "notes": json.dumps(credentials),
+            "secureNote": {"type": 0},
+        }
+    )
+    return items
+
+
+def _install_fake_bw(bin_dir: Path) -> None:
+    bin_dir.mkdir()
+    script = bin_dir / "bw"
+    script.write_text(
+        f"#!/bin/sh\nexec {shlex.quote(sys.executable)} "
+        f'{shlex.quote(str(_FAKE_BW))} "$@"\n'
+    )
+    script.chmod(0o755)
+
+
+def _max_rss_mb(max_rss: int) -> float:
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round(max_rss / scale, 1)
+
+
+def _run_helper(
+    env: dict[str, str], work_dir: Path, helper: str, command: str, stdin: str
+) -> tuple[int, float, float]:
+    """
+    Run one helper command in a new process.
+
+    Returns:
+        Exit code, wall time in seconds and peak RSS in MB.
+    """
+    stdin_path = work_dir / "stdin"
+    stdin_path.write_text(stdin)
+    with (
+        open(stdin_path) as stdin_file,
+        open(work_dir / "stdout", "w") as stdout_file,
+        open(work_dir / "stderr", "w") as stderr_file,
+    ):
+        start = time.perf_counter()
+        proc = subprocess.Popen(
+            [sys.executable, "-c", _HELPER_CODE, helper, command],
+            stdin=stdin_file,
+            stdout=stdout_file,
+            stderr=stderr_file,
+            env=env,
+            cwd=_ROOT,
+        )
+        # wait4 reports the resources of this child alone
+        _, status, usage = os.wait4(proc.pid, 0)
+        wall = time.perf_counter() - start
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    return proc.returncode, wall, _max_rss_mb(usage.ru_maxrss)
+
+
+def run_scenario(
+    size: int, helper: str, command: str, stdins: dict[str, str], delay: float
+) -> list[Result]:
+    """
+    Run one command of one helper cold and warm against a fresh vault.
+
+    Args:
+        size: Number of items in the vault.
+        helper: Name of the helper subcommand.
+        command: Credential helper command.
+        stdins: Input of the command per phase.
+        delay: Startup delay of every bw call, in seconds.
+
+    Returns:
+        The measurements of both phases.
+    """
+    with tempfile.TemporaryDirectory(prefix="bench-docker-credential-") as tmp:
+        work_dir = Path(tmp)
+        _install_fake_bw(work_dir / "bin")
+        state_path = work_dir / "fake-bw.json"
+        state_path.write_text(json.dumps({"items": make_vault(size), "calls": []}))
+
+        env = {
+            key: value
+            for key, value in os.environ.items()
+            if not key.startswith(("BW_", "DOCKER_CREDENTIAL_BW_"))
+        }
+        env |= {
+            "PATH": f"{work_dir / 'bin'}{os.pathsep}{env.get('PATH', '')}",
+            "PYTHONPATH": str(_ROOT / "src"),
+            "FAKE_BW_STATE": str(state_path),
+            "FAKE_BW_DELAY": str(delay),
+            "BW_SESSION": "benchmark-session",
+            "XDG_CACHE_HOME": str(work_dir / "cache"),
+            "XDG_DATA_HOME": str(work_dir / "data"),
+        }
+
+        results = []
+        for phase in _PHASES:
+            state = json.loads(state_path.read_text())
+            state["calls"] = []
+            state_path.write_text(json.dumps(state))
+
+            exit_code, wall, rss = _run_helper(
+                env, work_dir, helper, command, stdins[phase]
+            )
+            calls = json.loads(state_path.read_text())["calls"]
+            results.append(
+                Result(
+                    size=size,
+                    helper=helper,
+                    command=command,
+                    phase=phase,
+                    exit_code=exit_code,
+                    wall_seconds=round(wall, 3),
+                    peak_rss_mb=rss,
+                    bw_calls=len(calls),
+                    bw_commands=[" ".join(call[:2]) for call in calls],
+                )
+            )
+        return results
+
+
+def run_suite(
+    sizes: Sequence[int], delay: float = 0.0, repeat: int = 1
+) -> list[Result]:
+    """
+    Run every scenario for every vault size.
+
+    Args:
+        sizes: Vault sizes to benchmark.
+        delay: Startup delay of every bw call, in seconds.
+        repeat: Runs per scenario; the fastest one is reported.
+
+    Returns:
+        The measurements.
+    """
+    results = []
+    for size in sizes:
+        for helper, command, stdins in _SCENARIOS:
+            runs = [
+                run_scenario(size, helper, command, stdins, delay)
+                for _ in range(repeat)
+            ]
+            for phase_runs in zip(*runs, strict=True):
+                results.append(min(phase_runs, key=lambda r: r.wall_seconds))
+    return results
+
+
+def check_thresholds(
+    results: Sequence[Result], thresholds: dict[str, Any], delay: float = 0.0
+) -> list[str]:
+    """
+    Compare results with the thresholds.
+
+    Args:
+        results: The measurements.
+        thresholds: Parsed ``thresholds.json``.
+        delay: Startup delay of every bw call, added to the time allowed.
+
+    Returns:
+        A description of every violation; empty if all thresholds hold.
+    """
+    violations = []
+    max_calls = thresholds.get("bw_calls", {})
+    max_wall = thresholds.get("wall_seconds", {})
+    max_rss = thresholds.get("peak_rss_mb")
+    for result in results:
+        name = f"{result.scenario} (size {result.size})"
+        if result.exit_code != 0:
+            violations.append(f"{name}: exited with {result.exit_code}")
+        allowed_calls = max_calls.get(result.scenario)
+        if allowed_calls is not None and result.bw_calls > allowed_calls:
+            violations.append(
+                f"{name}: {result.bw_calls} bw calls > {allowed_calls} "
+                f"({', '.join(result.bw_commands)})"
+            )
+        allowed_wall = max_wall.get(str(result.size))
+        if allowed_wall is not None:
+            allowed_wall += delay * result.bw_calls
+            if result.wall_seconds > allowed_wall:
+                violations.append(f"{name}: {result.wall_seconds}s > {allowed_wall:g}s")
+        if max_rss is not None and result.peak_rss_mb > max_rss:
+            violations.append(f"{name}: {result.peak_rss_mb} MB > {max_rss} MB")
+    return violations
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    """Run the benchmarks and report the results as JSON."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=list(_DEFAULT_SIZES),
+        help="vault sizes to benchmark (default: 10 1000 10000)",
+    )
+    parser.add_argument(
+        "--delay",
+        type=float,
+        default=0.0,
+        help="startup delay of every bw call in seconds (default: 0)",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=1,
+        help="runs per scenario, the fastest is reported (default: 1)",
+    )
+    parser.add_argument(
+        "--thresholds",
+        type=Path,
+        default=_THRESHOLDS,
+        help="thresholds file (default: benchmarks/thresholds.json)",
+    )
+    parser.add_argument(
+        "--output", type=Path, help="write the JSON report to this file"
+    )
+    args = parser.parse_args(argv)
+
+    results = run_suite(args.sizes, args.delay, args.repeat)
+    thresholds = json.loads(args.thresholds.read_text())
+    violations = check_thresholds(results, thresholds, args.delay)
+
+    report = {
+        "delay_seconds": args.delay,
+        "results": [asdict(r) | {"scenario": r.scenario} for r in results],
+        "thresholds": thresholds,
+        "violations": violations,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(text + "\n")
+    print(text)
+    return 1 if violations else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,55 +2,333 @@
 
 This module implements the Docker credential helper specification for Bitwarden.
 It provides both read-only access to Docker Hub credentials stored in Bitwarden,
-and full read-write access to credentials stored in a secure note.
+and full read-write access to credentials stored in a secure note, or in another
+backend selected with DOCKER_CREDENTIAL_BW_BACKEND (see backend.py).
 
 Supported commands:
 - get: Retrieve credentials for a server URL
 - store: Accept credentials (no-op for docker-bw-docker, full storage for docker-bw)
 - erase: Erase credentials (no-op for docker-bw-docker, full erase for docker-bw)
 - list: List all stored credentials
+- store-batch: Store newline-delimited credentials in one write (docker-bw only)
+- erase-batch: Erase newline-delimited server URLs in one write (docker-bw only)
+- warm: Prefetch credentials into the local cache and report timing
+
+Each invocation has one deadline for all of its Bitwarden calls (see
+deadline.py); when it runs out, an expired cache entry is served if one exists.
 """
 
+import hashlib
 import json
 import sys
+import time
+from logging import getLogger
 from typing import Literal, NoReturn
 
 from pydantic import ValidationError
 
-from .bitwarden import (
-    BitwardenError,
-    check_bw_status,
-    get_all_credentials,
-    output_error,
-    save_all_credentials,
-    search_items,
+from .backend import CredentialBackend, get_backend, scoped_cache_name
+from .bitwarden import BitwardenError, BitwardenTimeoutError, output_error
+from .cache import (
+    EncryptedCache,
+    MissCache,
+    get_cache,
+    get_miss_cache,
+    load_cached_items,
+    load_cached_store,
+    save_cached_items,
+    save_cached_store,
+)
+from .deadline import start_deadline
+from .journal import JOURNAL_NAME, CredentialChanges, submit_changes
+from .registry import RegistryIndex, credentials_by_uri, registry_host, registry_key
+from .retry import retry_counts
+from .types import (
+    BitwardenItem,
+    CredentialStore,
+    DockerCredential,
+    DockerCredentialInput,
+    StoredCredential,
 )
-from .types import DockerCredential, DockerCredentialInput, StoredCredential
+
+_LOGGER = getLogger(__name__)
 
 # Constants
 _DOCKER_HUB_URL = "https://index.docker.io/v1/"
-_ITEM_NAME = "docker-credentials"
+_STORE_CACHE_NAME = "credentials"
+_MISS_CACHE_NAME = "misses"
+_SEARCH_CACHE_PREFIX = "search-"
+_LOGIN_URI_CACHE_PREFIX = "uri-"
+
+
+def _store_cache() -> EncryptedCache | None:
+    """Return the cache entry holding the credential store."""
+    return get_cache(scoped_cache_name(_STORE_CACHE_NAME))
+
+
+def _miss_cache() -> MissCache | None:
+    """Return the record of lookups that found no credentials."""
+    return get_miss_cache(scoped_cache_name(_MISS_CACHE_NAME))
+
+
+def _lookup_cache(prefix: str, key: str) -> EncryptedCache | None:
+    """
+    Return the cache entry of one bw-docker lookup.
+
+    The key is hashed so that search terms and hosts never appear in file names.
+    """
+    digest = hashlib.sha256(key.encode()).hexdigest()[:16]
+    return get_cache(scoped_cache_name(f"{prefix}{digest}"))
+
+
+def _search_cache(search_term: str) -> EncryptedCache | None:
+    """Return the cache entry holding the results of a search."""
+    return _lookup_cache(_SEARCH_CACHE_PREFIX, search_term)
+
+
+def _login_uri_cache(host: str) -> EncryptedCache | None:
+    """Return the cache entry holding the credentials resolved for a host."""
+    return _lookup_cache(_LOGIN_URI_CACHE_PREFIX, host)
+
+
+def _load_stale_store(cache: EncryptedCache | None) -> CredentialStore | None:
+    """
+    Return an expired cached store to answer with when Bitwarden timed out.
+
+    Args:
+        cache: The cache entry to read.
+
+    Returns:
+        The cached store regardless of its age, or None if there is none.
+    """
+    if cache is None:
+        return None
+    stale = load_cached_store(cache, allow_stale=True)
+    if stale is not None:
+        _LOGGER.warning("Bitwarden timed out; serving cached credentials")
+    return stale
+
+
+def _search_items(search_term: str) -> list[BitwardenItem]:
+    """
+    Return the items matching a search term, from the cache when possible.
+
+    Empty results are not cached; the miss cache remembers those.
+
+    Args:
+        search_term: The search term to find credentials in Bitwarden.
+
+    Returns:
+        The matching items; expired cached ones if Bitwarden timed out.
+
+    Raises:
+        BitwardenError: If the vault is unavailable or the search fails.
+    """
+    cache = _search_cache(search_term)
+    if cache is not None:
+        items = load_cached_items(cache)
+        if items is not None:
+            return items
+
+    backend = get_backend()
+    try:
+        backend.check()
+        items = backend.search(search_term)
+    except BitwardenTimeoutError:
+        stale = None
+        if cache is not None:
+            stale = load_cached_items(cache, allow_stale=True)
+        if stale is None:
+            raise
+        _LOGGER.warning("Bitwarden timed out; serving cached search results")
+        return stale
+    if cache is not None and items:
+        save_cached_items(cache, items)
+    return items
+
+
+def _invalidate_lookups(search_term: str, server_url: str | None = None) -> None:
+    """
+    Drop cached bw-docker lookups so the next one asks the vault again.
+
+    Args:
+        search_term: The search term whose results to drop.
+        server_url: Registry whose login URI lookup to drop, if any.
+    """
+    caches = [_search_cache(search_term)]
+    if server_url is not None:
+        caches.append(_login_uri_cache(registry_host(server_url)))
+    for cache in caches:
+        if cache is not None:
+            cache.invalidate()
+    _clear_misses()
+
+
+def _load_cached_credentials() -> CredentialStore | None:
+    """
+    Return the credential store from the local cache without touching the vault.
+
+    Returns:
+        The cached credential store, or None on a miss.
+    """
+    cache = _store_cache()
+    if cache is None:
+        return None
+    return load_cached_store(cache)
+
+
+def _load_credentials() -> CredentialStore:
+    """
+    Load the credential store, serving it from the local cache when possible.
+
+    An expired cached store is served if the backend does not answer
+    before the deadline.
+
+    Returns:
+        Dictionary of credentials (server_url -> StoredCredential).
+
+    Raises:
+        BitwardenError: If reading from the backend fails.
+    """
+    cached = _load_cached_credentials()
+    if cached is not None:
+        return cached
+
+    backend = get_backend()
+    try:
+        backend.check()
+        return _fetch_credentials(backend)
+    except BitwardenTimeoutError:
+        stale = _load_stale_store(_store_cache())
+        if stale is None:
+            raise
+        return stale
+
+
+def _fetch_credentials(backend: CredentialBackend) -> CredentialStore:
+    """
+    Read the credential store from the backend and refresh the local cache.
+
+    Args:
+        backend: The credential backend, already checked.
+
+    Returns:
+        Dictionary of credentials (server_url -> StoredCredential).
+
+    Raises:
+        BitwardenError: If reading from the backend fails.
+    """
+    cache = _store_cache()
+    all_creds = backend.load()
+    if cache is not None:
+        save_cached_store(cache, all_creds)
+    return all_creds
+
+
+def _invalidate_credentials_cache() -> None:
+    """Drop the cached credential store once it may have changed."""
+    cache = _store_cache()
+    if cache is not None:
+        cache.invalidate()
+
+
+def _is_known_miss(key: str) -> bool:
+    """Return True if a lookup of the key recently found no credentials."""
+    misses = _miss_cache()
+    return misses is not None and misses.contains(key)
+
+
+def _record_miss(key: str) -> None:
+    """Remember that a lookup of the key found no credentials."""
+    misses = _miss_cache()
+    if misses is not None:
+        misses.add(key)
+
+
+def _clear_misses() -> None:
+    """Forget remembered misses once credentials may have been added."""
+    misses = _miss_cache()
+    if misses is not None:
+        misses.clear()
+
+
+def _cmd_get_login_uri(server_url: str) -> None:
+    """
+    Get credentials for a registry from the login item with a matching URI.
+
+    The vault's logins are listed once and indexed by the hosts of their URIs,
+    so any registry whose host is stored on a login item resolves without a
+    search per registry.
+
+    Args:
+        server_url: The Docker registry server URL.
+    """
+    host = registry_host(server_url)
+    miss_key = f"uri:{host}"
+    if _is_known_miss(miss_key):
+        output_error(f"credentials not found for {server_url}")
+
+    # Only the credentials resolved for this host are cached, never the
+    # whole listing of the vault's logins
+    cache = _login_uri_cache(host)
+    cached = load_cached_store(cache) if cache is not None else None
+    cred_data = cached.get(host) if cached is not None else None
+    if cred_data is None:
+        try:
+            backend = get_backend()
+            backend.check()
+            index = RegistryIndex(credentials_by_uri(backend.list_logins()))
+        except BitwardenTimeoutError as e:
+            stale = _load_stale_store(cache)
+            if stale is None:
+                output_error(str(e))
+            index = RegistryIndex(stale)
+        except BitwardenError as e:
+            output_error(str(e))
+
+        cred_data = index.get(host)
+        if not cred_data:
+            _record_miss(miss_key)
+            output_error(f"credentials not found for {server_url}")
+        if cache is not None:
+            save_cached_store(cache, {host: cred_data})
+
+    try:
+        credential = DockerCredential(
+            ServerURL=server_url,
+            Username=cred_data.Username,
+            Secret=cred_data.Secret,
+        )
+        print(credential.model_dump_json())
+    except ValidationError as e:
+        output_error(f"validation error: {e.errors()[0]['msg']}")
 
 
 def _cmd_get_docker_hub(server_url: str, search_term: str) -> None:
     """
     Get credentials for Docker Hub from Bitwarden search.
 
+    Other registries are looked up by the URIs of login items.
+
     Args:
         server_url: The Docker registry server URL.
         search_term: The search term to find credentials in Bitwarden.
     """
-    # Only handle Docker Hub
-    if server_url != _DOCKER_HUB_URL:
-        output_error(f"credentials not found for {server_url}")
+    if registry_key(server_url) != registry_key(_DOCKER_HUB_URL):
+        _cmd_get_login_uri(server_url)
+        return
+
+    miss_key = f"search:{search_term}"
+    if _is_known_miss(miss_key):
+        output_error("credentials not found")
 
     try:
-        check_bw_status()
-        items = search_items(search_term)
+        items = _search_items(search_term)
     except BitwardenError as e:
         output_error(str(e))
 
     if not items:
+        _record_miss(miss_key)
         output_error("credentials not found")
 
     # Parse the first matching item
@@ -79,16 +357,20 @@ def _cmd_get_storage(server_url: str) -> None:
     Args:
         server_url: The server URL to get credentials for.
     """
+    miss_key = registry_key(server_url)
+    if _is_known_miss(miss_key):
+        output_error("credentials not found")
+
     try:
-        check_bw_status()
-        all_creds = get_all_credentials(_ITEM_NAME)
+        all_creds = _load_credentials()
     except BitwardenError as e:
         output_error(str(e))
 
-    # Extract credential for the requested server URL
-    cred_data = all_creds.get(server_url)
+    # Extract credential for the requested server URL, in any equivalent form
+    cred_data = RegistryIndex(all_creds).get(server_url)
 
     if not cred_data:
+        _record_miss(miss_key)
         output_error("credentials not found")
 
     # Create and validate the credential
@@ -116,12 +398,55 @@ def _cmd_store_noop(input_data: dict[str, str]) -> NoReturn:
     try:
         # Validate input format
         DockerCredentialInput(**input_data)
+        # A login may mean the credentials were just added to the vault
+        _clear_misses()
         # Silently succeed without updating Bitwarden
         sys.exit(0)
     except ValidationError as e:
         output_error(f"invalid input: {e.errors()[0]['msg']}")
 
 
+def _write_changes(changes: CredentialChanges) -> None:
+    """
+    Apply credential changes with one read and at most one write of the storage.
+
+    Args:
+        changes: Credentials to store, or None for credentials to erase.
+
+    Raises:
+        BitwardenError: If reading or writing the backend fails.
+    """
+    backend = get_backend()
+    backend.check()
+    txn = backend.begin({registry_key(url) for url in changes})
+
+    try:
+        # Equivalent forms of a server URL are replaced instead of duplicated
+        if RegistryIndex(txn.credentials).apply(changes):
+            txn.commit()
+    finally:
+        # Dropped only now, since a concurrent get may have cached the old
+        # store while the commit ran. A sharded transaction holds only some
+        # shards, so the cache cannot be refilled from it. Without any change
+        # the cache may still predate a credential stored elsewhere.
+        _invalidate_credentials_cache()
+    _clear_misses()
+
+
+def _apply_changes(changes: CredentialChanges) -> NoReturn:
+    """
+    Apply credential changes, coalesced with concurrently running helpers.
+
+    Args:
+        changes: Credentials to store, or None for credentials to erase.
+    """
+    try:
+        submit_changes(changes, _write_changes, scoped_cache_name(JOURNAL_NAME))
+        sys.exit(0)
+    except BitwardenError as e:
+        output_error(str(e))
+
+
 def _cmd_store_storage(input_data: dict[str, str]) -> NoReturn:
     """
     Store credentials for a server URL in storage.
@@ -135,24 +460,14 @@ def _cmd_store_storage(input_data: dict[str, str]) -> NoReturn:
     except ValidationError as e:
         output_error(f"invalid input: {e.errors()[0]['msg']}")
 
-    try:
-        check_bw_status()
-        all_creds = get_all_credentials(_ITEM_NAME)
-    except BitwardenError as e:
-        output_error(str(e))
-
-    # Add or update the credential for this server URL
-    all_creds[cred_input.ServerURL] = StoredCredential(
+    new_cred = StoredCredential(
         Username=cred_input.Username,
         Secret=cred_input.Secret,
     )
 
-    # Save back to Bitwarden
-    try:
-        save_all_credentials(_ITEM_NAME, all_creds)
-        sys.exit(0)
-    except BitwardenError as e:
-        output_error(str(e))
+    # Whether it is already stored is decided on the fresh read in
+    # _write_changes; the cache may not show changes from other machines
+    _apply_changes({cred_input.ServerURL: new_cred})
 
 
 def _cmd_erase_noop(server_url: str) -> NoReturn:
@@ -176,27 +491,121 @@ def _cmd_erase_storage(server_url: str) -> NoReturn:
     Args:
         server_url: The server URL to erase credentials for.
     """
+    _apply_changes({server_url: None})
+
+
+def _parse_batch_input(lines: list[str]) -> list[DockerCredentialInput]:
+    """
+    Parse and validate newline-delimited credential records.
+
+    Args:
+        lines: Lines read from stdin, one JSON object per line.
+
+    Returns:
+        The validated records, in input order.
+    """
+    records = []
+    for lineno, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            records.append(DockerCredentialInput.model_validate_json(line))
+        except ValidationError as e:
+            output_error(f"invalid input on line {lineno}: {e.errors()[0]['msg']}")
+    return records
+
+
+def _cmd_store_batch_storage(lines: list[str]) -> NoReturn:
+    """
+    Store several credentials with a single read and write of the storage.
+
+    All records are validated before Bitwarden is touched, so a bad record
+    leaves the storage unchanged.
+
+    Args:
+        lines: Lines read from stdin, one DockerCredentialInput JSON per line.
+    """
+    records = _parse_batch_input(lines)
+    _apply_changes(
+        {
+            record.ServerURL: StoredCredential(
+                Username=record.Username, Secret=record.Secret
+            )
+            for record in records
+        }
+    )
+
+
+def _cmd_erase_batch_storage(lines: list[str]) -> NoReturn:
+    """
+    Erase several credentials with a single read and write of the storage.
+
+    Args:
+        lines: Lines read from stdin, one server URL per line.
+    """
+    _apply_changes({line.strip(): None for line in lines if line.strip()})
+
+
+def _print_timings(timings: dict[str, float], **details: object) -> None:
+    """Print step durations of a warm run, in seconds, and any retries as JSON."""
+    result: dict[str, object] = {
+        f"{step}_seconds": round(seconds, 3) for step, seconds in timings.items()
+    }
+    result["total_seconds"] = round(sum(timings.values()), 3)
+    retries = retry_counts()
+    if retries:
+        result["retries"] = retries
+    print(json.dumps(details | result))
+
+
+def _cmd_warm_docker_hub(search_term: str) -> NoReturn:
+    """
+    Run the Docker Hub search once so later calls start warm.
+
+    Args:
+        search_term: The search term to find credentials in Bitwarden.
+    """
+    timings: dict[str, float] = {}
     try:
-        check_bw_status()
-        all_creds = get_all_credentials(_ITEM_NAME)
+        start = time.perf_counter()
+        backend = get_backend()
+        backend.check()
+        timings["status"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        items = backend.search(search_term)
+        timings["search"] = time.perf_counter() - start
     except BitwardenError as e:
         output_error(str(e))
 
-    # Check if the credential exists
-    if server_url not in all_creds:
-        # No credential to delete, succeed silently
-        sys.exit(0)
+    _invalidate_lookups(search_term)
+    cache = _search_cache(search_term)
+    if cache is not None and items:
+        save_cached_items(cache, items)
+    _print_timings(timings, items=len(items))
+    sys.exit(0)
 
-    # Remove the credential for this server URL
-    del all_creds[server_url]
 
-    # Save back to Bitwarden
+def _cmd_warm_storage() -> NoReturn:
+    """Read the credential store into the local cache and report timing."""
+    timings: dict[str, float] = {}
     try:
-        save_all_credentials(_ITEM_NAME, all_creds)
-        sys.exit(0)
+        start = time.perf_counter()
+        backend = get_backend()
+        backend.check()
+        timings["status"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        all_creds = _fetch_credentials(backend)
+        timings["load"] = time.perf_counter() - start
     except BitwardenError as e:
         output_error(str(e))
 
+    _clear_misses()
+    _print_timings(timings, credentials=len(all_creds))
+    sys.exit(0)
+
 
 def _cmd_list_docker_hub(search_term: str) -> None:
     """
@@ -206,8 +615,7 @@ def _cmd_list_docker_hub(search_term: str) -> None:
         search_term: The search term to find credentials in Bitwarden.
     """
     try:
-        check_bw_status()
-        items = search_items(search_term)
+        items = _search_items(search_term)
     except BitwardenError as e:
         output_error(str(e))
 
@@ -229,25 +637,30 @@ def _cmd_list_docker_hub(search_term: str) -> None:
 def _cmd_list_storage() -> NoReturn:
     """List all stored credentials from storage."""
     try:
-        check_bw_status()
-        all_creds = get_all_credentials(_ITEM_NAME)
+        all_creds = _load_credentials()
     except BitwardenError as e:
         output_error(str(e))
 
-    # Convert to the list format: {"url": "username", ...}
-    result = {url: cred.Username for url, cred in all_creds.items()}
+    # Convert to the list format: {"url": "username", ...}, one per registry
+    result = {url: cred.Username for url, cred in RegistryIndex(all_creds).items()}
 
     print(json.dumps(result))
     sys.exit(0)
 
 
-def docker_credential_bw(command: Literal["get", "store", "erase", "list"]) -> None:
+def docker_credential_bw(
+    command: Literal[
+        "get", "store", "erase", "list", "store-batch", "erase-batch", "warm"
+    ],
+) -> None:
     """
     Main entry point for docker-credential-bw.
 
     Args:
-        command: The command to execute (get, store, erase, list).
+        command: The command to execute (get, store, erase, list, store-batch,
+            erase-batch, warm).
     """
+    start_deadline()
     if command == "get":
         server_url = sys.stdin.read().strip()
         _cmd_get_storage(server_url)
@@ -264,24 +677,37 @@ def docker_credential_bw(command: Literal["get", "store", "erase", "list"]) -> N
         _cmd_erase_storage(server_url)
     elif command == "list":
         _cmd_list_storage()
+    elif command == "store-batch":
+        _cmd_store_batch_storage(sys.stdin.readlines())
+    elif command == "erase-batch":
+        _cmd_erase_batch_storage(sys.stdin.readlines())
+    elif command == "warm":
+        _cmd_warm_storage()
     else:
         output_error(
-            f"Unknown command: {command}. Supported commands: get, store, erase, list"
+            f"Unknown command: {command}. Supported commands: "
+            "get, store, erase, list, store-batch, erase-batch, warm"
         )
 
 
 def docker_credential_bw_docker(
-    command: Literal["get", "store", "erase", "list"], search_term: str = "DockerHub"
+    command: Literal["get", "store", "erase", "list", "warm"],
+    search_term: str = "DockerHub",
+    refresh: bool = False,
 ) -> None:
     """
     Main entry point for docker-credential-bw-docker.
 
     Args:
-        command: The command to execute (get, store, erase, list).
+        command: The command to execute (get, store, erase, list, warm).
         search_term: The search term for Bitwarden lookup (default: "DockerHub").
+        refresh: Ask the vault again instead of serving cached lookups.
     """
+    start_deadline()
     if command == "get":
         server_url = sys.stdin.read().strip()
+        if refresh:
+            _invalidate_lookups(search_term, server_url)
         _cmd_get_docker_hub(server_url, search_term)
     elif command == "store":
         input_json = sys.stdin.read().strip()
@@ -294,8 +720,13 @@ def docker_credential_bw_docker(
         server_url = sys.stdin.read().strip()
         _cmd_erase_noop(server_url)
     elif command == "list":
+        if refresh:
+            _invalidate_lookups(search_term)
         _cmd_list_docker_hub(search_term)
+    elif command == "warm":
+        _cmd_warm_docker_hub(search_term)
     else:
         output_error(
-            f"Unknown command: {command}. Supported commands: get, store, erase, list"
+            f"Unknown command: {command}. "
+            "Supported commands: get, store, erase, list, warm"
         )
@@ -0,0 +1,293 @@
+"""Pluggable storage backends for the credential helpers.
+
+The commands only talk to a backend through the small interface below, so the
+credential store can live somewhere other than Bitwarden. The backend is
+chosen with ``DOCKER_CREDENTIAL_BW_BACKEND``:
+
+    bitwarden: A secure note in the Bitwarden vault (default).
+    local: A locally encrypted file, see ``local.py``.
+    tiered: The local file, replicated to Bitwarden in the background, see
+        ``replication.py``. Writes return as soon as the local file and the
+        replication outbox are updated; reads never wait for Bitwarden once
+        the local file exists.
+
+Environment variables:
+    DOCKER_CREDENTIAL_BW_BACKEND: Name of the backend to use.
+"""
+
+import os
+from collections.abc import Collection
+from typing import Protocol
+
+from .bitwarden import (
+    LOGIN_TYPE,
+    BitwardenError,
+    CredentialTransaction,
+    check_bw_status,
+    get_all_credentials,
+    list_items,
+    search_items,
+)
+from .journal import CredentialChanges
+from .local import LocalFileBackend
+from .registry import RegistryIndex
+from .replication import enqueue, pending_changes, request_replication
+from .shards import ShardedCredentialTransaction, shard_count
+from .types import BitwardenItem, CredentialStore
+
+ENV_BACKEND = "DOCKER_CREDENTIAL_BW_BACKEND"
+
+_ITEM_NAME = "docker-credentials"
+
+
+class StoreTransaction(Protocol):
+    """A read-modify-write of the credential store."""
+
+    credentials: CredentialStore
+
+    def commit(self) -> None:
+        """Save the modified credentials."""
+        ...
+
+
+class CredentialBackend(Protocol):
+    """Storage for the docker-credential-bw credential store."""
+
+    name: str
+
+    def check(self) -> None:
+        """Make sure the backend is usable before reading or writing it."""
+        ...
+
+    def load(self) -> CredentialStore:
+        """Read the whole credential store."""
+        ...
+
+    def begin(self, server_urls: Collection[str] | None = None) -> StoreTransaction:
+        """Start a read-modify-write touching at least the given URLs."""
+        ...
+
+    def search(self, term: str) -> list[BitwardenItem]:
+        """Search login items by name."""
+        ...
+
+    def list_logins(self) -> list[BitwardenItem]:
+        """List all login items."""
+        ...
+
+
+class BitwardenBackend:
+    """Credential store in a Bitwarden secure note, optionally sharded."""
+
+    name = "bitwarden"
+
+    def __init__(self, item_name: str = _ITEM_NAME) -> None:
+        self.item_name = item_name
+
+    def check(self) -> None:
+        """
+        Make sure the vault is unlocked.
+
+        Raises:
+            BitwardenError: If Bitwarden is unavailable or locked.
+        """
+        check_bw_status()
+
+    def load(self) -> CredentialStore:
+        """
+        Read the credential store from the vault.
+
+        Raises:
+            BitwardenError: If reading from Bitwarden fails.
+        """
+        shards = shard_count()
+        if shards > 1:
+            return ShardedCredentialTransaction.begin(
+                self.item_name, shards
+            ).credentials
+        return get_all_credentials(self.item_name)
+
+    def begin(self, server_urls: Collection[str] | None = None) -> StoreTransaction:
+        """
+        Start a read-modify-write of the secure note(s).
+
+        Args:
+            server_urls: URLs that will be changed; with sharding, only the
+                shards holding them are read and written.
+
+        Raises:
+            BitwardenError: If reading from Bitwarden fails.
+        """
+        shards = shard_count()
+        if shards > 1:
+            return ShardedCredentialTransaction.begin(
+                self.item_name, shards, server_urls
+            )
+        return CredentialTransaction.begin(self.item_name)
+
+    def search(self, term: str) -> list[BitwardenItem]:
+        """
+        Search the vault for items matching a term.
+
+        Raises:
+            BitwardenError: If the search fails.
+        """
+        return search_items(term)
+
+    def list_logins(self) -> list[BitwardenItem]:
+        """
+        List all login items of the vault with one listing.
+
+        Raises:
+            BitwardenError: If listing fails.
+        """
+        return list_items(item_type=LOGIN_TYPE)
+
+
+class TieredTransaction:
+    """Read-modify-write of the local tier, queued for replication."""
+
+    def __init__(self, backend: "TieredBackend", credentials: CredentialStore):
+        self._backend = backend
+        self._original = dict(credentials)
+        self.credentials = credentials
+
+    def commit(self) -> None:
+        """
+        Save the credentials locally and queue the changes for Bitwarden.
+
+        Raises:
+            BitwardenError: If the local tier or the outbox cannot be written.
+        """
+        changes: CredentialChanges = {
+            url: None for url in self._original if url not in self.credentials
+        }
+        changes.update(
+            (url, cred)
+            for url, cred in self.credentials.items()
+            if self._original.get(url) != cred
+        )
+        if not changes:
+            return
+
+        local = self._backend.local
+        # Queue first: a crash before the local save still reaches Bitwarden
+        enqueue(local, changes)
+        local.save(self.credentials)
+        self._original = dict(self.credentials)
+        request_replication(local)
+
+
+class TieredBackend:
+    """Local encrypted tier in front of Bitwarden, replicated write-behind."""
+
+    name = "tiered"
+
+    def __init__(self) -> None:
+        self.local = LocalFileBackend()
+        self.remote = BitwardenBackend()
+
+    def check(self) -> None:
+        """
+        Make sure the local tier's key is available.
+
+        Raises:
+            BitwardenError: If no key is configured.
+        """
+        self.local.check()
+
+    def load(self) -> CredentialStore:
+        """
+        Read the credential store from the local tier.
+
+        The first read on a machine seeds the local tier from Bitwarden, with
+        changes still waiting for replication applied on top.
+
+        Raises:
+            BitwardenError: If the local tier cannot be read, or seeding from
+                Bitwarden fails.
+        """
+        if self.local.path.exists():
+            return self.local.load()
+
+        self.remote.check()
+        credentials = self.remote.load()
+        index = RegistryIndex(credentials)
+        pending = pending_changes(self.local)
+        for _, changes in pending:
+            index.apply(changes)
+        self.local.save(credentials)
+        if pending:
+            request_replication(self.local)
+        return credentials
+
+    def begin(self, server_urls: Collection[str] | None = None) -> TieredTransaction:
+        """
+        Start a read-modify-write of the local tier.
+
+        Args:
+            server_urls: Unused; the whole local tier is always read.
+
+        Raises:
+            BitwardenError: If the local tier cannot be read.
+        """
+        return TieredTransaction(self, self.load())
+
+    def search(self, term: str) -> list[BitwardenItem]:
+        """
+        Search the vault for items matching a term.
+
+        Raises:
+            BitwardenError: If the search fails.
+        """
+        return self.remote.search(term)
+
+    def list_logins(self) -> list[BitwardenItem]:
+        """
+        List all login items of the vault.
+
+        Raises:
+            BitwardenError: If listing fails.
+        """
+        return self.remote.list_logins()
+
+
+def _backend_name() -> str:
+    return os.environ.get(ENV_BACKEND) or BitwardenBackend.name
+
+
+def scoped_cache_name(name: str) -> str:
+    """
+    Return the name of a cache entry private to the selected backend.
+
+    Args:
+        name: Name of the cache entry for the Bitwarden backend.
+
+    Returns:
+        The name, suffixed for other backends so they never share entries.
+    """
+    backend = _backend_name()
+    return name if backend == BitwardenBackend.name else f"{name}-{backend}"
+
+
+def get_backend() -> CredentialBackend:
+    """
+    Return the backend selected by the environment.
+
+    Returns:
+        The credential backend.
+
+    Raises:
+        BitwardenError: If an unknown backend is configured.
+    """
+    name = _backend_name()
+    if name == BitwardenBackend.name:
+        return BitwardenBackend()
+    if name == LocalFileBackend.name:
+        return LocalFileBackend()
+    if name == TieredBackend.name:
+        return TieredBackend()
+    raise BitwardenError(
+        f"Unknown {ENV_BACKEND}={name!r}; expected {BitwardenBackend.name!r}, "
+        f"{LocalFileBackend.name!r} or {TieredBackend.name!r}"
+    )
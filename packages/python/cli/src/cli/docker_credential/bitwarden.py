@@ -1,13 +1,54 @@
 """Bitwarden CLI integration for Docker credential helper."""
 
+import base64
 import json
+import os
+import shutil
 import subprocess
 import sys
-from typing import NoReturn
+import threading
+from collections.abc import Collection, Generator, Iterator, Sequence
+from contextlib import closing, contextmanager
+from logging import getLogger
+from typing import Any, NoReturn, TypeGuard
+
+from pydantic import TypeAdapter, ValidationError
+
+from .deadline import ENV_TIMEOUT, budget, remaining
+from .envelope import EnvelopeError, decode_payload, encode_payload
+from .index import forget_item_id, lookup_item_id, remember_item_id
+from .jsonstream import iter_json_array
+from .retry import Backoff, is_transient
+from .serve import BwServeError, BwServeTimeoutError, get_serve_client
+from .sync import is_sync_deferred, request_sync
+from .types import BitwardenItem, CredentialStore, ErrorResponse, StoredCredential
 
-from pydantic import ValidationError
+_LOGGER = getLogger(__name__)
 
-from .types import BitwardenItem, CredentialStore, ErrorResponse, StoredCredential
+ENV_FAST = "DOCKER_CREDENTIAL_BW_FAST"
+
+# Bitwarden item types of logins and secure notes
+LOGIN_TYPE = 1
+SECURE_NOTE_TYPE = 2
+
+_NOT_INSTALLED_MESSAGE = "Bitwarden CLI (bw) is not installed"
+_LOCKED_MESSAGE = (
+    "Bitwarden is locked. Please unlock with: export BW_SESSION=$(bw unlock --raw)"
+)
+
+# Fragments of bw error output that mean the vault cannot be used until the
+# user unlocks (or logs in) again.
+_LOCKED_PATTERNS = (
+    "vault is locked",
+    "you are not logged in",
+    "session key is invalid",
+    "master password",
+)
+
+# bw error output for an item ID that does not exist
+_NOT_FOUND_PATTERN = "not found"
+
+_ITEM_LIST_ADAPTER: TypeAdapter[list[BitwardenItem]] = TypeAdapter(list[BitwardenItem])
 
 
 class BitwardenError(Exception):
@@ -16,39 +57,205 @@ class BitwardenError(Exception):
     pass
 
 
+class BitwardenTimeoutError(BitwardenError):
+    """Exception raised when Bitwarden does not answer before the deadline."""
+
+
+def is_fast_mode() -> bool:
+    """
+    Return whether optimistic execution is enabled.
+
+    In fast mode the preflight ``bw status`` check is skipped; the real
+    operation runs immediately and its failure is classified instead.
+    """
+    return bool(os.environ.get(ENV_FAST))
+
+
+def _classify_failure(error_prefix: str, stderr: str) -> str:
+    """
+    Map a failed bw operation to the message Docker users see.
+
+    Args:
+        error_prefix: Message prefix for generic failures.
+        stderr: Error output of the failed operation.
+
+    Returns:
+        The error message.
+    """
+    lowered = stderr.lower()
+    if any(pattern in lowered for pattern in _LOCKED_PATTERNS):
+        return _LOCKED_MESSAGE
+    return f"{error_prefix}: {stderr}"
+
+
+def _serve_failure(error_prefix: str, error: BwServeError) -> BitwardenError:
+    """Map a failed ``bw serve`` request to the error of the same bw command."""
+    if isinstance(error, BwServeTimeoutError):
+        return BitwardenTimeoutError(_timeout_message())
+    return BitwardenError(_classify_failure(error_prefix, str(error)))
+
+
+def _is_retryable(stderr: str) -> bool:
+    """Return whether a failed bw call may succeed if it is run again."""
+    lowered = stderr.lower()
+    if any(pattern in lowered for pattern in _LOCKED_PATTERNS):
+        return False
+    return _NOT_FOUND_PATTERN not in lowered and is_transient(stderr)
+
+
+def _timeout_message() -> str:
+    return (
+        f"Bitwarden did not respond within {budget():g} seconds "
+        f"(raise {ENV_TIMEOUT} if the server is slow)"
+    )
+
+
+def _subprocess_timeout() -> float | None:
+    """
+    Return the time a bw subprocess may take.
+
+    Returns:
+        Seconds left until the deadline, or None without a deadline.
+
+    Raises:
+        BitwardenTimeoutError: If the deadline has already passed.
+    """
+    timeout = remaining()
+    if timeout is not None and timeout <= 0:
+        raise BitwardenTimeoutError(_timeout_message())
+    return timeout
+
+
+@contextmanager
+def _kill_after(
+    proc: subprocess.Popen[bytes], timeout: float | None
+) -> Iterator[threading.Event]:
+    """
+    Kill a process that is still running when the timeout elapses.
+
+    Yields:
+        An event set if the process was killed.
+    """
+    killed = threading.Event()
+    if timeout is None:
+        yield killed
+        return
+
+    def kill() -> None:
+        killed.set()
+        proc.kill()
+
+    timer = threading.Timer(timeout, kill)
+    timer.daemon = True
+    timer.start()
+    try:
+        yield killed
+    finally:
+        timer.cancel()
+
+
+def _bw_command(args: Sequence[str]) -> list[str]:
+    """Build the argument vector for a bw subcommand."""
+    cmd = ["bw", *args]
+    if is_fast_mode():
+        # Without the preflight status check bw could otherwise prompt for
+        # the master password and hang the Docker client.
+        cmd.append("--nointeraction")
+    return cmd
+
+
+def _run_bw(
+    args: Sequence[str],
+    error_prefix: str,
+    *,
+    input: str | None = None,
+    check: bool = True,
+    retry: bool = True,
+) -> subprocess.CompletedProcess[str]:
+    """
+    Run a bw subcommand, retrying transient failures.
+
+    Args:
+        args: Arguments passed to bw.
+        error_prefix: Message prefix used if the command fails.
+        input: Optional text passed on stdin.
+        check: Raise BitwardenError if the command exits with non-zero status.
+        retry: Run the command again after a transient failure. Commands that
+            must not run twice, like creating an item, pass False.
+
+    Returns:
+        The completed process.
+
+    Raises:
+        BitwardenError: If bw is missing, or fails and check is True.
+        BitwardenTimeoutError: If bw was killed at the deadline.
+    """
+    backoff = Backoff(" ".join(args[:2]))
+    while True:
+        try:
+            result = subprocess.run(
+                _bw_command(args),
+                input=input,
+                capture_output=True,
+                text=True,
+                check=False,
+                timeout=_subprocess_timeout(),
+            )
+        except FileNotFoundError:
+            raise BitwardenError(_NOT_INSTALLED_MESSAGE) from None
+        except subprocess.TimeoutExpired:
+            # subprocess.run has already killed and reaped bw
+            raise BitwardenTimeoutError(_timeout_message()) from None
+
+        if (
+            result.returncode == 0
+            or not retry
+            or not _is_retryable(result.stderr)
+            or not backoff.wait(result.stderr)
+        ):
+            break
+
+    if check and result.returncode != 0:
+        raise BitwardenError(_classify_failure(error_prefix, result.stderr))
+    return result
+
+
 def check_bw_status() -> None:
     """
     Check if Bitwarden CLI is installed and unlocked.
 
+    Does nothing in fast mode; the subsequent operation reports the same
+    errors if it fails.
+
     Raises:
         BitwardenError: If bw is not installed or is locked.
     """
+    if is_fast_mode():
+        return
+
+    client = get_serve_client()
+    if client is not None:
+        try:
+            status = client.status()
+        except BwServeTimeoutError as e:
+            raise BitwardenTimeoutError(_timeout_message()) from e
+        except BwServeError as e:
+            raise BitwardenError(f"Failed to get Bitwarden status: {e}") from e
+        if status.get("status") != "unlocked":
+            raise BitwardenError(_LOCKED_MESSAGE)
+        return
+
     # Check if bw command exists
-    result = subprocess.run(
-        ["which", "bw"],
-        capture_output=True,
-        text=True,
-        check=False,
-    )
-    if result.returncode != 0:
-        raise BitwardenError("Bitwarden CLI (bw) is not installed")
+    if shutil.which("bw") is None:
+        raise BitwardenError(_NOT_INSTALLED_MESSAGE)
 
     # Check if session is unlocked
-    result = subprocess.run(
-        ["bw", "status"],
-        capture_output=True,
-        text=True,
-        check=False,
-    )
-    if result.returncode != 0:
-        raise BitwardenError(f"Failed to get Bitwarden status: {result.stderr}")
+    result = _run_bw(["status"], "Failed to get Bitwarden status")
 
     try:
         status = json.loads(result.stdout)
         if status.get("status") != "unlocked":
-            raise BitwardenError(
-                "Bitwarden is locked. Please unlock with: export BW_SESSION=$(bw unlock --raw)"
-            )
+            raise BitwardenError(_LOCKED_MESSAGE)
     except json.JSONDecodeError as e:
         raise BitwardenError(f"Failed to parse Bitwarden status: {e}")
 
@@ -66,24 +273,179 @@ def search_items(search_term: str) -> list[BitwardenItem]:
     Raises:
         BitwardenError: If search fails or returns invalid data.
     """
-    result = subprocess.run(
-        ["bw", "list", "items", "--search", search_term],
-        capture_output=True,
-        text=True,
-        check=False,
-    )
-    if result.returncode != 0:
-        raise BitwardenError(f"Failed to search Bitwarden items: {result.stderr}")
+    error_prefix = "Failed to search Bitwarden items"
+    if get_serve_client() is not None:
+        return _validate_items(_list_items_data(search_term, error_prefix))
 
+    result = _run_bw(["list", "items", "--search", search_term], error_prefix)
     try:
-        items_data = json.loads(result.stdout)
-        if not isinstance(items_data, list):
-            raise BitwardenError("Invalid response from Bitwarden: expected a list")
-        return [BitwardenItem.model_validate(item) for item in items_data]
+        # Validate straight from the JSON text in one pass
+        return _ITEM_LIST_ADAPTER.validate_json(result.stdout)
+    except ValidationError:
+        # Invalid JSON or an invalid item; retry item by item below
+        pass
+    try:
+        return _validate_items(json.loads(result.stdout))
     except json.JSONDecodeError as e:
         raise BitwardenError(f"Failed to parse Bitwarden response: {e}")
+
+
+def _list_items_data(search_term: str | None, error_prefix: str) -> object:
+    """
+    List raw items, optionally filtered by a search term.
+
+    Args:
+        search_term: The search term, or None to list the whole vault.
+        error_prefix: Message prefix used if the listing fails.
+
+    Returns:
+        The decoded JSON returned by Bitwarden.
+
+    Raises:
+        BitwardenError: If listing fails or returns invalid JSON.
+    """
+    client = get_serve_client()
+    if client is not None:
+        try:
+            return client.list_items(search_term)
+        except BwServeError as e:
+            raise _serve_failure(error_prefix, e) from e
+
+    args = ["list", "items"]
+    if search_term is not None:
+        args += ["--search", search_term]
+    result = _run_bw(args, error_prefix)
+
+    try:
+        return json.loads(result.stdout)
+    except json.JSONDecodeError as e:
+        raise BitwardenError(f"Failed to parse Bitwarden response: {e}")
+
+
+def _iter_items_data(
+    error_prefix: str, search_term: str | None = None
+) -> Generator[object, None, None]:
+    """
+    Yield the raw items of the vault one at a time.
+
+    The output of ``bw list items`` is parsed while it is being read, so memory
+    use does not grow with the vault size. Closing the iterator early stops bw.
+    A transient failure is retried as long as no item was yielded yet.
+
+    Args:
+        error_prefix: Message prefix used if the listing fails.
+        search_term: Only list items matching this term, or None for the
+            whole vault.
+
+    Yields:
+        Each decoded item.
+
+    Raises:
+        BitwardenError: If listing fails or returns invalid JSON.
+        BitwardenTimeoutError: If bw was killed at the deadline.
+    """
+    client = get_serve_client()
+    if client is not None:
+        items_data = _list_items_data(search_term, error_prefix)
+        if not isinstance(items_data, list):
+            raise BitwardenError("Invalid response from Bitwarden: expected a list")
+        yield from items_data
+        return
+
+    args = ["list", "items"]
+    if search_term is not None:
+        args += ["--search", search_term]
+    backoff = Backoff("list items")
+    while True:
+        timeout = _subprocess_timeout()
+        try:
+            proc = subprocess.Popen(
+                _bw_command(args),
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+            )
+        except FileNotFoundError:
+            raise BitwardenError(_NOT_INSTALLED_MESSAGE) from None
+        assert proc.stdout is not None and proc.stderr is not None
+
+        parse_error = None
+        yielded = False
+        with _kill_after(proc, timeout) as killed, proc:
+            try:
+                for item in iter_json_array(proc.stdout):
+                    yielded = True
+                    yield item
+            except ValueError as e:
+                parse_error = e
+            except GeneratorExit:
+                # The caller has what it needs; do not wait for the rest
+                proc.kill()
+                raise
+            # After a parse error stdout may still be full; reading both pipes
+            # together keeps bw from blocking on it
+            stderr = proc.communicate()[1].decode(errors="replace")
+
+        if killed.is_set():
+            raise BitwardenTimeoutError(_timeout_message())
+        if proc.returncode == 0:
+            break
+        # Items already handed to the caller cannot be taken back
+        if yielded or not _is_retryable(stderr) or not backoff.wait(stderr):
+            raise BitwardenError(_classify_failure(error_prefix, stderr))
+
+    if parse_error is not None:
+        raise BitwardenError(f"Failed to parse Bitwarden response: {parse_error}")
+
+
+def _matches(
+    item: object, item_name: str | None, item_type: int | None
+) -> TypeGuard[dict[str, Any]]:
+    """Check name and type on a raw item, before paying for validation."""
+    return (
+        isinstance(item, dict)
+        and (item_name is None or item.get("name") == item_name)
+        and (item_type is None or item.get("type") == item_type)
+    )
+
+
+def _validate_item(item: object) -> BitwardenItem | None:
+    """
+    Validate a raw item, skipping it if it is invalid.
+
+    A single malformed item (for example from a newer Bitwarden item type)
+    must not make the items we actually need unreadable.
+
+    Args:
+        item: The raw item.
+
+    Returns:
+        The validated item, or None if it is invalid.
+    """
+    try:
+        return BitwardenItem.model_validate(item)
     except ValidationError as e:
-        raise BitwardenError(f"Invalid Bitwarden item format: {e}")
+        item_id = item.get("id") if isinstance(item, dict) else None
+        _LOGGER.warning("Skipping invalid Bitwarden item %s: %s", item_id, e)
+        return None
+
+
+def _validate_items(items_data: object) -> list[BitwardenItem]:
+    """
+    Validate a decoded item list, skipping invalid items.
+
+    Args:
+        items_data: The decoded JSON returned by Bitwarden.
+
+    Returns:
+        List of validated items.
+
+    Raises:
+        BitwardenError: If the data is not a list.
+    """
+    if not isinstance(items_data, list):
+        raise BitwardenError("Invalid response from Bitwarden: expected a list")
+    return [item for item in map(_validate_item, items_data) if item is not None]
 
 
 def output_error(message: str, exit_code: int = 1) -> NoReturn:
@@ -99,69 +461,210 @@ def output_error(message: str, exit_code: int = 1) -> NoReturn:
     sys.exit(exit_code)
 
 
-def list_items() -> list[BitwardenItem]:
+def list_items(
+    item_name: str | None = None, item_type: int | None = None
+) -> list[BitwardenItem]:
     """
-    List all items in Bitwarden vault.
+    List items in Bitwarden vault, optionally filtered by name and type.
+
+    The filters are checked on the raw data, so only matching items are
+    validated. Invalid items are skipped.
+
+    Args:
+        item_name: Only return items with exactly this name.
+        item_type: Only return items of this Bitwarden item type.
 
     Returns:
-        List of all items in the vault.
+        List of matching items in the vault.
 
     Raises:
         BitwardenError: If listing fails or returns invalid data.
     """
-    result = subprocess.run(
-        ["bw", "list", "items"],
-        capture_output=True,
-        text=True,
-        check=False,
-    )
-    if result.returncode != 0:
-        raise BitwardenError(f"Failed to list Bitwarden items: {result.stderr}")
+    items = []
+    with closing(_iter_items_data("Failed to list Bitwarden items")) as items_data:
+        for raw_item in items_data:
+            if not _matches(raw_item, item_name, item_type):
+                continue
+            item = _validate_item(raw_item)
+            if item is not None:
+                items.append(item)
+    return items
+
+
+def _get_item_data(item_id: str) -> dict[str, Any] | None:
+    """
+    Fetch a single raw item by ID.
 
-    try:
-        items_data = json.loads(result.stdout)
-        if not isinstance(items_data, list):
-            raise BitwardenError("Invalid response from Bitwarden: expected a list")
-        return [BitwardenItem.model_validate(item) for item in items_data]
-    except json.JSONDecodeError as e:
-        raise BitwardenError(f"Failed to parse Bitwarden response: {e}")
-    except ValidationError as e:
-        raise BitwardenError(f"Invalid Bitwarden item format: {e}")
+    Args:
+        item_id: The item ID.
 
+    Returns:
+        The raw item, or None if no item with this ID exists.
 
-def get_all_credentials(item_name: str) -> CredentialStore:
+    Raises:
+        BitwardenError: If reading from Bitwarden fails.
     """
-    Get all credentials from a Bitwarden secure note item.
+    client = get_serve_client()
+    if client is not None:
+        try:
+            data = client.get_item(item_id)
+        except BwServeError as e:
+            if _NOT_FOUND_PATTERN in str(e).lower():
+                return None
+            raise _serve_failure("Failed to get item", e) from e
+    else:
+        result = _run_bw(["get", "item", item_id], "Failed to get item", check=False)
+        if result.returncode != 0:
+            if _NOT_FOUND_PATTERN in result.stderr.lower():
+                return None
+            raise BitwardenError(_classify_failure("Failed to get item", result.stderr))
+        try:
+            data = json.loads(result.stdout)
+        except json.JSONDecodeError as e:
+            raise BitwardenError(f"Failed to parse item: {e}")
+
+    if not isinstance(data, dict):
+        raise BitwardenError("Failed to parse item: expected an object")
+    return data
+
+
+def _get_indexed_item_data(item_name: str, item_type: int) -> dict[str, Any] | None:
+    """
+    Fetch an item through the local ID index without listing the vault.
 
     Args:
-        item_name: The name of the secure note item.
+        item_name: The item name.
+        item_type: The Bitwarden item type.
 
     Returns:
-        Dictionary of credentials (server_url -> StoredCredential).
+        The raw item, or None if the index has no valid entry for it.
+
+    Raises:
+        BitwardenError: If reading from Bitwarden fails.
+    """
+    item_id = lookup_item_id(item_name, item_type)
+    if not item_id:
+        return None
+
+    data = _get_item_data(item_id)
+    if data is None or data.get("name") != item_name or data.get("type") != item_type:
+        # Deleted, renamed, or from another account: fall back to a listing
+        forget_item_id(item_name, item_type)
+        return None
+    return data
+
+
+def _find_item_data(item_name: str, item_type: int) -> dict[str, Any] | None:
+    """
+    Find a raw item by name and type.
+
+    The local ID index is tried first; the vault is only listed if the index
+    has no entry or the entry is stale.
+
+    Args:
+        item_name: The item name.
+        item_type: The Bitwarden item type.
+
+    Returns:
+        The raw item, or None if the vault has no such item.
+
+    Raises:
+        BitwardenError: If reading from Bitwarden fails.
+    """
+    data = _get_indexed_item_data(item_name, item_type)
+    if data is not None:
+        return data
+
+    # Stop listing at the first match
+    with closing(_iter_items_data("Failed to list Bitwarden items")) as items:
+        for item in items:
+            if _matches(item, item_name, item_type) and isinstance(item.get("id"), str):
+                remember_item_id(item_name, item_type, item["id"])
+                return item
+    return None
+
+
+def find_items_data(
+    item_names: Collection[str], item_type: int, search_term: str | None = None
+) -> dict[str, dict[str, Any]]:
+    """
+    List the vault once and collect every item with one of the given names.
+
+    Found items are also remembered in the local ID index.
+
+    Args:
+        item_names: Names of the items to look for.
+        item_type: The Bitwarden item type.
+        search_term: A term all the names contain, to list only the matching
+            items instead of the whole vault.
+
+    Returns:
+        The raw items that exist in the vault, keyed by name.
+
+    Raises:
+        BitwardenError: If listing fails.
+    """
+    found: dict[str, dict[str, Any]] = {}
+    with closing(
+        _iter_items_data("Failed to list Bitwarden items", search_term)
+    ) as items:
+        for item in items:
+            if (
+                _matches(item, None, item_type)
+                and item.get("name") in item_names
+                and isinstance(item.get("id"), str)
+            ):
+                remember_item_id(item["name"], item_type, item["id"])
+                found.setdefault(item["name"], item)
+                if len(found) == len(item_names):
+                    break
+    return found
+
+
+def find_item(item_name: str, item_type: int) -> BitwardenItem | None:
+    """
+    Find an item by name and type.
+
+    Args:
+        item_name: The item name.
+        item_type: The Bitwarden item type.
+
+    Returns:
+        The item, or None if the vault has no such item.
 
     Raises:
         BitwardenError: If reading from Bitwarden fails.
     """
+    data = _find_item_data(item_name, item_type)
+    if data is None:
+        return None
     try:
-        items = list_items()
-    except BitwardenError:
-        raise
+        return BitwardenItem.model_validate(data)
+    except ValidationError as e:
+        raise BitwardenError(f"Invalid Bitwarden item format: {e}")
 
-    # Find the credentials item (type 2 = secure note)
-    cred_item = None
-    for item in items:
-        if item.name == item_name and item.type == 2:
-            cred_item = item
-            break
 
-    if not cred_item:
+def _parse_credentials(item: BitwardenItem | None) -> CredentialStore:
+    """
+    Parse the credentials stored in a secure note.
+
+    Args:
+        item: The secure note item, or None if it does not exist.
+
+    Returns:
+        Dictionary of credentials (server_url -> StoredCredential).
+
+    Raises:
+        BitwardenError: If the stored credentials are malformed.
+    """
+    if not item:
         return {}
 
-    # Parse notes field as JSON
-    notes = cred_item.notes or "{}"
+    # Parse notes field: an envelope, or plain JSON from older versions
+    notes = item.notes or "{}"
 
     try:
-        credentials_data = json.loads(notes)
+        credentials_data = decode_payload(notes)
         if not isinstance(credentials_data, dict):
             return {}
         # Validate and convert to StoredCredential instances
@@ -169,110 +672,279 @@ def get_all_credentials(item_name: str) -> CredentialStore:
             url: StoredCredential.model_validate(cred)
             for url, cred in credentials_data.items()
         }
+    except EnvelopeError as e:
+        raise BitwardenError(str(e))
     except json.JSONDecodeError:
         return {}
     except ValidationError as e:
         raise BitwardenError(f"Invalid credential format in storage: {e}")
 
 
-def save_all_credentials(item_name: str, credentials: CredentialStore) -> None:
+def get_all_credentials(item_name: str) -> CredentialStore:
     """
-    Save all credentials to a Bitwarden secure note item.
+    Get all credentials from a Bitwarden secure note item.
 
     Args:
         item_name: The name of the secure note item.
-        credentials: Dictionary of credentials to save.
+
+    Returns:
+        Dictionary of credentials (server_url -> StoredCredential).
 
     Raises:
-        BitwardenError: If saving to Bitwarden fails.
+        BitwardenError: If reading from Bitwarden fails.
     """
-    # Convert StoredCredential instances to dict for JSON serialization
-    credentials_dict = {url: cred.model_dump() for url, cred in credentials.items()}
-    credentials_json = json.dumps(credentials_dict)
+    # Find the credentials item (type 2 = secure note)
+    return _parse_credentials(find_item(item_name, SECURE_NOTE_TYPE))
 
-    try:
-        items = list_items()
-    except BitwardenError:
-        raise
-
-    # Find existing item
-    item_id = None
-    for item in items:
-        if item.name == item_name and item.type == 2:
-            item_id = item.id
-            break
 
-    if item_id:
-        # Update existing item
-        # Read current item to preserve other fields
-        result = subprocess.run(
-            ["bw", "get", "item", item_id],
-            capture_output=True,
-            text=True,
-            check=False,
-        )
-        if result.returncode != 0:
-            raise BitwardenError(f"Failed to get item: {result.stderr}")
+def encode_item(item: dict[str, Any]) -> str:
+    """
+    Encode an item the way ``bw encode`` does.
+
+    ``bw encode`` reads its input as UTF-8 and prints it base64-encoded with a
+    trailing newline. Doing this in-process saves a Node.js startup per write.
+
+    Args:
+        item: The item to encode.
+
+    Returns:
+        The encoded item, byte-identical to the output of ``bw encode``.
+    """
+    text = json.dumps(item, ensure_ascii=False)
+    return base64.b64encode(text.encode("utf-8")).decode("ascii") + "\n"
+
 
+def _edit_item(item_id: str, item: dict[str, Any]) -> None:
+    """
+    Replace an existing item.
+
+    Raises:
+        BitwardenError: If the update fails.
+    """
+    client = get_serve_client()
+    if client is not None:
         try:
-            current_item = json.loads(result.stdout)
-            current_item["notes"] = credentials_json
+            client.edit_item(item_id, item)
+        except BwServeError as e:
+            raise _serve_failure("Failed to update item", e) from e
+        return
 
-            # Encode and update
-            encode_result = subprocess.run(
-                ["bw", "encode"],
-                input=json.dumps(current_item),
-                capture_output=True,
-                text=True,
-                check=False,
-            )
-            if encode_result.returncode != 0:
-                raise BitwardenError(f"Failed to encode item: {encode_result.stderr}")
+    _run_bw(["edit", "item", item_id], "Failed to update item", input=encode_item(item))
 
-            update_result = subprocess.run(
-                ["bw", "edit", "item", item_id],
-                input=encode_result.stdout,
-                capture_output=True,
-                text=True,
-                check=False,
-            )
-            if update_result.returncode != 0:
-                raise BitwardenError(f"Failed to update item: {update_result.stderr}")
-        except json.JSONDecodeError as e:
-            raise BitwardenError(f"Failed to parse item: {e}")
-    else:
-        # Create new secure note item
-        new_item = {
-            "type": 2,
-            "name": item_name,
-            "notes": credentials_json,
-            "secureNote": {"type": 0},
-        }
 
-        # Encode and create
-        encode_result = subprocess.run(
-            ["bw", "encode"],
-            input=json.dumps(new_item),
-            capture_output=True,
-            text=True,
-            check=False,
+def _create_item(item: dict[str, Any]) -> str | None:
+    """
+    Create a new item.
+
+    Returns:
+        The ID of the created item, if Bitwarden reported it.
+
+    Raises:
+        BitwardenError: If the creation fails.
+    """
+    client = get_serve_client()
+    if client is not None:
+        try:
+            created = client.create_item(item)
+        except BwServeError as e:
+            raise _serve_failure("Failed to create item", e) from e
+    else:
+        # A create that failed on the network may still have been applied;
+        # retrying it could leave a duplicate item
+        result = _run_bw(
+            ["create", "item"],
+            "Failed to create item",
+            input=encode_item(item),
+            retry=False,
         )
-        if encode_result.returncode != 0:
-            raise BitwardenError(f"Failed to encode item: {encode_result.stderr}")
-
-        create_result = subprocess.run(
-            ["bw", "create", "item"],
-            input=encode_result.stdout,
-            capture_output=True,
-            text=True,
-            check=False,
+        try:
+            created = json.loads(result.stdout)
+        except json.JSONDecodeError:
+            return None
+
+    item_id = created.get("id") if isinstance(created, dict) else None
+    return item_id if isinstance(item_id, str) else None
+
+
+def _delete_item(item_id: str) -> None:
+    """
+    Move an item to the trash.
+
+    Raises:
+        BitwardenError: If the deletion fails.
+    """
+    client = get_serve_client()
+    if client is not None:
+        try:
+            client.delete_item(item_id)
+        except BwServeError as e:
+            raise _serve_failure("Failed to delete item", e) from e
+        return
+
+    _run_bw(["delete", "item", item_id], "Failed to delete item")
+
+
+def sync_vault() -> None:
+    """Sync the vault with the server, ignoring failures."""
+    client = get_serve_client()
+    if client is not None:
+        try:
+            client.sync()
+        except BwServeError:
+            pass
+        return
+
+    try:
+        # Retrying would only delay the write whose result is already known
+        _run_bw(["sync"], "Failed to sync", check=False, retry=False)
+    except BitwardenError as e:
+        # The write already happened; a slow sync must not fail it
+        _LOGGER.warning("Skipped vault sync: %s", e)
+
+
+class CredentialTransaction:
+    """Read-modify-write access to the credential secure note.
+
+    The note is fetched once when the transaction begins. ``commit`` writes the
+    modified store back using the item it already holds, so a write costs no
+    further vault reads.
+
+    Usage:
+        txn = CredentialTransaction.begin("docker-credentials")
+        txn.credentials["https://ghcr.io"] = StoredCredential(...)
+        txn.commit()
+    """
+
+    def __init__(
+        self,
+        item_name: str,
+        item_data: dict[str, Any] | None,
+        credentials: CredentialStore,
+    ) -> None:
+        self.item_name = item_name
+        self.credentials = credentials
+        self._item_data = item_data
+
+    @classmethod
+    def begin(cls, item_name: str) -> "CredentialTransaction":
+        """
+        Fetch the secure note and parse its credentials.
+
+        Args:
+            item_name: The name of the secure note item.
+
+        Returns:
+            The transaction.
+
+        Raises:
+            BitwardenError: If reading from Bitwarden fails.
+        """
+        # Find the credentials item (type 2 = secure note)
+        return cls.from_item_data(
+            item_name, _find_item_data(item_name, SECURE_NOTE_TYPE)
         )
-        if create_result.returncode != 0:
-            raise BitwardenError(f"Failed to create item: {create_result.stderr}")
 
+    @classmethod
+    def from_item_data(
+        cls, item_name: str, item_data: dict[str, Any] | None
+    ) -> "CredentialTransaction":
+        """
+        Start a transaction on a secure note that was already fetched.
+
+        Args:
+            item_name: The name of the secure note item.
+            item_data: The raw item, or None if it does not exist.
+
+        Returns:
+            The transaction.
+
+        Raises:
+            BitwardenError: If the item is malformed.
+        """
+        item = None
+        if item_data is not None:
+            try:
+                item = BitwardenItem.model_validate(item_data)
+            except ValidationError as e:
+                raise BitwardenError(f"Invalid Bitwarden item format: {e}")
+        return cls(item_name, item_data, _parse_credentials(item))
+
+    @property
+    def exists(self) -> bool:
+        """Whether the secure note exists in the vault."""
+        return self._item_data is not None
+
+    def commit(self, *, sync: bool = True) -> None:
+        """
+        Write the credentials back to Bitwarden.
+
+        Args:
+            sync: Sync the vault afterwards. Callers committing several notes
+                pass False and sync once at the end.
+
+        Raises:
+            BitwardenError: If saving to Bitwarden fails.
+        """
+        # Convert StoredCredential instances to dict for JSON serialization
+        credentials_dict = {
+            url: cred.model_dump() for url, cred in self.credentials.items()
+        }
+        # Always written in the current format, upgrading plain JSON notes
+        credentials_json = encode_payload(credentials_dict)
+
+        if self._item_data is not None:
+            # Update existing item, preserving its other fields
+            self._item_data["notes"] = credentials_json
+            _edit_item(self._item_data["id"], self._item_data)
+        else:
+            # Create new secure note item
+            new_item = {
+                "type": SECURE_NOTE_TYPE,
+                "name": self.item_name,
+                "notes": credentials_json,
+                "secureNote": {"type": 0},
+            }
+            item_id = _create_item(new_item)
+            if item_id:
+                remember_item_id(self.item_name, SECURE_NOTE_TYPE, item_id)
+                self._item_data = new_item | {"id": item_id}
+
+        if sync:
+            sync_after_write()
+
+    def delete(self) -> None:
+        """
+        Move the secure note to the trash, if it exists.
+
+        Raises:
+            BitwardenError: If the deletion fails.
+        """
+        if self._item_data is None:
+            return
+        _delete_item(self._item_data["id"])
+        forget_item_id(self.item_name, SECURE_NOTE_TYPE)
+        self._item_data = None
+
+
+def sync_after_write() -> None:
+    """Sync the vault after a write, in the background if so configured."""
     # Sync (ignore errors)
-    subprocess.run(
-        ["bw", "sync"],
-        capture_output=True,
-        check=False,
-    )
+    if is_sync_deferred():
+        request_sync()
+    else:
+        sync_vault()
+
+
+def save_all_credentials(item_name: str, credentials: CredentialStore) -> None:
+    """
+    Save all credentials to a Bitwarden secure note item.
+
+    Args:
+        item_name: The name of the secure note item.
+        credentials: Dictionary of credentials to save.
+
+    Raises:
+        BitwardenError: If saving to Bitwarden fails.
+    """
+    item_data = _find_item_data(item_name, SECURE_NOTE_TYPE)
+    CredentialTransaction(item_name, item_data, credentials).commit()
@@ -0,0 +1,307 @@
+"""Encrypted on-disk cache for the Docker credential helper.
+
+Docker calls the helper once per image, so a single ``docker compose pull`` can
+list the whole vault dozens of times. This module keeps recently read data on
+disk, encrypted with a key derived from ``BW_SESSION``, so repeated calls can be
+answered without starting ``bw`` at all.
+
+Entries are only readable with the session they were written under and expire
+after a configurable TTL. Without ``BW_SESSION`` the cache is disabled.
+
+When Bitwarden does not answer before the invocation's deadline, an expired
+entry of the same session is served instead of failing.
+
+Lookups that found nothing are remembered separately for a shorter time, so
+Docker asking about public registries during a build does not start ``bw``
+for every image.
+
+Environment variables:
+    DOCKER_CREDENTIAL_BW_CACHE_TTL: Entry lifetime in seconds (default: 300).
+    DOCKER_CREDENTIAL_BW_NEGATIVE_TTL: Lifetime of remembered misses in seconds
+        (default: 60).
+    DOCKER_CREDENTIAL_BW_NO_CACHE: Set to a non-empty value to bypass the cache.
+"""
+
+import base64
+import json
+import os
+import tempfile
+import time
+from logging import getLogger
+from pathlib import Path
+
+from cryptography.fernet import Fernet, InvalidToken
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+from pydantic import TypeAdapter, ValidationError
+
+from .types import BitwardenItem, CredentialStore
+
+_LOGGER = getLogger(__name__)
+
+ENV_SESSION = "BW_SESSION"
+ENV_CACHE_TTL = "DOCKER_CREDENTIAL_BW_CACHE_TTL"
+ENV_NO_CACHE = "DOCKER_CREDENTIAL_BW_NO_CACHE"
+ENV_NEGATIVE_TTL = "DOCKER_CREDENTIAL_BW_NEGATIVE_TTL"
+
+_DEFAULT_TTL = 300
+_DEFAULT_NEGATIVE_TTL = 60
+_CACHE_DIR_NAME = "docker-credential-bw"
+
+STORE_ADAPTER: TypeAdapter[CredentialStore] = TypeAdapter(CredentialStore)
+_ITEMS_ADAPTER: TypeAdapter[list[BitwardenItem]] = TypeAdapter(list[BitwardenItem])
+
+
+def cache_dir() -> Path:
+    """Return the directory holding the helper's cache files."""
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return Path(base) / _CACHE_DIR_NAME
+
+
+def write_atomic(path: Path, data: bytes) -> None:
+    """
+    Write a private file so readers never observe a partial write.
+
+    Args:
+        path: Destination file; its parent directory is created if needed.
+        data: File contents.
+
+    Raises:
+        OSError: If the file cannot be written.
+    """
+    path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_name, path)
+    except BaseException:
+        os.unlink(tmp_name)
+        raise
+
+
+def derive_key(secret: str, purpose: str) -> bytes:
+    """
+    Derive a Fernet key bound to both a secret and its purpose.
+
+    Args:
+        secret: High-entropy secret, e.g. the Bitwarden session token.
+        purpose: Name of the file the key encrypts.
+
+    Returns:
+        The urlsafe base64-encoded key.
+    """
+    hkdf = HKDF(
+        algorithm=hashes.SHA256(),
+        length=32,
+        salt=None,
+        info=f"docker-credential-bw:{purpose}".encode(),
+    )
+    return base64.urlsafe_b64encode(hkdf.derive(secret.encode()))
+
+
+def _ttl_from_env(name: str = ENV_CACHE_TTL, default: int = _DEFAULT_TTL) -> int:
+    value = os.environ.get(name)
+    if not value:
+        return default
+    try:
+        return max(0, int(value))
+    except ValueError:
+        _LOGGER.warning("Ignoring invalid %s=%r", name, value)
+        return default
+
+
+class EncryptedCache:
+    """A single encrypted cache entry stored in one file.
+
+    Decryption failures (wrong session, tampering, expiry) are treated as a
+    cache miss rather than an error.
+    """
+
+    def __init__(self, path: Path, key: bytes, ttl: int) -> None:
+        self.path = path
+        self._fernet = Fernet(key)
+        self._ttl = ttl
+
+    def load(self, *, allow_stale: bool = False) -> bytes | None:
+        """
+        Return the cached payload, or None on a miss.
+
+        Args:
+            allow_stale: Also return an expired entry, e.g. when Bitwarden did
+                not answer in time.
+        """
+        try:
+            token = self.path.read_bytes()
+        except OSError:
+            return None
+
+        try:
+            if allow_stale:
+                return self._fernet.decrypt(token)
+            return self._fernet.decrypt(token, ttl=self._ttl)
+        except InvalidToken:
+            _LOGGER.debug("Cache entry %s is stale or unreadable", self.path)
+            return None
+
+    def save(self, payload: bytes) -> None:
+        """Encrypt and atomically write the payload."""
+        try:
+            write_atomic(self.path, self._fernet.encrypt(payload))
+        except OSError as e:
+            _LOGGER.warning("Failed to write cache %s: %s", self.path, e)
+
+    def invalidate(self) -> None:
+        """Remove the cache entry if it exists."""
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            _LOGGER.warning("Failed to remove cache %s: %s", self.path, e)
+
+
+class MissCache:
+    """Short-lived record of lookups that found nothing.
+
+    Each miss expires on its own, so recording a new miss does not extend the
+    lifetime of older ones.
+    """
+
+    def __init__(self, cache: EncryptedCache, ttl: int) -> None:
+        self._cache = cache
+        self._ttl = ttl
+
+    def _load(self) -> dict[str, float]:
+        payload = self._cache.load()
+        if payload is None:
+            return {}
+        try:
+            misses = json.loads(payload)
+        except json.JSONDecodeError:
+            return {}
+        return misses if isinstance(misses, dict) else {}
+
+    def contains(self, key: str) -> bool:
+        """Return True if a lookup of the key recently found nothing."""
+        recorded = self._load().get(key)
+        return isinstance(recorded, (int, float)) and (
+            time.time() - recorded < self._ttl
+        )
+
+    def add(self, key: str) -> None:
+        """Remember that a lookup of the key found nothing."""
+        now = time.time()
+        misses = {k: t for k, t in self._load().items() if now - t < self._ttl}
+        misses[key] = now
+        self._cache.save(json.dumps(misses).encode())
+
+    def clear(self) -> None:
+        """Forget all misses, e.g. after credentials were stored."""
+        self._cache.invalidate()
+
+
+def get_cache(name: str, ttl: int | None = None) -> EncryptedCache | None:
+    """
+    Return the cache entry with the given name.
+
+    Args:
+        name: Identifier of the cache entry (used as file name).
+        ttl: Entry lifetime in seconds, instead of the configured one.
+
+    Returns:
+        The cache entry, or None if caching is disabled or no session is set.
+    """
+    if os.environ.get(ENV_NO_CACHE):
+        return None
+    session = os.environ.get(ENV_SESSION)
+    if not session:
+        return None
+    return EncryptedCache(
+        cache_dir() / f"{name}.bin",
+        derive_key(session, name),
+        _ttl_from_env() if ttl is None else ttl,
+    )
+
+
+def get_miss_cache(name: str) -> MissCache | None:
+    """
+    Return the record of recent misses with the given name.
+
+    Args:
+        name: Identifier of the cache entry (used as file name).
+
+    Returns:
+        The miss cache, or None if caching is disabled or no session is set.
+    """
+    ttl = _ttl_from_env(ENV_NEGATIVE_TTL, _DEFAULT_NEGATIVE_TTL)
+    cache = get_cache(name, ttl)
+    return None if cache is None else MissCache(cache, ttl)
+
+
+def load_cached_store(
+    cache: EncryptedCache, *, allow_stale: bool = False
+) -> CredentialStore | None:
+    """
+    Read a credential store from the cache.
+
+    Args:
+        cache: The cache entry to read.
+        allow_stale: Also return an expired entry.
+
+    Returns:
+        The cached credential store, or None on a miss.
+    """
+    payload = cache.load(allow_stale=allow_stale)
+    if payload is None:
+        return None
+    try:
+        return STORE_ADAPTER.validate_json(payload)
+    except ValidationError:
+        cache.invalidate()
+        return None
+
+
+def save_cached_store(cache: EncryptedCache, credentials: CredentialStore) -> None:
+    """
+    Write a credential store to the cache.
+
+    Args:
+        cache: The cache entry to write.
+        credentials: The credential store to cache.
+    """
+    cache.save(STORE_ADAPTER.dump_json(credentials))
+
+
+def load_cached_items(
+    cache: EncryptedCache, *, allow_stale: bool = False
+) -> list[BitwardenItem] | None:
+    """
+    Read a list of Bitwarden items, e.g. search results, from the cache.
+
+    Args:
+        cache: The cache entry to read.
+        allow_stale: Also return an expired entry.
+
+    Returns:
+        The cached items, or None on a miss.
+    """
+    payload = cache.load(allow_stale=allow_stale)
+    if payload is None:
+        return None
+    try:
+        return _ITEMS_ADAPTER.validate_json(payload)
+    except ValidationError:
+        cache.invalidate()
+        return None
+
+
+def save_cached_items(cache: EncryptedCache, items: list[BitwardenItem]) -> None:
+    """
+    Write a list of Bitwarden items to the cache.
+
+    Args:
+        cache: The cache entry to write.
+        items: The items to cache.
+    """
+    cache.save(_ITEMS_ADAPTER.dump_json(items))
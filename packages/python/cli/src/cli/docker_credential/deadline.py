@@ -0,0 +1,79 @@
+"""Time budget shared by the Bitwarden calls of one helper invocation.
+
+Docker waits for the credential helper without a timeout of its own, so a slow
+Bitwarden server used to hang ``docker pull`` for minutes. Each invocation now
+gets one deadline; every ``bw`` subprocess (or ``bw serve`` request) is given
+whatever is left of it and killed when it runs out.
+
+Environment variables:
+    DOCKER_CREDENTIAL_BW_TIMEOUT: Seconds one invocation may spend on
+        Bitwarden (default: 30). 0 disables the deadline.
+"""
+
+import os
+import time
+from logging import getLogger
+
+_LOGGER = getLogger(__name__)
+
+ENV_TIMEOUT = "DOCKER_CREDENTIAL_BW_TIMEOUT"
+
+_DEFAULT_TIMEOUT = 30.0
+
+# Monotonic time the current invocation must finish by, and its budget
+_deadline: float | None = None
+_budget: float | None = None
+
+
+def timeout_from_env() -> float | None:
+    """
+    Return the configured budget of one invocation.
+
+    Returns:
+        The budget in seconds, or None if the deadline is disabled.
+    """
+    value = os.environ.get(ENV_TIMEOUT)
+    if not value:
+        return _DEFAULT_TIMEOUT
+    try:
+        timeout = float(value)
+    except ValueError:
+        _LOGGER.warning("Ignoring invalid %s=%r", ENV_TIMEOUT, value)
+        return _DEFAULT_TIMEOUT
+    return timeout if timeout > 0 else None
+
+
+def start_deadline(timeout: float | None = None) -> None:
+    """
+    Start the budget of this invocation.
+
+    Args:
+        timeout: Budget in seconds, instead of the configured one.
+    """
+    global _deadline, _budget
+    _budget = timeout if timeout is not None else timeout_from_env()
+    _deadline = None if _budget is None else time.monotonic() + _budget
+
+
+def clear_deadline() -> None:
+    """Remove the deadline, e.g. in long-running background workers."""
+    global _deadline, _budget
+    _deadline = _budget = None
+
+
+def remaining() -> float | None:
+    """
+    Return the time left for Bitwarden calls.
+
+    Returns:
+        Seconds until the deadline (at most 0 once it passed), or None
+        without a deadline.
+    """
+    if _deadline is None:
+        return None
+    return max(0.0, _deadline - time.monotonic())
+
+
+def budget() -> float | None:
+    """Return the budget the current deadline was started with."""
+    return _budget
@@ -0,0 +1,72 @@
+"""Versioned, compact encoding of the credential store in a note.
+
+The store used to be saved as plain ``json.dumps`` output. Tokens for ECR,
+GCR and similar registries are long and repetitive, so the store is now saved
+as compressed JSON in a small envelope::
+
+    docker-credential-bw:1:<base64 of zlib-compressed compact JSON>
+
+The header makes the format self-describing: readers detect it automatically
+and fall back to plain JSON for notes written by older versions, which are
+upgraded on the next write. An unknown version is an error rather than being
+mistaken for an empty store and overwritten.
+"""
+
+import base64
+import binascii
+import json
+import zlib
+from typing import Any
+
+_PREFIX = "docker-credential-bw:"
+_VERSION = 1
+
+
+class EnvelopeError(ValueError):
+    """Exception raised when an enveloped payload cannot be decoded."""
+
+
+def encode_payload(data: object) -> str:
+    """
+    Encode JSON-serializable data in the current envelope format.
+
+    Args:
+        data: The data to encode.
+
+    Returns:
+        The envelope text.
+    """
+    raw = json.dumps(data, separators=(",", ":")).encode()
+    body = base64.b64encode(zlib.compress(raw, 9)).decode("ascii")
+    return f"{_PREFIX}{_VERSION}:{body}"
+
+
+def is_enveloped(text: str) -> bool:
+    """Return True if the text uses the envelope rather than plain JSON."""
+    return text.startswith(_PREFIX)
+
+
+def decode_payload(text: str) -> Any:
+    """
+    Decode an envelope, or plain JSON written before the envelope existed.
+
+    Args:
+        text: The stored text.
+
+    Returns:
+        The decoded JSON data.
+
+    Raises:
+        EnvelopeError: If the envelope is malformed or has an unknown version.
+        json.JSONDecodeError: If plain text is not valid JSON.
+    """
+    if not is_enveloped(text):
+        return json.loads(text)
+
+    version, sep, body = text[len(_PREFIX) :].partition(":")
+    if not sep or version != str(_VERSION):
+        raise EnvelopeError(f"Unsupported credential format version: {version}")
+    try:
+        return json.loads(zlib.decompress(base64.b64decode(body, validate=True)))
+    except (binascii.Error, zlib.error, ValueError) as e:
+        raise EnvelopeError(f"Corrupted credential payload: {e}") from e
@@ -0,0 +1,89 @@
+"""Local index from Bitwarden item name and type to item ID.
+
+Finding the credential note by name otherwise requires ``bw list items``, which
+dumps and validates the whole vault. Remembering the item ID lets the helper
+fetch the note directly with ``bw get item <id>``.
+
+The index only holds item IDs, never item contents. Entries are hints: callers
+must verify the fetched item and fall back to a full listing when an ID is gone
+or points to a different item.
+"""
+
+import json
+from logging import getLogger
+from pathlib import Path
+
+from .cache import cache_dir, write_atomic
+
+_LOGGER = getLogger(__name__)
+
+_INDEX_FILE_NAME = "item-index.json"
+
+
+def _index_path() -> Path:
+    return cache_dir() / _INDEX_FILE_NAME
+
+
+def _key(item_name: str, item_type: int) -> str:
+    return f"{item_type}:{item_name}"
+
+
+def _load() -> dict[str, str]:
+    try:
+        data = json.loads(_index_path().read_text())
+    except (OSError, json.JSONDecodeError):
+        return {}
+    if not isinstance(data, dict):
+        return {}
+    return {k: v for k, v in data.items() if isinstance(v, str)}
+
+
+def _save(index: dict[str, str]) -> None:
+    path = _index_path()
+    try:
+        write_atomic(path, json.dumps(index).encode())
+    except OSError as e:
+        _LOGGER.warning("Failed to write item index %s: %s", path, e)
+
+
+def lookup_item_id(item_name: str, item_type: int) -> str | None:
+    """
+    Return the remembered ID of an item.
+
+    Args:
+        item_name: The item name.
+        item_type: The Bitwarden item type.
+
+    Returns:
+        The item ID, or None if it is not known.
+    """
+    return _load().get(_key(item_name, item_type))
+
+
+def remember_item_id(item_name: str, item_type: int, item_id: str) -> None:
+    """
+    Record the ID of an item.
+
+    Args:
+        item_name: The item name.
+        item_type: The Bitwarden item type.
+        item_id: The item ID.
+    """
+    index = _load()
+    if index.get(_key(item_name, item_type)) == item_id:
+        return
+    index[_key(item_name, item_type)] = item_id
+    _save(index)
+
+
+def forget_item_id(item_name: str, item_type: int) -> None:
+    """
+    Drop a stale entry from the index.
+
+    Args:
+        item_name: The item name.
+        item_type: The Bitwarden item type.
+    """
+    index = _load()
+    if index.pop(_key(item_name, item_type), None) is not None:
+        _save(index)
@@ -0,0 +1,222 @@
+"""Cross-process coalescing of writes to the credential secure note.
+
+All credentials live in one secure note, so every ``store`` or ``erase`` is a
+read-modify-write of the same item. Helpers started in parallel (buildx bake,
+matrix CI jobs on one runner) would otherwise serialize on Bitwarden and
+overwrite each other's updates.
+
+Each writer first records its change as a file in a local journal and then
+takes an exclusive lock. Whoever gets the lock while its own entry is still
+pending becomes the leader: it merges every queued entry into a single update,
+commits it, and records the outcome for each entry. Writers that were queued
+behind it find their entry already applied once they get the lock, and simply
+report the recorded outcome.
+
+Entries are written atomically and only removed after their outcome has been
+recorded, so a crashed leader leaves its work for the next writer to finish.
+They hold credentials, so like the cache they are encrypted with a key derived
+from ``BW_SESSION``. Without a session nothing is journaled: writers still take
+the lock, but each applies only its own changes.
+
+Each backend has a journal of its own, so a writer never applies changes
+queued for another backend.
+"""
+
+import fcntl
+import json
+import os
+import time
+import uuid
+from collections.abc import Callable, Iterable
+from logging import getLogger
+from pathlib import Path
+from typing import IO
+
+from cryptography.fernet import Fernet, InvalidToken
+from pydantic import TypeAdapter, ValidationError
+
+from .bitwarden import BitwardenError
+from .cache import ENV_SESSION, cache_dir, derive_key, write_atomic
+from .registry import registry_key
+from .types import StoredCredential
+
+_LOGGER = getLogger(__name__)
+
+# Server URL -> new credential, or None to erase it
+CredentialChanges = dict[str, StoredCredential | None]
+
+CHANGES_ADAPTER: TypeAdapter[CredentialChanges] = TypeAdapter(CredentialChanges)
+
+JOURNAL_NAME = "journal"
+_ENTRY_SUFFIX = ".bin"
+_RESULT_SUFFIX = ".done"
+
+
+def merge_changes(batches: Iterable[CredentialChanges]) -> CredentialChanges:
+    """
+    Merge batches of changes so that applying the result equals applying each.
+
+    A change replaces every earlier change to an equivalent form of its URL,
+    so e.g. storing ``ghcr.io`` after erasing ``https://ghcr.io`` stores it.
+
+    Args:
+        batches: Changes in the order they were made.
+
+    Returns:
+        The merged changes.
+    """
+    merged: dict[str, tuple[str, StoredCredential | None]] = {}
+    for changes in batches:
+        for url, credential in changes.items():
+            key = registry_key(url)
+            # Re-insert so the surviving change keeps its position
+            merged.pop(key, None)
+            merged[key] = (url, credential)
+    return dict(merged.values())
+
+
+def _journal_dir(name: str) -> Path:
+    return cache_dir() / name
+
+
+def _journal_cipher(name: str) -> Fernet | None:
+    """Return the cipher of a journal's entries, or None without a session."""
+    session = os.environ.get(ENV_SESSION)
+    return Fernet(derive_key(session, name)) if session else None
+
+
+def _open_lock(name: str) -> IO[bytes]:
+    """Open the lock file serializing the writers of a journal."""
+    directory = cache_dir()
+    directory.mkdir(mode=0o700, parents=True, exist_ok=True)
+    return open(directory / f"{name}.lock", "ab")
+
+
+def _add_entry(
+    changes: CredentialChanges, cipher: Fernet, name: str = JOURNAL_NAME
+) -> Path:
+    """Record changes in the named journal and return the entry path."""
+    # Names sort in arrival order, so later writes win when merging
+    entry_name = f"{time.time_ns():020d}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+    path = _journal_dir(name) / f"{entry_name}{_ENTRY_SUFFIX}"
+    write_atomic(path, cipher.encrypt(CHANGES_ADAPTER.dump_json(changes)))
+    return path
+
+
+def _pending_entries(
+    journal_dir: Path, cipher: Fernet
+) -> list[tuple[Path, CredentialChanges]]:
+    """Read all queued entries in arrival order, dropping unreadable ones."""
+    entries = []
+    for path in sorted(journal_dir.glob(f"*{_ENTRY_SUFFIX}")):
+        try:
+            changes = CHANGES_ADAPTER.validate_json(cipher.decrypt(path.read_bytes()))
+        except (OSError, InvalidToken, ValidationError) as e:
+            # Also entries of an earlier session, which can no longer be read
+            _LOGGER.warning("Dropping unreadable journal entry %s: %r", path, e)
+            path.unlink(missing_ok=True)
+            continue
+        entries.append((path, changes))
+    return entries
+
+
+def _result_path(entry: Path) -> Path:
+    return entry.with_suffix(_RESULT_SUFFIX)
+
+
+def _take_result(entry: Path) -> None:
+    """
+    Consume the outcome recorded for an entry applied by another writer.
+
+    Raises:
+        BitwardenError: If the merged update containing the entry failed.
+    """
+    result_path = _result_path(entry)
+    try:
+        result = json.loads(result_path.read_text())
+    except (OSError, json.JSONDecodeError):
+        # Outcome lost (e.g. removed by hand); the entry was committed or
+        # reported before its result was written, so assume success
+        return
+    finally:
+        result_path.unlink(missing_ok=True)
+
+    error = result.get("error") if isinstance(result, dict) else None
+    if error:
+        raise BitwardenError(error)
+
+
+def _drain(
+    own_entry: Path, cipher: Fernet, apply: Callable[[CredentialChanges], None]
+) -> None:
+    """
+    Apply every queued entry as one merged update.
+
+    Raises:
+        BitwardenError: If the merged update fails.
+    """
+    entries = _pending_entries(own_entry.parent, cipher)
+    merged = merge_changes(changes for _, changes in entries)
+
+    error: BitwardenError | None = None
+    try:
+        apply(merged)
+    except BitwardenError as e:
+        error = e
+
+    for path, _ in entries:
+        if path != own_entry:
+            write_atomic(
+                _result_path(path),
+                json.dumps({"error": str(error) if error else None}).encode(),
+            )
+        path.unlink(missing_ok=True)
+
+    if error is not None:
+        raise error
+
+
+def submit_changes(
+    changes: CredentialChanges,
+    apply: Callable[[CredentialChanges], None],
+    name: str = JOURNAL_NAME,
+) -> None:
+    """
+    Apply credential changes, coalesced with concurrent writers.
+
+    Blocks until the changes are committed, either by this process or by
+    another helper that merged them into its own update.
+
+    Args:
+        changes: Credentials to store, or None for credentials to erase.
+        apply: Function performing one read-modify-write of the secure note.
+        name: Name of the journal, private to the backend written to.
+
+    Raises:
+        BitwardenError: If the update containing the changes failed.
+    """
+    cipher = _journal_cipher(name)
+    try:
+        lock = _open_lock(name)
+    except OSError as e:
+        # Without a usable journal, fall back to an uncoordinated write
+        _LOGGER.warning("Write journal unavailable: %s", e)
+        apply(changes)
+        return
+
+    with lock:
+        entry = None
+        if cipher is not None:
+            try:
+                entry = _add_entry(changes, cipher, name)
+            except OSError as e:
+                _LOGGER.warning("Write journal unavailable: %s", e)
+
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        if entry is None or cipher is None:
+            # Nothing journaled; write alone, one writer at a time
+            apply(changes)
+        elif entry.exists():
+            _drain(entry, cipher, apply)
+        else:
+            _take_result(entry)
@@ -0,0 +1,91 @@
+"""Incremental parsing of JSON arrays read from a byte stream.
+
+``bw list items`` prints the whole vault as one JSON array. Reading it with
+``json.loads`` holds the raw output, the decoded text and every parsed item in
+memory at once. The parser here reads the pipe in fixed-size chunks and yields
+one element at a time, so only the element being decoded is buffered and the
+caller can stop as soon as it finds what it is looking for.
+"""
+
+import codecs
+import json
+from collections.abc import Iterator
+from typing import IO, Any
+
+_CHUNK_SIZE = 64 * 1024
+_WHITESPACE = " \t\n\r"
+
+
+def iter_json_array(stream: IO[bytes], chunk_size: int = _CHUNK_SIZE) -> Iterator[Any]:
+    """
+    Yield the elements of a JSON array as it is read from a stream.
+
+    Args:
+        stream: Binary stream containing a UTF-8 encoded JSON array.
+        chunk_size: Number of bytes read at a time.
+
+    Yields:
+        Each decoded array element, in order.
+
+    Raises:
+        ValueError: If the stream does not contain a well-formed JSON array.
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder("utf-8")()
+    buf = ""
+    pos = 0
+    eof = False
+
+    def read_more() -> bool:
+        """Append the next chunk to the buffer; False once the stream is done."""
+        nonlocal buf, pos, eof
+        if eof:
+            return False
+        chunk = stream.read(chunk_size)
+        eof = not chunk
+        # Drop what was already consumed so the buffer holds one element at most
+        buf = buf[pos:] + text_decoder.decode(chunk, final=eof)
+        pos = 0
+        return True
+
+    def peek() -> str | None:
+        """Skip whitespace and return the next character, or None at the end."""
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos] in _WHITESPACE:
+                pos += 1
+            if pos < len(buf):
+                return buf[pos]
+            if not read_more():
+                return None
+
+    if peek() != "[":
+        raise ValueError("Expected a JSON array")
+    pos += 1
+    if peek() == "]":
+        pos += 1
+    else:
+        while True:
+            if peek() is None:
+                raise ValueError("Unexpected end of JSON array")
+            try:
+                value, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError as e:
+                if read_more():
+                    continue
+                raise ValueError(str(e)) from e
+            if end == len(buf) and read_more():
+                # A number may continue in the next chunk; decode it again
+                continue
+            pos = end
+            yield value
+
+            separator = peek()
+            pos += 1
+            if separator == "]":
+                break
+            if separator != ",":
+                raise ValueError("Expected ',' or ']' in JSON array")
+
+    if peek() is not None:
+        raise ValueError("Extra data after JSON array")
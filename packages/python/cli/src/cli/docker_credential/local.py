@@ -0,0 +1,216 @@
+"""Credential store kept in a locally encrypted file.
+
+On ephemeral CI runners, logging in to Bitwarden and starting ``bw`` for every
+Docker call costs more than the job itself. This backend keeps the credential
+store in a single file encrypted with a key supplied by the environment, so
+every operation is a local file read or an atomic rewrite.
+
+The key is read from ``DOCKER_CREDENTIAL_BW_LOCAL_KEY``, or printed by the
+command in ``DOCKER_CREDENTIAL_BW_LOCAL_KEY_COMMAND`` (for example
+``secret-tool lookup service docker-credential-bw`` or ``pass show ci/docker``)
+so that it can come from a keyring or agent. It should be a high-entropy secret
+such as the output of ``openssl rand -base64 32``.
+
+Only the credential store is local: docker-credential-bw-docker still searches
+the Bitwarden vault for its Docker Hub login.
+
+Environment variables:
+    DOCKER_CREDENTIAL_BW_LOCAL_FILE: Path of the encrypted store (default:
+        $XDG_DATA_HOME/docker-credential-bw/credentials.bin).
+    DOCKER_CREDENTIAL_BW_LOCAL_KEY: Secret the encryption key is derived from.
+    DOCKER_CREDENTIAL_BW_LOCAL_KEY_COMMAND: Command printing that secret.
+"""
+
+import os
+import shlex
+import subprocess
+from collections.abc import Collection
+from pathlib import Path
+
+from cryptography.fernet import Fernet, InvalidToken
+from pydantic import ValidationError
+
+from .bitwarden import LOGIN_TYPE, BitwardenError, list_items, search_items
+from .cache import STORE_ADAPTER, derive_key, write_atomic
+from .types import BitwardenItem, CredentialStore
+
+ENV_LOCAL_FILE = "DOCKER_CREDENTIAL_BW_LOCAL_FILE"
+ENV_LOCAL_KEY = "DOCKER_CREDENTIAL_BW_LOCAL_KEY"
+ENV_LOCAL_KEY_COMMAND = "DOCKER_CREDENTIAL_BW_LOCAL_KEY_COMMAND"
+
+_DATA_DIR_NAME = "docker-credential-bw"
+_STORE_FILE_NAME = "credentials.bin"
+_KEY_PURPOSE = "local-store"
+
+
+def store_path() -> Path:
+    """Return the path of the encrypted credential file."""
+    path = os.environ.get(ENV_LOCAL_FILE)
+    if path:
+        return Path(path)
+    base = os.environ.get("XDG_DATA_HOME") or os.path.expanduser("~/.local/share")
+    return Path(base) / _DATA_DIR_NAME / _STORE_FILE_NAME
+
+
+def _read_secret() -> str:
+    """
+    Return the secret the encryption key is derived from.
+
+    Raises:
+        BitwardenError: If no secret is configured or the key command fails.
+    """
+    secret = os.environ.get(ENV_LOCAL_KEY)
+    if secret:
+        return secret
+
+    command = os.environ.get(ENV_LOCAL_KEY_COMMAND)
+    if not command:
+        raise BitwardenError(
+            f"Local credential store needs {ENV_LOCAL_KEY} or {ENV_LOCAL_KEY_COMMAND}"
+        )
+    try:
+        result = subprocess.run(
+            shlex.split(command), capture_output=True, text=True, check=True
+        )
+    except (OSError, subprocess.CalledProcessError) as e:
+        raise BitwardenError(f"Failed to get local store key: {e}")
+    secret = result.stdout.strip()
+    if not secret:
+        raise BitwardenError(f"{ENV_LOCAL_KEY_COMMAND} printed no key")
+    return secret
+
+
+class LocalTransaction:
+    """Read-modify-write access to the local credential file."""
+
+    def __init__(self, backend: "LocalFileBackend", credentials: CredentialStore):
+        self._backend = backend
+        self.credentials = credentials
+
+    def commit(self) -> None:
+        """
+        Write the credentials back to the file.
+
+        Raises:
+            BitwardenError: If the file cannot be written.
+        """
+        self._backend.save(self.credentials)
+
+
+class LocalFileBackend:
+    """Credential backend storing everything in one encrypted file."""
+
+    name = "local"
+
+    def __init__(self, path: Path | None = None) -> None:
+        self.path = path or store_path()
+        self._fernet: Fernet | None = None
+
+    def _cipher(self) -> Fernet:
+        if self._fernet is None:
+            self._fernet = Fernet(derive_key(_read_secret(), _KEY_PURPOSE))
+        return self._fernet
+
+    def encrypt(self, payload: bytes) -> bytes:
+        """
+        Encrypt data with the store's key.
+
+        Raises:
+            BitwardenError: If no key is configured.
+        """
+        return self._cipher().encrypt(payload)
+
+    def decrypt(self, token: bytes) -> bytes:
+        """
+        Decrypt data encrypted with the store's key.
+
+        Raises:
+            BitwardenError: If no key is configured, or the data was encrypted
+                with another key or is corrupted.
+        """
+        try:
+            return self._cipher().decrypt(token)
+        except InvalidToken:
+            raise BitwardenError(
+                f"Cannot decrypt data of {self.path}: wrong key or corrupted file"
+            )
+
+    def check(self) -> None:
+        """
+        Make sure the encryption key is available.
+
+        Raises:
+            BitwardenError: If no key is configured.
+        """
+        self._cipher()
+
+    def load(self) -> CredentialStore:
+        """
+        Read all credentials from the file.
+
+        Returns:
+            The credential store, empty if the file does not exist yet.
+
+        Raises:
+            BitwardenError: If the file cannot be read or decrypted.
+        """
+        try:
+            token = self.path.read_bytes()
+        except FileNotFoundError:
+            return {}
+        except OSError as e:
+            raise BitwardenError(f"Failed to read local credential store: {e}")
+
+        try:
+            return STORE_ADAPTER.validate_json(self.decrypt(token))
+        except ValidationError as e:
+            raise BitwardenError(f"Invalid credential format in storage: {e}")
+
+    def save(self, credentials: CredentialStore) -> None:
+        """
+        Atomically replace the file with the given credentials.
+
+        Args:
+            credentials: The complete credential store.
+
+        Raises:
+            BitwardenError: If the file cannot be written.
+        """
+        payload = self.encrypt(STORE_ADAPTER.dump_json(credentials))
+        try:
+            write_atomic(self.path, payload)
+        except OSError as e:
+            raise BitwardenError(f"Failed to write local credential store: {e}")
+
+    def begin(self, server_urls: Collection[str] | None = None) -> LocalTransaction:
+        """
+        Start a read-modify-write of the store.
+
+        Args:
+            server_urls: Unused; the whole file is always read.
+
+        Returns:
+            The transaction.
+
+        Raises:
+            BitwardenError: If the file cannot be read or decrypted.
+        """
+        return LocalTransaction(self, self.load())
+
+    def search(self, term: str) -> list[BitwardenItem]:
+        """
+        Search the Bitwarden vault for login items matching a term.
+
+        Raises:
+            BitwardenError: If the search fails.
+        """
+        return search_items(term)
+
+    def list_logins(self) -> list[BitwardenItem]:
+        """
+        List all login items of the Bitwarden vault.
+
+        Raises:
+            BitwardenError: If listing fails.
+        """
+        return list_items(item_type=LOGIN_TYPE)
@@ -0,0 +1,258 @@
+"""Normalization of registry server URLs.
+
+Docker is not consistent about the form of the server URL it passes to
+credential helpers: the same registry may arrive as ``ghcr.io``,
+``https://ghcr.io`` or ``https://ghcr.io/``, and Docker Hub has several
+aliases. Credentials are therefore looked up by a canonical registry key, so
+every form finds the same entry and writes replace equivalent entries instead
+of adding duplicates.
+
+Keys may also be host patterns in which ``*`` stands for exactly one host
+label, e.g. ``*.dkr.ecr.*.amazonaws.com`` for every ECR registry. Patterns are
+kept in a trie keyed on the reversed host labels, so resolving a host costs
+one step per label no matter how many patterns are stored. Concrete entries
+always take precedence over patterns.
+"""
+
+from collections.abc import Iterable, Iterator, Mapping
+
+from .types import BitwardenItem, CredentialStore, StoredCredential
+
+# Hosts Docker uses for Docker Hub, and the key they all map to
+_DOCKER_HUB_HOSTS = frozenset(
+    {
+        "docker.io",
+        "index.docker.io",
+        "registry-1.docker.io",
+        "registry.hub.docker.com",
+    }
+)
+_DOCKER_HUB_PATHS = frozenset({"", "v1", "v2"})
+_DOCKER_HUB_KEY = "index.docker.io"
+
+_DEFAULT_PORT = ":443"
+
+_WILDCARD = "*"
+
+
+def registry_key(server_url: str) -> str:
+    """
+    Return the canonical key of a registry server URL.
+
+    The scheme, a trailing slash, the default HTTPS port and the case of the
+    host are ignored, and the Docker Hub aliases share one key.
+
+    Args:
+        server_url: The server URL in any form Docker passes it.
+
+    Returns:
+        The canonical key, e.g. ``ghcr.io`` or ``registry.example.com/path``.
+    """
+    url = server_url.strip()
+    _, sep, rest = url.partition("://")
+    if not sep:
+        rest = url
+    host, _, path = rest.partition("/")
+    host = host.lower().removesuffix(_DEFAULT_PORT)
+    path = path.strip("/")
+
+    if host in _DOCKER_HUB_HOSTS and path in _DOCKER_HUB_PATHS:
+        return _DOCKER_HUB_KEY
+    return f"{host}/{path}" if path else host
+
+
+def registry_host(server_url: str) -> str:
+    """Return the canonical host (with port) of a registry server URL."""
+    return registry_key(server_url).partition("/")[0]
+
+
+def credentials_by_uri(items: Iterable[BitwardenItem]) -> CredentialStore:
+    """
+    Map the hosts of login item URIs to the items' credentials.
+
+    Args:
+        items: Bitwarden items, typically one listing of all logins.
+
+    Returns:
+        Credentials keyed by canonical host; the first item listed for a host
+        wins.
+    """
+    credentials: CredentialStore = {}
+    for item in items:
+        login = item.login
+        if not login or not login.username or not login.password:
+            continue
+        for uri in login.uris or []:
+            if uri.uri and (host := registry_host(uri.uri)):
+                credentials.setdefault(
+                    host,
+                    StoredCredential(Username=login.username, Secret=login.password),
+                )
+    return credentials
+
+
+def is_pattern(key: str) -> bool:
+    """Return True if a registry key is a host pattern rather than a host."""
+    host, _, _ = key.partition("/")
+    return _WILDCARD in host.split(".")
+
+
+def _reversed_labels(key: str) -> tuple[list[str], str]:
+    """Split a registry key into its host labels, top-level first, and path."""
+    host, _, path = key.partition("/")
+    return host.split(".")[::-1], path
+
+
+class _LabelTrie:
+    """Trie of host patterns keyed on reversed host labels."""
+
+    __slots__ = ("children", "keys")
+
+    def __init__(self) -> None:
+        self.children: dict[str, _LabelTrie] = {}
+        # Path -> registry key of the patterns ending at this node
+        self.keys: dict[str, str] = {}
+
+    def add(self, key: str) -> None:
+        labels, path = _reversed_labels(key)
+        node = self
+        for label in labels:
+            node = node.children.setdefault(label, _LabelTrie())
+        node.keys[path] = key
+
+    def discard(self, key: str) -> None:
+        labels, path = _reversed_labels(key)
+        node: _LabelTrie | None = self
+        for label in labels:
+            node = node.children.get(label) if node else None
+        if node is not None:
+            node.keys.pop(path, None)
+
+    def match(self, labels: list[str], path: str, depth: int = 0) -> str | None:
+        """
+        Return the key of the most specific pattern matching a host.
+
+        Literal labels are preferred over wildcards, comparing from the
+        top-level domain down.
+        """
+        if depth == len(labels):
+            return self.keys.get(path)
+        for label in (labels[depth], _WILDCARD):
+            child = self.children.get(label)
+            if child is not None:
+                found = child.match(labels, path, depth + 1)
+                if found is not None:
+                    return found
+        return None
+
+
+class RegistryIndex:
+    """Credential store view keyed by canonical registry keys.
+
+    Lookups of concrete entries are constant time; hosts without one are
+    matched against the stored patterns. ``set`` and ``remove`` update the
+    underlying store in place, dropping every entry equivalent to the given
+    URL.
+
+    Usage:
+        index = RegistryIndex(credentials)
+        cred = index.get("ghcr.io")  # finds "https://ghcr.io/"
+    """
+
+    def __init__(self, credentials: CredentialStore) -> None:
+        self.credentials = credentials
+        # Key -> stored URLs, in store order; the last one is served
+        self._urls: dict[str, list[str]] = {}
+        self._patterns = _LabelTrie()
+        for url in credentials:
+            key = registry_key(url)
+            self._urls.setdefault(key, []).append(url)
+            if is_pattern(key):
+                self._patterns.add(key)
+
+    def __contains__(self, server_url: str) -> bool:
+        """Return True if an entry for exactly this registry is stored."""
+        return registry_key(server_url) in self._urls
+
+    def resolve(self, server_url: str) -> str | None:
+        """Return the stored URL or pattern matching a server URL, if any."""
+        key = registry_key(server_url)
+        urls = self._urls.get(key)
+        if not urls:
+            labels, path = _reversed_labels(key)
+            pattern = self._patterns.match(labels, path)
+            urls = self._urls.get(pattern) if pattern else None
+        return urls[-1] if urls else None
+
+    def get(self, server_url: str) -> StoredCredential | None:
+        """Return the credential stored for a server URL in any form."""
+        url = self.resolve(server_url)
+        return None if url is None else self.credentials[url]
+
+    def items(self) -> Iterator[tuple[str, StoredCredential]]:
+        """Iterate over concrete stored credentials, one per registry."""
+        for key, urls in self._urls.items():
+            if not is_pattern(key):
+                yield urls[-1], self.credentials[urls[-1]]
+
+    def set(self, server_url: str, credential: StoredCredential) -> bool:
+        """
+        Store a credential under a server URL, replacing equivalent entries.
+
+        Args:
+            server_url: The server URL to store the credential under.
+            credential: The credential.
+
+        Returns:
+            True if the store changed.
+        """
+        key = registry_key(server_url)
+        old_urls = self._urls.get(key, [])
+        if old_urls == [server_url] and self.credentials[server_url] == credential:
+            return False
+
+        for url in old_urls:
+            del self.credentials[url]
+        self.credentials[server_url] = credential
+        self._urls[key] = [server_url]
+        if is_pattern(key):
+            self._patterns.add(key)
+        return True
+
+    def remove(self, server_url: str) -> bool:
+        """
+        Remove every entry equivalent to a server URL.
+
+        A pattern is only removed when given itself, not by a host it matches.
+
+        Args:
+            server_url: The server URL or pattern in any form.
+
+        Returns:
+            True if the store changed.
+        """
+        key = registry_key(server_url)
+        old_urls = self._urls.pop(key, [])
+        if is_pattern(key):
+            self._patterns.discard(key)
+        for url in old_urls:
+            del self.credentials[url]
+        return bool(old_urls)
+
+    def apply(self, changes: Mapping[str, StoredCredential | None]) -> bool:
+        """
+        Apply several changes in order.
+
+        Args:
+            changes: Credentials to store, or None for credentials to erase.
+
+        Returns:
+            True if the store changed.
+        """
+        changed = False
+        for server_url, credential in changes.items():
+            if credential is None:
+                changed |= self.remove(server_url)
+            else:
+                changed |= self.set(server_url, credential)
+        return changed
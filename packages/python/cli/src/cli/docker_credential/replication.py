@@ -0,0 +1,183 @@
+"""Write-behind replication of the local tier to Bitwarden.
+
+With the tiered backend, ``store`` and ``erase`` only update the local
+encrypted tier and return; the change itself is appended to an outbox next to
+the local file. A detached worker replays the outbox against the Bitwarden
+secure note, merging everything queued into one read-modify-write and retrying
+with exponential backoff while Bitwarden is unavailable.
+
+Outbox entries are encrypted with the local tier's key, written atomically and
+only removed once Bitwarden accepted them, so a crash at any point loses no
+change: entries left behind are replayed by the next worker, which every write
+and every tier seeding starts. An exclusive lock guarantees at most one worker
+replicates at a time.
+"""
+
+import time
+import uuid
+from collections.abc import Callable, Sequence
+from logging import getLogger
+from pathlib import Path
+
+from pydantic import ValidationError
+
+from .bitwarden import BitwardenError
+from .cache import write_atomic
+from .journal import CHANGES_ADAPTER, CredentialChanges, merge_changes
+from .local import LocalFileBackend
+from .worker import run_locked, start_worker
+
+_LOGGER = getLogger(__name__)
+
+_OUTBOX_SUFFIX = ".outbox"
+_ENTRY_SUFFIX = ".bin"
+_LOCK_FILE_NAME = "replicate.lock"
+
+# Seconds to wait before each retry of a failed replication
+_RETRY_DELAYS = (1.0, 2.0, 4.0, 8.0, 16.0)
+
+
+def _outbox_dir(local: LocalFileBackend) -> Path:
+    return local.path.with_name(local.path.name + _OUTBOX_SUFFIX)
+
+
+def enqueue(local: LocalFileBackend, changes: CredentialChanges) -> None:
+    """
+    Durably record changes that still have to reach Bitwarden.
+
+    Args:
+        local: The local tier, whose key encrypts the entry.
+        changes: Credentials to store, or None for credentials to erase.
+
+    Raises:
+        BitwardenError: If the entry cannot be written.
+    """
+    # Names sort in arrival order, so later changes win when merging
+    name = f"{time.time_ns():020d}-{uuid.uuid4().hex[:8]}{_ENTRY_SUFFIX}"
+    payload = local.encrypt(CHANGES_ADAPTER.dump_json(changes))
+    try:
+        write_atomic(_outbox_dir(local) / name, payload)
+    except OSError as e:
+        raise BitwardenError(f"Failed to record change for replication: {e}")
+
+
+def pending_changes(local: LocalFileBackend) -> list[tuple[Path, CredentialChanges]]:
+    """
+    Read the changes not yet replicated, in arrival order.
+
+    Args:
+        local: The local tier, whose key decrypts the entries.
+
+    Returns:
+        Pairs of entry path and changes.
+
+    Raises:
+        BitwardenError: If an entry cannot be decrypted.
+    """
+    entries = []
+    for path in sorted(_outbox_dir(local).glob(f"*{_ENTRY_SUFFIX}")):
+        try:
+            changes = CHANGES_ADAPTER.validate_json(local.decrypt(path.read_bytes()))
+        except FileNotFoundError:
+            continue
+        except (OSError, ValidationError) as e:
+            # Unlike a journal entry, a change is never dropped silently
+            raise BitwardenError(f"Unreadable replication entry {path}: {e}")
+        entries.append((path, changes))
+    return entries
+
+
+def _lock_path(local: LocalFileBackend) -> Path:
+    return _outbox_dir(local) / _LOCK_FILE_NAME
+
+
+def request_replication(local: LocalFileBackend) -> None:
+    """
+    Start a detached replication worker unless one is already running.
+
+    Failures are logged and otherwise ignored; the outbox keeps the changes
+    for the next worker.
+
+    Args:
+        local: The local tier whose outbox to replicate.
+    """
+    try:
+        # A running worker rescans the outbox before it exits
+        start_worker(_lock_path(local), __name__)
+    except OSError as e:
+        _LOGGER.warning("Failed to start replication worker: %s", e)
+
+
+def _replicate_pending(
+    local: LocalFileBackend,
+    apply: Callable[[CredentialChanges], None],
+    delays: Sequence[float],
+) -> bool:
+    """
+    Replicate the outbox until it is empty.
+
+    Returns:
+        True if the outbox was emptied, False if Bitwarden kept failing.
+    """
+    attempt = 0
+    while entries := pending_changes(local):
+        # Later changes win, also over equivalent forms of the same URL
+        merged = merge_changes(changes for _, changes in entries)
+        try:
+            apply(merged)
+        except BitwardenError as e:
+            if attempt >= len(delays):
+                _LOGGER.warning("Giving up replication for now: %s", e)
+                return False
+            _LOGGER.info("Replication failed, retrying: %s", e)
+            time.sleep(delays[attempt])
+            attempt += 1
+            continue
+
+        attempt = 0
+        for path, _ in entries:
+            path.unlink(missing_ok=True)
+    return True
+
+
+def run_worker(
+    local: LocalFileBackend,
+    apply: Callable[[CredentialChanges], None],
+    delays: Sequence[float] = _RETRY_DELAYS,
+) -> None:
+    """
+    Replicate queued changes until none are left or Bitwarden keeps failing.
+
+    Args:
+        local: The local tier whose outbox to replicate.
+        apply: Function applying merged changes to Bitwarden.
+        delays: Seconds to wait before each retry.
+    """
+    run_locked(
+        _lock_path(local),
+        lambda: _replicate_pending(local, apply, delays),
+        lambda: bool(pending_changes(local)),
+    )
+
+
+def main() -> None:
+    """Entry point of the detached worker process."""
+    from .backend import BitwardenBackend
+    from .registry import RegistryIndex
+
+    remote = BitwardenBackend()
+
+    def apply(changes: CredentialChanges) -> None:
+        remote.check()
+        txn = remote.begin(changes.keys())
+        if RegistryIndex(txn.credentials).apply(changes):
+            txn.commit()
+
+    try:
+        run_worker(LocalFileBackend(), apply)
+    except BitwardenError as e:
+        _LOGGER.warning("Replication worker failed: %s", e)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""Retries of transient Bitwarden CLI failures.
+
+Under load, the Bitwarden server answers with rate limits or drops
+connections, and a single failed ``bw`` call used to fail the whole CI job.
+Failures whose error output looks transient are retried with exponential
+backoff and full jitter, so helpers started together by a parallel
+``docker compose pull`` do not retry in lockstep. Other errors, such as a
+locked vault or a missing item, fail immediately.
+
+All waits of one operation stay below a total cap and never run past the
+invocation's deadline (see ``deadline.py``). Retries are logged and counted
+per operation; ``warm`` reports the counts.
+
+Environment variables:
+    DOCKER_CREDENTIAL_BW_RETRIES: Retries of one failed bw call (default: 3).
+        0 disables retries.
+"""
+
+import os
+import random
+import re
+import time
+from collections import Counter
+from logging import getLogger
+
+from .deadline import remaining
+
+_LOGGER = getLogger(__name__)
+
+ENV_RETRIES = "DOCKER_CREDENTIAL_BW_RETRIES"
+
+_DEFAULT_RETRIES = 3
+
+# The wait before retry n (from 0) is drawn from
+# [0, min(_MAX_DELAY, _BASE_DELAY * 2**n)]
+_BASE_DELAY = 0.5
+_MAX_DELAY = 4.0
+# Upper bound on the time one operation spends waiting between attempts
+_MAX_TOTAL_DELAY = 10.0
+
+# HTTP status codes of rate limiting and server overload, as whole words so
+# that item IDs or URLs containing the digits do not match
+_TRANSIENT_STATUS = re.compile(r"\b(429|50[234])\b")
+
+# Fragments of bw error output that a later attempt may not see again:
+# rate limiting, server overload and network errors reported by Node.js
+_TRANSIENT_PATTERNS = (
+    "too many requests",
+    "rate limit",
+    "bad gateway",
+    "service unavailable",
+    "gateway timeout",
+    "econnreset",
+    "econnrefused",
+    "etimedout",
+    "eai_again",
+    "socket hang up",
+    "network error",
+)
+
+_retry_counts: Counter[str] = Counter()
+
+
+def is_transient(stderr: str) -> bool:
+    """
+    Return whether a bw failure is worth retrying.
+
+    Args:
+        stderr: Error output of the failed command.
+    """
+    if _TRANSIENT_STATUS.search(stderr):
+        return True
+    lowered = stderr.lower()
+    return any(pattern in lowered for pattern in _TRANSIENT_PATTERNS)
+
+
+def max_retries() -> int:
+    """Return the configured number of retries of one bw call."""
+    value = os.environ.get(ENV_RETRIES)
+    if not value:
+        return _DEFAULT_RETRIES
+    try:
+        return max(0, int(value))
+    except ValueError:
+        _LOGGER.warning("Ignoring invalid %s=%r", ENV_RETRIES, value)
+        return _DEFAULT_RETRIES
+
+
+def retry_counts() -> dict[str, int]:
+    """Return the number of retries per operation in this process."""
+    return dict(_retry_counts)
+
+
+def reset_retry_counts() -> None:
+    """Forget the recorded retries."""
+    _retry_counts.clear()
+
+
+class Backoff:
+    """Retry state of one operation.
+
+    Usage:
+        backoff = Backoff("list items")
+        while True:
+            result = run()
+            if result.ok or not is_transient(result.stderr):
+                break
+            if not backoff.wait(result.stderr):
+                break
+    """
+
+    def __init__(self, operation: str) -> None:
+        self.operation = operation
+        self.retries = 0
+        self._waited = 0.0
+
+    def wait(self, error: str) -> bool:
+        """
+        Sleep before the next attempt, unless retries or time are used up.
+
+        Args:
+            error: Error output of the failed attempt, for the log.
+
+        Returns:
+            True to try again, False to give up.
+        """
+        if self.retries >= max_retries():
+            return False
+
+        delay = random.uniform(0, min(_MAX_DELAY, _BASE_DELAY * 2**self.retries))
+        left = remaining()
+        if self._waited + delay > _MAX_TOTAL_DELAY or (
+            left is not None and delay >= left
+        ):
+            _LOGGER.info("Not retrying %s: out of time", self.operation)
+            return False
+
+        self.retries += 1
+        self._waited += delay
+        _retry_counts[self.operation] += 1
+        _LOGGER.warning(
+            "bw %s failed, retry %d in %.2fs: %s",
+            self.operation,
+            self.retries,
+            delay,
+            error.strip(),
+        )
+        time.sleep(delay)
+        return True
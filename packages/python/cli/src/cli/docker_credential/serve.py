@@ -0,0 +1,216 @@
+"""Client for the Bitwarden CLI ``bw serve`` REST API.
+
+Every ``bw`` subprocess pays for a full Node.js startup. When a long-running
+``bw serve`` is available, the credential helper can talk to it over HTTP
+instead and reuse a single keep-alive connection for all requests made during
+one invocation.
+
+The backend is enabled by setting ``BW_SERVE_URL`` (for example
+``http://127.0.0.1:8087``). If the server cannot be reached, callers fall back
+to the subprocess implementation.
+"""
+
+import http.client
+import json
+import os
+from logging import getLogger
+from typing import Any
+from urllib.parse import quote, urlencode, urlsplit
+
+from .deadline import remaining
+
+_LOGGER = getLogger(__name__)
+
+ENV_SERVE_URL = "BW_SERVE_URL"
+
+_DEFAULT_TIMEOUT = 60.0
+
+
+class BwServeError(Exception):
+    """Exception raised when ``bw serve`` rejects or fails a request."""
+
+
+class BwServeUnavailableError(BwServeError):
+    """Exception raised when ``bw serve`` cannot be reached at all."""
+
+
+class BwServeTimeoutError(BwServeUnavailableError):
+    """Exception raised when a request runs into the invocation's deadline."""
+
+
+class BwServeClient:
+    """Minimal ``bw serve`` client using one persistent HTTP connection.
+
+    The connection is opened lazily and kept alive between requests. If the
+    server closes an idle connection, the request is retried once on a fresh
+    connection.
+    """
+
+    def __init__(self, base_url: str, timeout: float = _DEFAULT_TIMEOUT) -> None:
+        parts = urlsplit(base_url)
+        if parts.scheme not in ("http", "") or not parts.hostname:
+            raise BwServeError(f"Unsupported bw serve URL: {base_url}")
+        self._host = parts.hostname
+        self._port = parts.port or 8087
+        self._timeout = timeout
+        self._conn: http.client.HTTPConnection | None = None
+
+    def close(self) -> None:
+        """Close the underlying connection."""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _connection(self) -> http.client.HTTPConnection:
+        if self._conn is None:
+            self._conn = http.client.HTTPConnection(
+                self._host, self._port, timeout=self._timeout
+            )
+        return self._conn
+
+    def _send(self, method: str, path: str, body: bytes | None) -> tuple[int, bytes]:
+        headers = {"Accept": "application/json"}
+        if body is not None:
+            headers["Content-Type"] = "application/json"
+        # Never wait on the server past the invocation's deadline
+        timeout = remaining()
+        if timeout is not None and timeout <= 0:
+            raise TimeoutError("deadline passed")
+        conn = self._connection()
+        timeout = self._timeout if timeout is None else min(self._timeout, timeout)
+        conn.timeout = timeout
+        if conn.sock is not None:
+            conn.sock.settimeout(conn.timeout)
+        conn.request(method, path, body=body, headers=headers)
+        response = conn.getresponse()
+        return response.status, response.read()
+
+    def request(self, method: str, path: str, payload: Any = None) -> Any:
+        """
+        Send a request and return the ``data`` member of the response.
+
+        Args:
+            method: HTTP method.
+            path: Request path including the query string.
+            payload: Optional JSON-serializable request body.
+
+        Returns:
+            The ``data`` member of the JSON response.
+
+        Raises:
+            BwServeTimeoutError: If the invocation's deadline passed before
+                the server answered.
+            BwServeUnavailableError: If the server cannot be reached.
+            BwServeError: If the server reports a failure.
+        """
+        body = json.dumps(payload).encode() if payload is not None else None
+
+        try:
+            try:
+                status, raw = self._send(method, path, body)
+            except (http.client.RemoteDisconnected, BrokenPipeError):
+                # Stale keep-alive connection; retry once on a fresh one
+                self.close()
+                status, raw = self._send(method, path, body)
+        except TimeoutError as e:
+            self.close()
+            if remaining() is None:
+                # The client's own timeout; there is no deadline to report
+                raise BwServeUnavailableError(f"bw serve is not reachable: {e}") from e
+            raise BwServeTimeoutError(f"bw serve did not answer: {e}") from e
+        except (OSError, http.client.HTTPException) as e:
+            self.close()
+            raise BwServeUnavailableError(f"bw serve is not reachable: {e}") from e
+
+        try:
+            response = json.loads(raw) if raw else {}
+        except json.JSONDecodeError as e:
+            raise BwServeError(f"Invalid response from bw serve: {e}") from e
+
+        if not isinstance(response, dict):
+            raise BwServeError("Invalid response from bw serve: expected an object")
+        if status >= 400 or not response.get("success", False):
+            message = response.get("message") or f"HTTP {status}"
+            raise BwServeError(str(message))
+        return response.get("data")
+
+    def status(self) -> dict[str, Any]:
+        """Return the vault status template (``bw status`` equivalent)."""
+        data = self.request("GET", "/status")
+        template = data.get("template") if isinstance(data, dict) else None
+        if not isinstance(template, dict):
+            raise BwServeError("Invalid status response from bw serve")
+        return template
+
+    def list_items(self, search: str | None = None) -> Any:
+        """Return the raw item list (``bw list items`` equivalent)."""
+        path = "/list/object/items"
+        if search is not None:
+            path += "?" + urlencode({"search": search})
+        data = self.request("GET", path)
+        return data.get("data") if isinstance(data, dict) else data
+
+    def get_item(self, item_id: str) -> Any:
+        """Return a single raw item (``bw get item`` equivalent)."""
+        return self.request("GET", f"/object/item/{quote(item_id, safe='')}")
+
+    def edit_item(self, item_id: str, item: dict[str, Any]) -> None:
+        """Replace an existing item (``bw edit item`` equivalent)."""
+        self.request("PUT", f"/object/item/{quote(item_id, safe='')}", item)
+
+    def create_item(self, item: dict[str, Any]) -> Any:
+        """Create a new item and return it (``bw create item`` equivalent)."""
+        return self.request("POST", "/object/item", item)
+
+    def delete_item(self, item_id: str) -> None:
+        """Move an item to the trash (``bw delete item`` equivalent)."""
+        self.request("DELETE", f"/object/item/{quote(item_id, safe='')}")
+
+    def sync(self) -> None:
+        """Sync the vault with the server (``bw sync`` equivalent)."""
+        self.request("POST", "/sync")
+
+
+_client: BwServeClient | None = None
+_probed = False
+
+
+def get_serve_client() -> BwServeClient | None:
+    """
+    Return the shared ``bw serve`` client, if one is configured and reachable.
+
+    The first call probes the server once; the result is reused for the rest
+    of the process so an unreachable server costs at most one failed connect.
+
+    Returns:
+        The client, or None when the subprocess implementation should be used.
+    """
+    global _client, _probed
+
+    if _probed:
+        return _client
+    _probed = True
+
+    base_url = os.environ.get(ENV_SERVE_URL)
+    if not base_url:
+        return None
+
+    try:
+        client = BwServeClient(base_url)
+        client.status()
+    except BwServeError as e:
+        _LOGGER.warning("Falling back to bw CLI: %s", e)
+        return None
+
+    _client = client
+    return client
+
+
+def reset_serve_client() -> None:
+    """Forget the shared client so the next call probes the server again."""
+    global _client, _probed
+
+    if _client is not None:
+        _client.close()
+    _client = None
+    _probed = False
@@ -0,0 +1,185 @@
+"""Sharded storage of the credential store across several secure notes.
+
+By default every credential lives in one secure note, so each write re-sends
+the whole store and large stores approach Bitwarden's notes size limit. With
+``DOCKER_CREDENTIAL_BW_SHARDS=N`` the store is spread over N notes named
+``<item>/0`` … ``<item>/N-1``; a credential always lives in the shard chosen by
+a stable hash of its normalized server URL, so equivalent forms of a URL share
+a shard and a write only touches the shards of the URLs it changes.
+
+An existing single-note store is migrated on the first write: its entries are
+moved into the shards and the old note is moved to the trash. Until then,
+reads merge the old note with the shards.
+
+The shard count must stay the same for a vault once data is stored in it.
+
+Environment variables:
+    DOCKER_CREDENTIAL_BW_SHARDS: Number of secure notes to spread the store
+        over (default: 1, i.e. a single note).
+"""
+
+import hashlib
+import os
+from collections.abc import Collection
+from logging import getLogger
+
+from .bitwarden import (
+    SECURE_NOTE_TYPE,
+    CredentialTransaction,
+    find_items_data,
+    sync_after_write,
+)
+from .index import lookup_item_id
+from .registry import registry_key
+from .types import CredentialStore
+
+_LOGGER = getLogger(__name__)
+
+ENV_SHARDS = "DOCKER_CREDENTIAL_BW_SHARDS"
+
+
+def shard_count() -> int:
+    """Return the configured number of shards (1 means no sharding)."""
+    value = os.environ.get(ENV_SHARDS)
+    if not value:
+        return 1
+    try:
+        return max(1, int(value))
+    except ValueError:
+        _LOGGER.warning("Ignoring invalid %s=%r", ENV_SHARDS, value)
+        return 1
+
+
+def shard_index(server_url: str, count: int) -> int:
+    """
+    Return the shard a server URL is stored in.
+
+    Equivalent forms of a URL (with or without scheme, trailing slash, ...)
+    map to the same shard, so reading one shard finds every form.
+
+    Args:
+        server_url: The server URL.
+        count: Number of shards.
+
+    Returns:
+        The shard index, stable across processes and Python versions.
+    """
+    digest = hashlib.sha256(registry_key(server_url).encode()).digest()
+    return int.from_bytes(digest[:8], "big") % count
+
+
+def shard_name(item_name: str, index: int) -> str:
+    """Return the name of the secure note holding a shard."""
+    return f"{item_name}/{index}"
+
+
+class ShardedCredentialTransaction:
+    """Read-modify-write access to a sharded credential store.
+
+    Only the shards holding the requested server URLs are fetched, and
+    ``commit`` only writes the shards whose contents changed. Changes to other
+    URLs are not saved.
+
+    Usage:
+        txn = ShardedCredentialTransaction.begin("docker-credentials", 8, urls)
+        txn.credentials["https://ghcr.io"] = StoredCredential(...)
+        txn.commit()
+    """
+
+    def __init__(
+        self,
+        item_name: str,
+        count: int,
+        shards: dict[int, CredentialTransaction],
+        legacy: CredentialTransaction | None,
+    ) -> None:
+        self.item_name = item_name
+        self.count = count
+        self._shards = shards
+        self._legacy = legacy
+
+        self.credentials: CredentialStore = {}
+        if legacy is not None:
+            self.credentials.update(legacy.credentials)
+        for shard in shards.values():
+            self.credentials.update(shard.credentials)
+
+    @classmethod
+    def begin(
+        cls,
+        item_name: str,
+        count: int,
+        server_urls: Collection[str] | None = None,
+    ) -> "ShardedCredentialTransaction":
+        """
+        Fetch the shards holding the given server URLs.
+
+        A few shards whose IDs are known locally are fetched one by one.
+        Otherwise one search for the item name lists every shard together
+        with a single-note store left to migrate, so that reading all shards
+        costs one bw call and ``commit`` can complete the layout.
+
+        Args:
+            item_name: Base name of the secure note items.
+            count: Number of shards.
+            server_urls: URLs that will be read or changed, or None for all.
+
+        Returns:
+            The transaction.
+
+        Raises:
+            BitwardenError: If reading from Bitwarden fails.
+        """
+        names = [shard_name(item_name, i) for i in range(count)]
+        indexes = (
+            set(range(count))
+            if server_urls is None
+            else {shard_index(url, count) for url in server_urls}
+        )
+
+        if len(indexes) < count and all(
+            lookup_item_id(name, SECURE_NOTE_TYPE) for name in names
+        ):
+            shards = {i: CredentialTransaction.begin(names[i]) for i in indexes}
+            return cls(item_name, count, shards, None)
+
+        # Every shard name contains the item name
+        found = find_items_data(
+            [item_name, *names], SECURE_NOTE_TYPE, search_term=item_name
+        )
+        legacy = None
+        if item_name in found:
+            legacy = CredentialTransaction.from_item_data(item_name, found[item_name])
+        shards = {
+            i: CredentialTransaction.from_item_data(names[i], found.get(names[i]))
+            for i in range(count)
+        }
+        return cls(item_name, count, shards, legacy)
+
+    def commit(self) -> None:
+        """
+        Write changed shards back to Bitwarden and finish a pending migration.
+
+        Raises:
+            BitwardenError: If saving to Bitwarden fails.
+        """
+        written = False
+        for index, shard in self._shards.items():
+            contents = {
+                url: cred
+                for url, cred in self.credentials.items()
+                if shard_index(url, self.count) == index
+            }
+            if contents != shard.credentials or not shard.exists:
+                shard.credentials = contents
+                shard.commit(sync=False)
+                written = True
+
+        if self._legacy is not None:
+            # Every entry now lives in a shard
+            self._legacy.delete()
+            self._legacy = None
+            written = True
+
+        if written:
+            sync_after_write()
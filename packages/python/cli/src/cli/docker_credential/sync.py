@@ -0,0 +1,133 @@
+"""Deferred, coalesced ``bw sync`` after credential writes.
+
+A write is only pushed to the Bitwarden server by ``bw sync``, which costs a
+network round trip whose result the helper ignores anyway. In deferred mode
+the helper records that a sync is pending and hands the work to a detached
+worker process, so ``docker login`` returns immediately.
+
+The worker waits until no write has happened for a short quiet period, so a
+burst of logins results in a single sync. An exclusive lock on a lock file
+guarantees that at most one worker syncs at a time; helpers that find the lock
+taken just leave their pending marker for the running worker to pick up.
+
+Environment variables:
+    DOCKER_CREDENTIAL_BW_DEFER_SYNC: Set to a non-empty value to sync in the
+        background.
+    DOCKER_CREDENTIAL_BW_SYNC_DELAY: Quiet period in seconds before the worker
+        syncs (default: 2).
+"""
+
+import os
+import time
+from collections.abc import Callable
+from logging import getLogger
+from pathlib import Path
+
+from .cache import cache_dir
+from .worker import run_locked, start_worker
+
+_LOGGER = getLogger(__name__)
+
+ENV_DEFER_SYNC = "DOCKER_CREDENTIAL_BW_DEFER_SYNC"
+ENV_SYNC_DELAY = "DOCKER_CREDENTIAL_BW_SYNC_DELAY"
+
+_DEFAULT_DELAY = 2.0
+_PENDING_FILE_NAME = "sync.pending"
+_LOCK_FILE_NAME = "sync.lock"
+
+
+def is_sync_deferred() -> bool:
+    """Return True if ``bw sync`` should run in a background worker."""
+    return bool(os.environ.get(ENV_DEFER_SYNC))
+
+
+def _pending_path() -> Path:
+    return cache_dir() / _PENDING_FILE_NAME
+
+
+def _lock_path() -> Path:
+    return cache_dir() / _LOCK_FILE_NAME
+
+
+def _delay_from_env() -> float:
+    value = os.environ.get(ENV_SYNC_DELAY)
+    if not value:
+        return _DEFAULT_DELAY
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        _LOGGER.warning("Ignoring invalid %s=%r", ENV_SYNC_DELAY, value)
+        return _DEFAULT_DELAY
+
+
+def request_sync() -> None:
+    """
+    Schedule a background sync and return immediately.
+
+    Marks a sync as pending and starts a detached worker unless one is already
+    running. Failures are logged and otherwise ignored, like a failed sync.
+    """
+    path = _pending_path()
+    try:
+        path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+        path.touch()
+    except OSError as e:
+        _LOGGER.warning("Failed to schedule bw sync: %s", e)
+        return
+
+    try:
+        # A running worker will see the pending marker
+        start_worker(_lock_path(), __name__)
+    except OSError as e:
+        _LOGGER.warning("Failed to start bw sync worker: %s", e)
+
+
+def _wait_for_quiet(delay: float) -> bool:
+    """
+    Wait until the pending marker is older than the quiet period.
+
+    Returns:
+        True if a sync is pending, False if there is nothing to do.
+    """
+    path = _pending_path()
+    while True:
+        try:
+            age = time.time() - path.stat().st_mtime
+        except FileNotFoundError:
+            return False
+        if age >= delay:
+            return True
+        time.sleep(delay - age)
+
+
+def run_worker(sync: Callable[[], None], delay: float | None = None) -> None:
+    """
+    Run pending syncs until none are left.
+
+    Args:
+        sync: Function performing one ``bw sync``.
+        delay: Quiet period in seconds; defaults to the environment setting.
+    """
+    if delay is None:
+        delay = _delay_from_env()
+
+    def work() -> bool:
+        while _wait_for_quiet(delay):
+            # Writes arriving from here on leave a new marker and get another
+            # sync
+            _pending_path().unlink(missing_ok=True)
+            sync()
+        return True
+
+    run_locked(_lock_path(), work, _pending_path().exists)
+
+
+def main() -> None:
+    """Entry point of the detached worker process."""
+    from .bitwarden import sync_vault
+
+    run_worker(sync_vault)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,18 @@ from typing import Annotated
 from pydantic import BaseModel, ConfigDict, Field, field_validator
 
 
+class BitwardenLoginUri(BaseModel):
+    """A URI a Bitwarden login item applies to.
+
+    Unknown fields from the Bitwarden CLI API response (e.g. the match
+    detection mode) are ignored.
+    """
+
+    model_config = ConfigDict(extra="ignore")
+
+    uri: Annotated[str | None, Field(default=None, description="The URI")]
+
+
 class BitwardenLogin(BaseModel):
     """Bitwarden login item credentials.
 
@@ -17,6 +29,10 @@ class BitwardenLogin(BaseModel):
 
     username: Annotated[str, Field(description="Username for authentication")]
     password: Annotated[str, Field(description="Password for authentication")]
+    uris: Annotated[
+        list[BitwardenLoginUri] | None,
+        Field(default=None, description="URIs the login applies to"),
+    ]
 
 
 class BitwardenSecureNote(BaseModel):
@@ -0,0 +1,98 @@
+"""Detached background workers guarded by a lock file.
+
+Deferred syncs (``sync.py``) and write-behind replication (``replication.py``)
+both hand their work to a worker process that outlives the helper. An
+exclusive lock on a lock file guarantees at most one worker per kind runs at a
+time; helpers that find the lock taken leave their work for the running
+worker instead of starting another one.
+"""
+
+import fcntl
+import subprocess
+import sys
+from collections.abc import Callable
+from pathlib import Path
+from typing import IO
+
+
+def try_lock(path: Path) -> IO[bytes] | None:
+    """
+    Take an exclusive lock without blocking.
+
+    Args:
+        path: The lock file; its parent directory is created if needed.
+
+    Returns:
+        The open lock file holding the lock, or None if it is taken.
+
+    Raises:
+        OSError: If the lock file cannot be opened.
+    """
+    path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+    f = open(path, "ab")  # noqa: SIM115 - returned to the caller holding the lock
+    try:
+        fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        f.close()
+        return None
+    return f
+
+
+def spawn_worker(module: str) -> None:
+    """
+    Run a module as a detached process that outlives this one.
+
+    Raises:
+        OSError: If the process cannot be started.
+    """
+    subprocess.Popen(
+        [sys.executable, "-m", module],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+
+
+def start_worker(lock_path: Path, module: str) -> None:
+    """
+    Start a detached worker unless one already holds the lock.
+
+    Args:
+        lock_path: Lock file held by the running worker.
+        module: Module the worker runs.
+
+    Raises:
+        OSError: If the lock file cannot be opened or the worker not started.
+    """
+    lock = try_lock(lock_path)
+    if lock is None:
+        # The running worker checks for more work before it exits
+        return
+    lock.close()
+    spawn_worker(module)
+
+
+def run_locked(
+    lock_path: Path, work: Callable[[], bool], has_more: Callable[[], bool]
+) -> None:
+    """
+    Do the work of a worker while holding its lock, until none is left.
+
+    Args:
+        lock_path: Lock file held while working.
+        work: Does all work queued so far; returns False to stop early.
+        has_more: Returns whether work was queued since.
+    """
+    while True:
+        lock = try_lock(lock_path)
+        if lock is None:
+            # Another worker owns the work
+            return
+        with lock:
+            if not work():
+                return
+        # A helper may have queued work after the last check but before the
+        # lock was released, and skipped starting a worker because of it
+        if not has_more():
+            return
@@ -151,7 +151,7 @@ def sbx(
 @app.command()
 def docker_credential_bw(
     command: Annotated[
-        Literal["get", "store", "erase", "list"],
+        Literal["get", "store", "erase", "list", "store-batch", "erase-batch", "warm"],
         typer.Argument(help="The command to execute"),
     ],
 ) -> None:
@@ -160,16 +160,47 @@ def docker_credential_bw(
     This command implements the Docker credential helper specification,
     storing all Docker credentials in a single Bitwarden secure note item.
 
-    Supported subcommands: get, store, erase, list
+    Supported subcommands: get, store, erase, list, store-batch, erase-batch, warm
+
+    The batch subcommands read one record per line (credential JSON for
+    store-batch, server URL for erase-batch) and update the secure note once.
+
+    warm reads the store into the encrypted cache and prints the time each
+    step took, e.g. to run right after `bw unlock`.
+
+    Server URLs are matched regardless of scheme, trailing slash and host case.
+    A stored key may be a host pattern such as `*.dkr.ecr.*.amazonaws.com`,
+    where `*` matches one host label; `list` only shows concrete entries.
 
     Usage:
         py_cli docker-credential-bw get < server_url.txt
         py_cli docker-credential-bw list
         py_cli docker-credential-bw store < credentials.json
         py_cli docker-credential-bw erase < server_url.txt
+        py_cli docker-credential-bw store-batch < credentials.ndjson
+        py_cli docker-credential-bw erase-batch < server_urls.txt
+        py_cli docker-credential-bw warm
 
     Environment variables:
         BW_SESSION: Bitwarden session token (required for unlocked vault)
+        BW_SERVE_URL: Use a running `bw serve` (e.g. http://127.0.0.1:8087)
+        DOCKER_CREDENTIAL_BW_CACHE_TTL: Lifetime of the encrypted cache in seconds
+        DOCKER_CREDENTIAL_BW_NO_CACHE: Set to bypass the encrypted cache
+        DOCKER_CREDENTIAL_BW_NEGATIVE_TTL: Seconds to remember credential misses
+        DOCKER_CREDENTIAL_BW_FAST: Set to skip the `bw status` preflight check
+        DOCKER_CREDENTIAL_BW_TIMEOUT: Seconds one call may spend on Bitwarden
+            (default: 30, 0 to wait forever); expired cache entries are
+            served if it runs out
+        DOCKER_CREDENTIAL_BW_RETRIES: Retries of a bw call failing with a rate
+            limit or network error (default: 3)
+        DOCKER_CREDENTIAL_BW_DEFER_SYNC: Set to run `bw sync` in the background
+        DOCKER_CREDENTIAL_BW_SYNC_DELAY: Seconds to coalesce writes before syncing
+        DOCKER_CREDENTIAL_BW_SHARDS: Spread the store over this many secure notes
+        DOCKER_CREDENTIAL_BW_BACKEND: Storage backend, "bitwarden", "local" or
+            "tiered" (local file replicated to Bitwarden in the background)
+        DOCKER_CREDENTIAL_BW_LOCAL_FILE: Encrypted file used by the local backend
+        DOCKER_CREDENTIAL_BW_LOCAL_KEY: Secret the local backend key derives from
+        DOCKER_CREDENTIAL_BW_LOCAL_KEY_COMMAND: Command printing that secret
     """
     docker_credential_bw_command(command)
 
@@ -177,7 +208,7 @@ def docker_credential_bw(
 @app.command()
 def docker_credential_bw_docker(
     command: Annotated[
-        Literal["get", "store", "erase", "list"],
+        Literal["get", "store", "erase", "list", "warm"],
         typer.Argument(help="The command to execute"),
     ],
     search_term: Annotated[
@@ -189,25 +220,52 @@ def docker_credential_bw_docker(
             help="Search term for Bitwarden item lookup (default: DockerHub)",
         ),
     ] = "DockerHub",
+    refresh: Annotated[
+        bool,
+        typer.Option(
+            "--refresh",
+            envvar="DOCKER_CREDENTIAL_BW_REFRESH",
+            help="Ask Bitwarden again instead of serving cached lookups",
+        ),
+    ] = False,
 ) -> None:
     """Docker credential helper using Bitwarden CLI.
 
     This command implements the Docker credential helper specification,
     providing read-only access to Docker Hub credentials stored in Bitwarden.
+    Other registries resolve to the login item whose URI has the same host.
+
+    Supported subcommands: get, store, erase, list, warm
 
-    Supported subcommands: get, store, erase, list
+    Search results and the credentials resolved for each registry are kept in
+    the encrypted cache for the session; pass --refresh to ask the vault again.
+    warm runs the search once, refreshes the cache and prints the time each
+    step took.
 
     Usage:
         py_cli docker-credential-bw-docker get < server_url.txt
+        py_cli docker-credential-bw-docker --refresh get < server_url.txt
         py_cli docker-credential-bw-docker list
         py_cli docker-credential-bw-docker store < credentials.json
         py_cli docker-credential-bw-docker erase < server_url.txt
+        py_cli docker-credential-bw-docker warm
 
     Environment variables:
         BW_DOCKER_SEARCH_TERM: Override the default search term (default: "DockerHub")
         BW_SESSION: Bitwarden session token (required for unlocked vault)
+        BW_SERVE_URL: Use a running `bw serve` (e.g. http://127.0.0.1:8087)
+        DOCKER_CREDENTIAL_BW_CACHE_TTL: Lifetime of the encrypted cache in seconds
+        DOCKER_CREDENTIAL_BW_NO_CACHE: Set to bypass the encrypted cache
+        DOCKER_CREDENTIAL_BW_REFRESH: Set to ignore cached lookups, like --refresh
+        DOCKER_CREDENTIAL_BW_FAST: Set to skip the `bw status` preflight check
+        DOCKER_CREDENTIAL_BW_TIMEOUT: Seconds one call may spend on Bitwarden
+            (default: 30, 0 to wait forever); expired cache entries are
+            served if it runs out
+        DOCKER_CREDENTIAL_BW_RETRIES: Retries of a bw call failing with a rate
+            limit or network error (default: 3)
+        DOCKER_CREDENTIAL_BW_NEGATIVE_TTL: Seconds to remember credential misses
     """
-    docker_credential_bw_docker_command(command, search_term)
+    docker_credential_bw_docker_command(command, search_term, refresh)
 
 
 @app.command()
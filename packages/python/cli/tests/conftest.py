@@ -1,7 +1,54 @@
 """Shared pytest fixtures."""
 
+import fcntl
+import json
+import os
+import shlex
+import sys
+from pathlib import Path
+from typing import Any
+
 import pytest
 
+from cli.docker_credential.backend import ENV_BACKEND
+from cli.docker_credential.bitwarden import ENV_FAST
+from cli.docker_credential.cache import ENV_SESSION
+from cli.docker_credential.deadline import ENV_TIMEOUT, clear_deadline
+from cli.docker_credential.local import (
+    ENV_LOCAL_FILE,
+    ENV_LOCAL_KEY,
+    ENV_LOCAL_KEY_COMMAND,
+)
+from cli.docker_credential.retry import ENV_RETRIES, reset_retry_counts
+from cli.docker_credential.serve import ENV_SERVE_URL, reset_serve_client
+from cli.docker_credential.shards import ENV_SHARDS
+from cli.docker_credential.sync import ENV_DEFER_SYNC
+
+
+@pytest.fixture(autouse=True)
+def isolate_docker_credential_env(monkeypatch: pytest.MonkeyPatch, tmp_path):
+    """Keep a developer's Bitwarden session and caches out of the tests."""
+    monkeypatch.delenv(ENV_SERVE_URL, raising=False)
+    monkeypatch.delenv(ENV_SESSION, raising=False)
+    monkeypatch.delenv(ENV_FAST, raising=False)
+    monkeypatch.delenv(ENV_DEFER_SYNC, raising=False)
+    monkeypatch.delenv(ENV_SHARDS, raising=False)
+    monkeypatch.delenv(ENV_BACKEND, raising=False)
+    monkeypatch.delenv(ENV_LOCAL_FILE, raising=False)
+    monkeypatch.delenv(ENV_LOCAL_KEY, raising=False)
+    monkeypatch.delenv(ENV_LOCAL_KEY_COMMAND, raising=False)
+    monkeypatch.delenv(ENV_TIMEOUT, raising=False)
+    # Retrying costs real backoff time; tests of retries opt back in
+    monkeypatch.setenv(ENV_RETRIES, "0")
+    monkeypatch.setenv("XDG_DATA_HOME", str(tmp_path / "data"))
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    reset_serve_client()
+    clear_deadline()
+    reset_retry_counts()
+    yield
+    reset_serve_client()
+    clear_deadline()
+
 
 @pytest.fixture
 def full_profile():
@@ -100,3 +147,81 @@ def full_profile():
   (ipc-posix-name "com.apple.AppleDatabaseChanged")
 )
 """
+
+
+def secure_note(
+    credentials: dict[str, dict[str, str]] | str | None = None,
+    *,
+    item_id: str | None = "note-1",
+    name: str = "docker-credentials",
+) -> dict[str, Any]:
+    """
+    Build a raw credential secure note as ``bw`` returns it.
+
+    Args:
+        credentials: Credentials stored in the note, or the raw notes text.
+        item_id: ID of the item, or None for an item not created yet.
+        name: Name of the item.
+    """
+    if isinstance(credentials, str):
+        notes = credentials
+    else:
+        notes = json.dumps(credentials or {}, ensure_ascii=False)
+    item: dict[str, Any] = {} if item_id is None else {"id": item_id}
+    return item | {
+        "name": name,
+        "type": 2,
+        "notes": notes,
+        "secureNote": {"type": 0},
+    }
+
+
+class FakeBw:
+    """Handle for the scripted fake ``bw`` placed on PATH."""
+
+    def __init__(self, state_path: Path) -> None:
+        self.state_path = state_path
+        self.reset()
+
+    def reset(self, items: list[dict[str, Any]] | None = None) -> None:
+        """Replace the vault contents and clear the call log."""
+        self.state_path.write_text(json.dumps({"items": items or [], "calls": []}))
+
+    def _state(self) -> dict[str, Any]:
+        # Locked like fake_bw.py, for tests racing a background bw
+        with open(self.state_path) as f:
+            fcntl.flock(f, fcntl.LOCK_SH)
+            return json.load(f)
+
+    @property
+    def items(self) -> list[dict[str, Any]]:
+        """Items currently in the fake vault."""
+        return self._state()["items"]
+
+    @property
+    def calls(self) -> list[list[str]]:
+        """Arguments of every bw invocation so far."""
+        return self._state()["calls"]
+
+    def clear_calls(self) -> None:
+        """Clear the call log but keep the vault."""
+        state = self._state()
+        state["calls"] = []
+        self.state_path.write_text(json.dumps(state))
+
+
+@pytest.fixture
+def fake_bw(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> FakeBw:
+    """Put a scripted fake ``bw`` executable first on PATH."""
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    script = bin_dir / "bw"
+    script.write_text(
+        f"#!/bin/sh\nexec {shlex.quote(sys.executable)} "
+        f'{shlex.quote(str(Path(__file__).with_name("fake_bw.py")))} "$@"\n'
+    )
+    script.chmod(0o755)
+
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+    monkeypatch.setenv("FAKE_BW_STATE", str(tmp_path / "fake-bw.json"))
+    return FakeBw(tmp_path / "fake-bw.json")
@@ -0,0 +1,110 @@
+"""Scripted stand-in for the Bitwarden CLI used by the tests.
+
+The vault lives in a JSON file named by ``FAKE_BW_STATE``. Every invocation is
+appended to the file's ``calls`` list so tests can count subprocesses.
+
+Environment variables:
+    FAKE_BW_STATE: Path of the JSON state file (required).
+    FAKE_BW_LOCKED: Set to behave like a locked vault.
+    FAKE_BW_DELAY: Seconds to sleep before each command, like a slow startup.
+    FAKE_BW_SYNC_DELAY: Seconds ``bw sync`` takes.
+    FAKE_BW_FAIL: ``<count>:<message>`` makes the first count commands other
+        than status fail with the message on stderr.
+    FAKE_BW_GARBAGE: Set to make ``list items`` print invalid JSON followed
+        by more output than a pipe holds.
+"""
+
+import base64
+import contextlib
+import fcntl
+import io
+import json
+import os
+import sys
+import time
+import uuid
+from typing import Any
+
+
+def _fail(message: str) -> int:
+    print(message, file=sys.stderr)
+    return 1
+
+
+def _run(state: dict[str, Any], args: list[str], stdin: str) -> int:
+    items: list[dict[str, Any]] = state.setdefault("items", [])
+    locked = bool(os.environ.get("FAKE_BW_LOCKED"))
+
+    if args == ["status"]:
+        print(json.dumps({"status": "locked" if locked else "unlocked"}))
+        return 0
+    if args == ["encode"]:
+        print(base64.b64encode(stdin.encode()).decode())
+        return 0
+    if locked:
+        return _fail("Vault is locked.")
+    failures, _, message = (os.environ.get("FAKE_BW_FAIL") or "0:").partition(":")
+    if state.get("failures", 0) < int(failures):
+        state["failures"] = state.get("failures", 0) + 1
+        return _fail(message)
+
+    match args:
+        case ["list", "items"] if os.environ.get("FAKE_BW_GARBAGE"):
+            print("not json " + "x" * 1024 * 1024)
+        case ["list", "items"]:
+            print(json.dumps(items))
+        case ["list", "items", "--search", term]:
+            print(json.dumps([i for i in items if term.lower() in i["name"].lower()]))
+        case ["get", "item", item_id]:
+            found = [i for i in items if i["id"] == item_id]
+            if not found:
+                return _fail("Not found.")
+            print(json.dumps(found[0]))
+        case ["edit", "item", item_id]:
+            new_item = json.loads(base64.b64decode(stdin))
+            for index, item in enumerate(items):
+                if item["id"] == item_id:
+                    items[index] = new_item | {"id": item_id}
+                    print(json.dumps(items[index]))
+                    break
+            else:
+                return _fail("Not found.")
+        case ["create", "item"]:
+            new_item = json.loads(base64.b64decode(stdin)) | {"id": str(uuid.uuid4())}
+            items.append(new_item)
+            print(json.dumps(new_item))
+        case ["delete", "item", item_id]:
+            if not any(i["id"] == item_id for i in items):
+                return _fail("Not found.")
+            state["items"] = [i for i in items if i["id"] != item_id]
+        case ["sync"]:
+            time.sleep(float(os.environ.get("FAKE_BW_SYNC_DELAY") or 0))
+            print("Syncing complete.")
+        case _:
+            return _fail(f"Unknown command: {' '.join(args)}")
+    return 0
+
+
+def main() -> int:
+    args = [a for a in sys.argv[1:] if a != "--nointeraction"]
+    stdin = "" if sys.stdin.isatty() else sys.stdin.read()
+    time.sleep(float(os.environ.get("FAKE_BW_DELAY") or 0))
+
+    # Save the state before writing any output, so a reader that stops early
+    # and kills us cannot leave a truncated state file behind
+    output = io.StringIO()
+    with open(os.environ["FAKE_BW_STATE"], "r+") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        state = json.load(f)
+        state.setdefault("calls", []).append(args)
+        with contextlib.redirect_stdout(output):
+            code = _run(state, args, stdin)
+        f.seek(0)
+        f.truncate()
+        json.dump(state, f)
+    sys.stdout.write(output.getvalue())
+    return code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,6 +5,7 @@ import sys
 from unittest.mock import MagicMock, patch
 
 import pytest
+from conftest import FakeBw
 from pydantic import ValidationError
 
 from cli.docker_credential import (
@@ -15,19 +16,22 @@ from cli.docker_credential import (
     docker_credential_bw_docker,
 )
 from cli.docker_credential.bitwarden import (
+    ENV_FAST,
     BitwardenError,
     check_bw_status,
+    list_items,
     output_error,
     search_items,
 )
-from cli.docker_credential.types import DockerCredential
+from cli.docker_credential.registry import credentials_by_uri
+from cli.docker_credential.types import BitwardenItem, DockerCredential
 
 
 class TestCmdGet:
     """Tests for the get command."""
 
-    @patch("cli.docker_credential.check_bw_status")
-    @patch("cli.docker_credential.search_items")
+    @patch("cli.docker_credential.backend.check_bw_status")
+    @patch("cli.docker_credential.backend.search_items")
     @patch("builtins.print")
     def test_get_success(
         self, mock_print: MagicMock, mock_search: MagicMock, mock_check: MagicMock
@@ -58,8 +62,8 @@ class TestCmdGet:
         mock_error.assert_called_once()
         assert "credentials not found for" in mock_error.call_args[0][0]
 
-    @patch("cli.docker_credential.check_bw_status")
-    @patch("cli.docker_credential.search_items")
+    @patch("cli.docker_credential.backend.check_bw_status")
+    @patch("cli.docker_credential.backend.search_items")
     @patch("cli.docker_credential.output_error")
     def test_get_no_items(
         self,
@@ -72,8 +76,8 @@ class TestCmdGet:
         _cmd_get_docker_hub("https://index.docker.io/v1/", "DockerHub")
         mock_error.assert_called_once_with("credentials not found")
 
-    @patch("cli.docker_credential.check_bw_status")
-    @patch("cli.docker_credential.search_items")
+    @patch("cli.docker_credential.backend.check_bw_status")
+    @patch("cli.docker_credential.backend.search_items")
     @patch("cli.docker_credential.output_error")
     def test_get_invalid_credentials(
         self,
@@ -93,7 +97,7 @@ class TestCmdGet:
         _cmd_get_docker_hub("https://index.docker.io/v1/", "DockerHub")
         mock_error.assert_called_once_with("invalid credentials format")
 
-    @patch("cli.docker_credential.check_bw_status")
+    @patch("cli.docker_credential.backend.check_bw_status")
     @patch("cli.docker_credential.output_error")
     def test_get_bitwarden_error(
         self, mock_error: MagicMock, mock_check: MagicMock
@@ -103,8 +107,8 @@ class TestCmdGet:
         _cmd_get_docker_hub("https://index.docker.io/v1/", "DockerHub")
         mock_error.assert_called_once_with("Bitwarden is locked")
 
-    @patch("cli.docker_credential.check_bw_status")
-    @patch("cli.docker_credential.search_items")
+    @patch("cli.docker_credential.backend.check_bw_status")
+    @patch("cli.docker_credential.backend.search_items")
     @patch("cli.docker_credential.output_error")
     def test_get_validation_error(
         self,
@@ -138,6 +142,70 @@ class TestCmdGet:
             assert "validation error" in mock_error.call_args[0][0]
 
 
+def _login(item_id: str, username: str, *uris: str) -> dict[str, object]:
+    return {
+        "id": item_id,
+        "name": f"Login {item_id}",
+        "type": 1,
+        "login": {
+            "username": username,
+            "password": f"{username}-pass",
+            "uris": [{"match": None, "uri": uri} for uri in uris],
+        },
+    }
+
+
+class TestLoginUriIndex:
+    """Tests for registries resolved by login item URIs."""
+
+    def test_credentials_by_uri(self) -> None:
+        """Test URI hosts map to credentials, first listed item winning."""
+        items = [
+            BitwardenItem.model_validate(_login("1", "a", "https://ghcr.io/login")),
+            BitwardenItem.model_validate(_login("2", "b", "ghcr.io", "quay.io")),
+            BitwardenItem(id="3", name="note", type=2),
+        ]
+
+        credentials = credentials_by_uri(items)
+
+        assert {url: c.Username for url, c in credentials.items()} == {
+            "ghcr.io": "a",
+            "quay.io": "b",
+        }
+
+    def test_get_by_uri_host(
+        self, fake_bw: FakeBw, capsys: pytest.CaptureFixture[str]
+    ) -> None:
+        """Test any registry on a login URI resolves from one listing."""
+        fake_bw.reset(
+            [
+                _login("1", "gh", "https://ghcr.io/"),
+                _login("2", "corp", "https://registry.corp.example:5000/ui"),
+            ]
+        )
+
+        _cmd_get_docker_hub("registry.corp.example:5000", "DockerHub")
+
+        output = json.loads(capsys.readouterr().out)
+        assert output == {
+            "ServerURL": "registry.corp.example:5000",
+            "Username": "corp",
+            "Secret": "corp-pass",
+        }
+        assert fake_bw.calls == [["status"], ["list", "items"]]
+
+    def test_get_unknown_registry(
+        self, fake_bw: FakeBw, capsys: pytest.CaptureFixture[str]
+    ) -> None:
+        """Test a registry without a matching URI is not found."""
+        fake_bw.reset([_login("1", "gh", "https://ghcr.io/")])
+
+        with pytest.raises(SystemExit):
+            _cmd_get_docker_hub("https://quay.io", "DockerHub")
+
+        assert "credentials not found for" in capsys.readouterr().err
+
+
 class TestCmdStore:
     """Tests for the store command."""
 
@@ -177,8 +245,8 @@ class TestCmdErase:
 class TestCmdList:
     """Tests for the list command."""
 
-    @patch("cli.docker_credential.check_bw_status")
-    @patch("cli.docker_credential.search_items")
+    @patch("cli.docker_credential.backend.check_bw_status")
+    @patch("cli.docker_credential.backend.search_items")
     @patch("builtins.print")
     def test_list_success(
         self, mock_print: MagicMock, mock_search: MagicMock, mock_check: MagicMock
@@ -200,8 +268,8 @@ class TestCmdList:
         output = json.loads(mock_print.call_args[0][0])
         assert output["https://index.docker.io/v1/"] == "testuser"
 
-    @patch("cli.docker_credential.check_bw_status")
-    @patch("cli.docker_credential.search_items")
+    @patch("cli.docker_credential.backend.check_bw_status")
+    @patch("cli.docker_credential.backend.search_items")
     @patch("builtins.print")
     @patch("sys.exit")
     def test_list_no_items(
@@ -217,8 +285,8 @@ class TestCmdList:
         mock_print.assert_called_once_with("{}")
         mock_exit.assert_called_once_with(0)
 
-    @patch("cli.docker_credential.check_bw_status")
-    @patch("cli.docker_credential.search_items")
+    @patch("cli.docker_credential.backend.check_bw_status")
+    @patch("cli.docker_credential.backend.search_items")
     @patch("builtins.print")
     def test_list_no_username(
         self, mock_print: MagicMock, mock_search: MagicMock, mock_check: MagicMock
@@ -235,7 +303,7 @@ class TestCmdList:
         _cmd_list_docker_hub("DockerHub")
         mock_print.assert_called_once_with("{}")
 
-    @patch("cli.docker_credential.check_bw_status")
+    @patch("cli.docker_credential.backend.check_bw_status")
     @patch("cli.docker_credential.output_error")
     def test_list_bitwarden_error(
         self, mock_error: MagicMock, mock_check: MagicMock
@@ -249,58 +317,58 @@ class TestCmdList:
 class TestBitwardenFunctions:
     """Tests for Bitwarden helper functions."""
 
+    @patch("shutil.which", return_value=None)
     @patch("subprocess.run")
-    def test_check_bw_status_not_installed(self, mock_run: MagicMock) -> None:
+    def test_check_bw_status_not_installed(
+        self, mock_run: MagicMock, mock_which: MagicMock
+    ) -> None:
         """Test check_bw_status when bw is not installed."""
-        mock_run.return_value = MagicMock(returncode=1)
-
         with pytest.raises(
             BitwardenError, match="Bitwarden CLI \\(bw\\) is not installed"
         ):
             check_bw_status()
+        mock_run.assert_not_called()
 
+    @patch("shutil.which", return_value="/usr/local/bin/bw")
     @patch("subprocess.run")
-    def test_check_bw_status_command_failed(self, mock_run: MagicMock) -> None:
+    def test_check_bw_status_command_failed(
+        self, mock_run: MagicMock, mock_which: MagicMock
+    ) -> None:
         """Test check_bw_status when bw status command fails."""
-        mock_run.side_effect = [
-            MagicMock(returncode=0),  # which bw succeeds
-            MagicMock(returncode=1, stderr="Error"),  # bw status fails
-        ]
+        mock_run.return_value = MagicMock(returncode=1, stderr="Error")
 
         with pytest.raises(BitwardenError, match="Failed to get Bitwarden status"):
             check_bw_status()
 
+    @patch("shutil.which", return_value="/usr/local/bin/bw")
     @patch("subprocess.run")
-    def test_check_bw_status_locked(self, mock_run: MagicMock) -> None:
+    def test_check_bw_status_locked(
+        self, mock_run: MagicMock, mock_which: MagicMock
+    ) -> None:
         """Test check_bw_status when vault is locked."""
-        mock_run.side_effect = [
-            MagicMock(returncode=0),  # which bw succeeds
-            MagicMock(returncode=0, stdout='{"status":"locked"}'),  # vault is locked
-        ]
+        mock_run.return_value = MagicMock(returncode=0, stdout='{"status":"locked"}')
 
         with pytest.raises(BitwardenError, match="Bitwarden is locked"):
             check_bw_status()
 
+    @patch("shutil.which", return_value="/usr/local/bin/bw")
     @patch("subprocess.run")
-    def test_check_bw_status_invalid_json(self, mock_run: MagicMock) -> None:
+    def test_check_bw_status_invalid_json(
+        self, mock_run: MagicMock, mock_which: MagicMock
+    ) -> None:
         """Test check_bw_status with invalid JSON response."""
-        mock_run.side_effect = [
-            MagicMock(returncode=0),  # which bw succeeds
-            MagicMock(returncode=0, stdout="invalid json"),  # invalid JSON
-        ]
+        mock_run.return_value = MagicMock(returncode=0, stdout="invalid json")
 
         with pytest.raises(BitwardenError, match="Failed to parse Bitwarden status"):
             check_bw_status()
 
+    @patch("shutil.which", return_value="/usr/local/bin/bw")
     @patch("subprocess.run")
-    def test_check_bw_status_unlocked(self, mock_run: MagicMock) -> None:
+    def test_check_bw_status_unlocked(
+        self, mock_run: MagicMock, mock_which: MagicMock
+    ) -> None:
         """Test check_bw_status when vault is unlocked."""
-        mock_run.side_effect = [
-            MagicMock(returncode=0),  # which bw succeeds
-            MagicMock(
-                returncode=0, stdout='{"status":"unlocked"}'
-            ),  # vault is unlocked
-        ]
+        mock_run.return_value = MagicMock(returncode=0, stdout='{"status":"unlocked"}')
 
         # Should not raise
         check_bw_status()
@@ -341,6 +409,111 @@ class TestBitwardenFunctions:
         ):
             search_items("test")
 
+    @patch("subprocess.run")
+    def test_search_items_skips_invalid_item(self, mock_run: MagicMock) -> None:
+        """Test one malformed item does not hide the valid ones."""
+        mock_run.return_value = MagicMock(
+            returncode=0,
+            stdout=json.dumps(
+                [
+                    {"id": "1", "name": "DockerHub", "type": 1},
+                    {"id": "2", "type": "unknown"},
+                ]
+            ),
+        )
+
+        items = search_items("DockerHub")
+
+        assert [item.id for item in items] == ["1"]
+
+    def test_list_items_filters_before_validation(self, fake_bw: FakeBw) -> None:
+        """Test only items matching name and type are validated."""
+        fake_bw.reset(
+            [
+                {"id": "1", "name": "docker-credentials", "type": 2, "notes": "{}"},
+                {"id": "2", "name": "docker-credentials", "type": 1},
+                {"id": "3", "name": "Card", "type": 3, "card": {"number": "x"}},
+                {"id": "4", "name": ["not", "a", "string"], "type": 4},
+            ]
+        )
+
+        with patch.object(
+            BitwardenItem, "model_validate", wraps=BitwardenItem.model_validate
+        ) as mock_validate:
+            items = list_items("docker-credentials", 2)
+
+        assert [item.id for item in items] == ["1"]
+        assert mock_validate.call_count == 1
+
+    def test_list_items_skips_invalid_item(self, fake_bw: FakeBw) -> None:
+        """Test an invalid unrelated item does not fail the listing."""
+        fake_bw.reset(
+            [
+                {"id": "1", "name": "Login", "type": 1},
+                {"id": "2", "name": ["not", "a", "string"], "type": 4},
+            ]
+        )
+
+        assert [item.id for item in list_items()] == ["1"]
+
+    @patch("subprocess.run")
+    def test_fast_mode_skips_status(
+        self, mock_run: MagicMock, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Test check_bw_status runs nothing in fast mode."""
+        monkeypatch.setenv(ENV_FAST, "1")
+
+        check_bw_status()
+
+        mock_run.assert_not_called()
+
+    @pytest.mark.parametrize(
+        "stderr",
+        ["Vault is locked.", "You are not logged in.", "Session key is invalid."],
+    )
+    @patch("subprocess.run")
+    def test_fast_mode_locked(
+        self, mock_run: MagicMock, stderr: str, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Test a locked vault is reported with the preflight message."""
+        monkeypatch.setenv(ENV_FAST, "1")
+        mock_run.return_value = MagicMock(returncode=1, stderr=stderr)
+
+        with pytest.raises(BitwardenError) as exc_info:
+            search_items("test")
+
+        assert str(exc_info.value) == (
+            "Bitwarden is locked. Please unlock with: "
+            "export BW_SESSION=$(bw unlock --raw)"
+        )
+        assert "--nointeraction" in mock_run.call_args[0][0]
+
+    @patch("subprocess.run")
+    def test_fast_mode_not_installed(
+        self, mock_run: MagicMock, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Test a missing bw binary is reported with the preflight message."""
+        monkeypatch.setenv(ENV_FAST, "1")
+        mock_run.side_effect = FileNotFoundError("bw")
+
+        with pytest.raises(
+            BitwardenError, match="Bitwarden CLI \\(bw\\) is not installed"
+        ):
+            search_items("test")
+
+    @patch("subprocess.run")
+    def test_fast_mode_other_failure(
+        self, mock_run: MagicMock, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Test other failures keep the operation-specific message."""
+        monkeypatch.setenv(ENV_FAST, "1")
+        mock_run.return_value = MagicMock(returncode=1, stderr="Network error")
+
+        with pytest.raises(
+            BitwardenError, match="Failed to search Bitwarden items: Network error"
+        ):
+            search_items("test")
+
     @patch("sys.exit")
     @patch("builtins.print")
     def test_output_error(self, mock_print: MagicMock, mock_exit: MagicMock) -> None:
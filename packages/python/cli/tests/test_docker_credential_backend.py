@@ -0,0 +1,195 @@
+"""Tests for the pluggable credential backends."""
+
+import json
+import shlex
+import sys
+
+import pytest
+from conftest import FakeBw
+
+from cli.docker_credential import (
+    _cmd_erase_storage,
+    _cmd_get_docker_hub,
+    _cmd_get_storage,
+    _cmd_list_storage,
+    _cmd_store_storage,
+)
+from cli.docker_credential.backend import (
+    ENV_BACKEND,
+    BitwardenBackend,
+    get_backend,
+)
+from cli.docker_credential.bitwarden import BitwardenError
+from cli.docker_credential.cache import ENV_SESSION
+from cli.docker_credential.journal import JOURNAL_NAME, _add_entry, _journal_cipher
+from cli.docker_credential.local import (
+    ENV_LOCAL_KEY,
+    ENV_LOCAL_KEY_COMMAND,
+    LocalFileBackend,
+    store_path,
+)
+from cli.docker_credential.types import StoredCredential
+
+_URL = "https://ghcr.io"
+_DOCKER_HUB_URL = "https://index.docker.io/v1/"
+_CRED = StoredCredential(Username="ci", Secret="s3cret-token")
+
+
+@pytest.fixture
+def local(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Select the local backend with a key from the environment."""
+    monkeypatch.setenv(ENV_BACKEND, "local")
+    monkeypatch.setenv(ENV_LOCAL_KEY, "k" * 32)
+
+
+class TestGetBackend:
+    """Tests for choosing the backend."""
+
+    def test_default(self) -> None:
+        """Test Bitwarden is used unless configured otherwise."""
+        assert isinstance(get_backend(), BitwardenBackend)
+
+    def test_local(self, local: None) -> None:
+        """Test the local backend can be selected."""
+        assert isinstance(get_backend(), LocalFileBackend)
+
+    def test_unknown(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Test a typo is reported instead of falling back to Bitwarden."""
+        monkeypatch.setenv(ENV_BACKEND, "bitwraden")
+
+        with pytest.raises(BitwardenError, match="Unknown"):
+            get_backend()
+
+
+class TestLocalFileBackend:
+    """Tests for the locally encrypted credential file."""
+
+    def test_round_trip(self, local: None) -> None:
+        """Test saved credentials are read back, encrypted at rest."""
+        backend = LocalFileBackend()
+        assert backend.load() == {}
+
+        txn = backend.begin([_URL])
+        txn.credentials[_URL] = _CRED
+        txn.commit()
+
+        assert LocalFileBackend().load() == {_URL: _CRED}
+        assert b"s3cret-token" not in store_path().read_bytes()
+
+    def test_wrong_key(self, local: None, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Test a file written with another key is an error, not empty."""
+        LocalFileBackend().save({_URL: _CRED})
+        monkeypatch.setenv(ENV_LOCAL_KEY, "other")
+
+        with pytest.raises(BitwardenError, match="wrong key"):
+            LocalFileBackend().load()
+
+    def test_key_command(self, local: None, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Test the key can be printed by a keyring-style command."""
+        LocalFileBackend().save({_URL: _CRED})
+        monkeypatch.delenv(ENV_LOCAL_KEY)
+        monkeypatch.setenv(
+            ENV_LOCAL_KEY_COMMAND,
+            shlex.join([sys.executable, "-c", "print('k' * 32)"]),
+        )
+
+        assert LocalFileBackend().load() == {_URL: _CRED}
+
+    def test_missing_key(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Test a missing key is reported."""
+        monkeypatch.setenv(ENV_BACKEND, "local")
+
+        with pytest.raises(BitwardenError, match=ENV_LOCAL_KEY):
+            LocalFileBackend().check()
+
+    def test_search_uses_bitwarden(
+        self,
+        local: None,
+        fake_bw: FakeBw,
+        monkeypatch: pytest.MonkeyPatch,
+        capsys: pytest.CaptureFixture[str],
+    ) -> None:
+        """Test docker-credential-bw-docker still finds the Docker Hub login."""
+        monkeypatch.setenv(ENV_SESSION, "session-token")
+        fake_bw.reset(
+            [
+                {
+                    "id": "hub",
+                    "name": "DockerHub",
+                    "type": 1,
+                    "login": {"username": "hubuser", "password": "hubpass"},
+                }
+            ]
+        )
+
+        _cmd_get_docker_hub(_DOCKER_HUB_URL, "DockerHub")
+
+        assert json.loads(capsys.readouterr().out)["Username"] == "hubuser"
+        assert [login.id for login in LocalFileBackend().list_logins()] == ["hub"]
+
+
+class TestLocalCommands:
+    """Tests for docker-credential-bw on the local backend."""
+
+    def test_commands_skip_bitwarden(
+        self,
+        local: None,
+        fake_bw: FakeBw,
+        capsys: pytest.CaptureFixture[str],
+    ) -> None:
+        """Test store, get, list and erase never start bw."""
+        fake_bw.reset()
+
+        with pytest.raises(SystemExit) as exc_info:
+            _cmd_store_storage({"ServerURL": _URL, "Username": "ci", "Secret": "x"})
+        assert exc_info.value.code == 0
+
+        _cmd_get_storage(_URL)
+        assert json.loads(capsys.readouterr().out)["Secret"] == "x"
+
+        with pytest.raises(SystemExit):
+            _cmd_list_storage()
+        assert json.loads(capsys.readouterr().out) == {_URL: "ci"}
+
+        with pytest.raises(SystemExit):
+            _cmd_erase_storage(_URL)
+        assert LocalFileBackend().load() == {}
+        assert fake_bw.calls == []
+
+    def test_journal_not_shared(
+        self, local: None, fake_bw: FakeBw, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Test a write never applies changes queued for another backend."""
+        monkeypatch.setenv(ENV_SESSION, "session-token")
+        fake_bw.reset()
+        cipher = _journal_cipher(JOURNAL_NAME)
+        assert cipher is not None
+        queued = _add_entry({"https://quay.io": _CRED}, cipher)
+
+        with pytest.raises(SystemExit) as exc_info:
+            _cmd_store_storage({"ServerURL": _URL, "Username": "ci", "Secret": "x"})
+
+        assert exc_info.value.code == 0
+        assert set(LocalFileBackend().load()) == {_URL}
+        assert queued.exists()
+
+    def test_cache_not_shared(
+        self,
+        local: None,
+        fake_bw: FakeBw,
+        monkeypatch: pytest.MonkeyPatch,
+        capsys: pytest.CaptureFixture[str],
+    ) -> None:
+        """Test a store cached for Bitwarden is not served by another backend."""
+        monkeypatch.setenv(ENV_SESSION, "session-token")
+        monkeypatch.delenv(ENV_BACKEND)
+        fake_bw.reset()
+        with pytest.raises(SystemExit):
+            _cmd_store_storage({"ServerURL": _URL, "Username": "bw", "Secret": "x"})
+        _cmd_get_storage(_URL)
+        capsys.readouterr()
+
+        monkeypatch.setenv(ENV_BACKEND, "local")
+        with pytest.raises(SystemExit):
+            _cmd_get_storage(_URL)
+        assert "credentials not found" in capsys.readouterr().err
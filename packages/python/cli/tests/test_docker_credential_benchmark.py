@@ -0,0 +1,54 @@
+"""Smoke test of the benchmark harness and its subprocess thresholds."""
+
+import importlib.util
+import json
+from pathlib import Path
+from types import ModuleType
+
+_BENCHMARKS = Path(__file__).resolve().parents[1] / "benchmarks"
+
+
+def _load_harness() -> ModuleType:
+    spec = importlib.util.spec_from_file_location(
+        "bench_docker_credential", _BENCHMARKS / "docker_credential.py"
+    )
+    assert spec is not None and spec.loader is not None
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_bw_calls_within_thresholds() -> None:
+    """Every scenario on a small vault stays within its bw call budget."""
+    harness = _load_harness()
+    thresholds = json.loads((_BENCHMARKS / "thresholds.json").read_text())
+
+    results = harness.run_suite([10])
+
+    scenarios = {result.scenario for result in results}
+    assert scenarios == set(thresholds["bw_calls"])
+    # Timing and memory depend on the machine; only counts are checked here
+    assert harness.check_thresholds(results, {"bw_calls": thresholds["bw_calls"]}) == []
+
+
+def test_extra_call_is_a_violation() -> None:
+    """A scenario needing one more bw call than allowed is reported."""
+    harness = _load_harness()
+    result = harness.Result(
+        size=10,
+        helper="docker-credential-bw",
+        command="get",
+        phase="cold",
+        exit_code=0,
+        wall_seconds=0.5,
+        peak_rss_mb=40.0,
+        bw_calls=3,
+        bw_commands=["status", "list items", "list items"],
+    )
+
+    violations = harness.check_thresholds(
+        [result], {"bw_calls": {"docker-credential-bw get cold": 2}}
+    )
+
+    assert len(violations) == 1
+    assert "3 bw calls > 2" in violations[0]
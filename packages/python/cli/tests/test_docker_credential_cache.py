@@ -0,0 +1,549 @@
+"""Tests for the encrypted credential cache."""
+
+import io
+import json
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+from conftest import FakeBw, secure_note
+
+from cli.docker_credential import (
+    _cmd_erase_storage,
+    _cmd_get_docker_hub,
+    _cmd_get_storage,
+    _cmd_list_docker_hub,
+    _cmd_list_storage,
+    _cmd_store_noop,
+    _cmd_store_storage,
+    _cmd_warm_docker_hub,
+    _cmd_warm_storage,
+    docker_credential_bw_docker,
+)
+from cli.docker_credential.cache import (
+    ENV_CACHE_TTL,
+    ENV_NEGATIVE_TTL,
+    ENV_NO_CACHE,
+    ENV_SESSION,
+    cache_dir,
+    get_cache,
+    get_miss_cache,
+    load_cached_store,
+    save_cached_store,
+)
+from cli.docker_credential.types import StoredCredential
+
+_URL = "https://ghcr.io"
+_STORE = {_URL: StoredCredential(Username="user", Secret="pass")}
+
+
+@pytest.fixture
+def session(monkeypatch: pytest.MonkeyPatch) -> str:
+    """Provide an unlocked-looking Bitwarden session."""
+    monkeypatch.setenv(ENV_SESSION, "session-token")
+    return "session-token"
+
+
+class TestEncryptedCache:
+    """Tests for the cache primitives."""
+
+    def test_disabled_without_session(self) -> None:
+        """No session means no cache."""
+        assert get_cache("credentials") is None
+
+    def test_disabled_by_env(
+        self, session: str, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """The bypass variable disables the cache."""
+        monkeypatch.setenv(ENV_NO_CACHE, "1")
+        assert get_cache("credentials") is None
+
+    def test_round_trip(self, session: str) -> None:
+        """A saved store can be read back."""
+        cache = get_cache("credentials")
+        assert cache is not None
+        save_cached_store(cache, _STORE)
+        assert load_cached_store(cache) == _STORE
+
+    def test_encrypted_at_rest(self, session: str) -> None:
+        """Secrets do not appear in the cache file."""
+        cache = get_cache("credentials")
+        assert cache is not None
+        save_cached_store(cache, _STORE)
+
+        raw = (cache_dir() / "credentials.bin").read_bytes()
+        assert b"pass" not in raw
+        assert b"user" not in raw
+
+    def test_other_session_misses(
+        self, session: str, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """A different session cannot read the entry."""
+        cache = get_cache("credentials")
+        assert cache is not None
+        save_cached_store(cache, _STORE)
+
+        monkeypatch.setenv(ENV_SESSION, "other-session")
+        other = get_cache("credentials")
+        assert other is not None
+        assert load_cached_store(other) is None
+
+    def test_expired(self, session: str, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Entries older than the TTL are ignored."""
+        monkeypatch.setenv(ENV_CACHE_TTL, "10")
+        cache = get_cache("credentials")
+        assert cache is not None
+        save_cached_store(cache, _STORE)
+
+        with patch("time.time", return_value=time.time() + 60):
+            assert load_cached_store(cache) is None
+
+
+class TestCachedCommands:
+    """Tests for the read-through cache in the storage commands."""
+
+    @patch("cli.docker_credential.backend.check_bw_status")
+    @patch("cli.docker_credential.backend.get_all_credentials")
+    @patch("builtins.print")
+    def test_get_hit_skips_bitwarden(
+        self,
+        mock_print: MagicMock,
+        mock_get_all: MagicMock,
+        mock_check: MagicMock,
+        session: str,
+    ) -> None:
+        """The second get is served from the cache."""
+        mock_get_all.return_value = dict(_STORE)
+
+        _cmd_get_storage(_URL)
+        _cmd_get_storage(_URL)
+
+        assert mock_check.call_count == 1
+        assert mock_get_all.call_count == 1
+        output = json.loads(mock_print.call_args[0][0])
+        assert output["Secret"] == "pass"
+
+    @patch("cli.docker_credential.backend.check_bw_status")
+    @patch("cli.docker_credential.backend.get_all_credentials")
+    @patch("builtins.print")
+    def test_list_hit_skips_bitwarden(
+        self,
+        mock_print: MagicMock,
+        mock_get_all: MagicMock,
+        mock_check: MagicMock,
+        session: str,
+    ) -> None:
+        """The second list is served from the cache."""
+        mock_get_all.return_value = dict(_STORE)
+
+        with pytest.raises(SystemExit):
+            _cmd_list_storage()
+        with pytest.raises(SystemExit):
+            _cmd_list_storage()
+
+        assert mock_get_all.call_count == 1
+        assert json.loads(mock_print.call_args[0][0]) == {_URL: "user"}
+
+    @patch("cli.docker_credential.backend.check_bw_status")
+    @patch("cli.docker_credential.backend.CredentialTransaction")
+    def test_store_invalidates(
+        self,
+        mock_txn_cls: MagicMock,
+        mock_check: MagicMock,
+        session: str,
+    ) -> None:
+        """store drops the cached store."""
+        cache = get_cache("credentials")
+        assert cache is not None
+        save_cached_store(cache, _STORE)
+        mock_txn_cls.begin.return_value.credentials = {}
+
+        with pytest.raises(SystemExit):
+            _cmd_store_storage(
+                {"ServerURL": "https://quay.io", "Username": "u", "Secret": "s"}
+            )
+
+        assert load_cached_store(cache) is None
+
+    @patch("cli.docker_credential.backend.check_bw_status")
+    @patch("cli.docker_credential.backend.CredentialTransaction")
+    def test_store_drops_store_cached_during_commit(
+        self,
+        mock_txn_cls: MagicMock,
+        mock_check: MagicMock,
+        session: str,
+    ) -> None:
+        """A get racing the commit cannot leave the old store cached."""
+        cache = get_cache("credentials")
+        assert cache is not None
+        txn = mock_txn_cls.begin.return_value
+        txn.credentials = {}
+        # A concurrent get read the vault before the commit and caches it now
+        txn.commit.side_effect = lambda: save_cached_store(cache, {})
+
+        with pytest.raises(SystemExit):
+            _cmd_store_storage(
+                {"ServerURL": "https://quay.io", "Username": "u", "Secret": "s"}
+            )
+
+        txn.commit.assert_called_once()
+        assert load_cached_store(cache) is None
+
+    @patch("cli.docker_credential.backend.check_bw_status")
+    @patch("cli.docker_credential.backend.CredentialTransaction")
+    def test_erase_invalidates(
+        self,
+        mock_txn_cls: MagicMock,
+        mock_check: MagicMock,
+        session: str,
+    ) -> None:
+        """erase drops the cached store."""
+        cache = get_cache("credentials")
+        assert cache is not None
+        save_cached_store(cache, _STORE)
+        mock_txn_cls.begin.return_value.credentials = dict(_STORE)
+
+        with pytest.raises(SystemExit):
+            _cmd_erase_storage(_URL)
+
+        assert load_cached_store(cache) is None
+
+    @patch("cli.docker_credential.backend.check_bw_status")
+    @patch("cli.docker_credential.backend.CredentialTransaction")
+    def test_store_unchanged_skips_write(
+        self,
+        mock_txn_cls: MagicMock,
+        mock_check: MagicMock,
+        session: str,
+    ) -> None:
+        """store of a credential the vault already holds writes nothing."""
+        cache = get_cache("credentials")
+        assert cache is not None
+        save_cached_store(cache, _STORE)
+        mock_txn_cls.begin.return_value.credentials = dict(_STORE)
+
+        with pytest.raises(SystemExit) as exc_info:
+            _cmd_store_storage(
+                {"ServerURL": _URL, "Username": "user", "Secret": "pass"}
+            )
+
+        assert exc_info.value.code == 0
+        mock_txn_cls.begin.return_value.commit.assert_not_called()
+        # The cached store may predate the credential; the next read refreshes it
+        assert load_cached_store(cache) is None
+
+    @patch("cli.docker_credential.backend.check_bw_status")
+    @patch("cli.docker_credential.backend.CredentialTransaction")
+    def test_store_not_skipped_on_stale_cache(
+        self,
+        mock_txn_cls: MagicMock,
+        mock_check: MagicMock,
+        session: str,
+    ) -> None:
+        """store writes if the vault changed since the cache was filled."""
+        cache = get_cache("credentials")
+        assert cache is not None
+        save_cached_store(cache, _STORE)
+        # Erased on another machine after this one cached the store
+        mock_txn_cls.begin.return_value.credentials = {}
+
+        with pytest.raises(SystemExit) as exc_info:
+            _cmd_store_storage(
+                {"ServerURL": _URL, "Username": "user", "Secret": "pass"}
+            )
+
+        assert exc_info.value.code == 0
+        mock_txn_cls.begin.return_value.commit.assert_called_once()
+
+    @patch("cli.docker_credential.backend.check_bw_status")
+    @patch("cli.docker_credential.backend.CredentialTransaction")
+    def test_erase_not_skipped_on_stale_cache(
+        self,
+        mock_txn_cls: MagicMock,
+        mock_check: MagicMock,
+        session: str,
+    ) -> None:
+        """erase removes a URL stored elsewhere after the cache was filled."""
+        cache = get_cache("credentials")
+        assert cache is not None
+        save_cached_store(cache, _STORE)
+        quay = StoredCredential(Username="q", Secret="q")
+        mock_txn_cls.begin.return_value.credentials = {"https://quay.io": quay}
+
+        with pytest.raises(SystemExit) as exc_info:
+            _cmd_erase_storage("https://quay.io")
+
+        assert exc_info.value.code == 0
+        txn = mock_txn_cls.begin.return_value
+        assert txn.credentials == {}
+        txn.commit.assert_called_once()
+
+
+class TestMissCache:
+    """Tests for the record of lookups that found nothing."""
+
+    def test_round_trip(self, session: str) -> None:
+        """Recorded misses are found until cleared."""
+        misses = get_miss_cache("misses")
+        assert misses is not None
+        assert not misses.contains("ghcr.io")
+
+        misses.add("ghcr.io")
+        assert misses.contains("ghcr.io")
+        assert not misses.contains("quay.io")
+
+        misses.clear()
+        assert not misses.contains("ghcr.io")
+
+    def test_each_miss_expires(
+        self, session: str, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """A new miss does not extend the lifetime of older ones."""
+        monkeypatch.setenv(ENV_NEGATIVE_TTL, "10")
+        misses = get_miss_cache("misses")
+        assert misses is not None
+        now = time.time()
+
+        with patch("time.time", return_value=now - 20):
+            misses.add("ghcr.io")
+        misses.add("quay.io")
+
+        assert not misses.contains("ghcr.io")
+        assert misses.contains("quay.io")
+
+
+class TestCachedMisses:
+    """Tests for repeated lookups of registries without credentials."""
+
+    def _expire_store(self) -> None:
+        cache = get_cache("credentials")
+        assert cache is not None
+        cache.invalidate()
+
+    def test_get_storage_miss_skips_bitwarden(
+        self, session: str, fake_bw: FakeBw
+    ) -> None:
+        """A repeated miss does not start bw, even once the store expired."""
+        fake_bw.reset()
+
+        with pytest.raises(SystemExit):
+            _cmd_get_storage("https://public.example.com")
+        assert fake_bw.calls
+        fake_bw.clear_calls()
+        self._expire_store()
+
+        with pytest.raises(SystemExit):
+            _cmd_get_storage("public.example.com/")
+        assert fake_bw.calls == []
+
+    def test_store_clears_misses(
+        self, session: str, fake_bw: FakeBw, capsys: pytest.CaptureFixture[str]
+    ) -> None:
+        """A stored credential is found right after an earlier miss."""
+        fake_bw.reset()
+        with pytest.raises(SystemExit):
+            _cmd_get_storage(_URL)
+
+        with pytest.raises(SystemExit):
+            _cmd_store_storage({"ServerURL": _URL, "Username": "u", "Secret": "s"})
+        capsys.readouterr()
+
+        _cmd_get_storage(_URL)
+        assert json.loads(capsys.readouterr().out)["Username"] == "u"
+
+    def test_unchanged_store_clears_misses(
+        self, session: str, fake_bw: FakeBw, capsys: pytest.CaptureFixture[str]
+    ) -> None:
+        """A store the vault already holds still makes the credential visible."""
+        fake_bw.reset()
+        with pytest.raises(SystemExit):
+            _cmd_get_storage(_URL)
+        # Another machine stores the same credential meanwhile
+        fake_bw.reset(
+            [secure_note({_URL: {"Username": "u", "Secret": "s"}}, item_id="note")]
+        )
+
+        with pytest.raises(SystemExit) as exc_info:
+            _cmd_store_storage({"ServerURL": _URL, "Username": "u", "Secret": "s"})
+        assert exc_info.value.code == 0
+        assert ["edit", "item", "note"] not in fake_bw.calls
+        capsys.readouterr()
+
+        _cmd_get_storage(_URL)
+        assert json.loads(capsys.readouterr().out)["Username"] == "u"
+        with pytest.raises(SystemExit):
+            _cmd_list_storage()
+        assert json.loads(capsys.readouterr().out) == {_URL: "u"}
+
+    def test_get_docker_hub_miss_skips_bitwarden(
+        self, session: str, fake_bw: FakeBw
+    ) -> None:
+        """A repeated Docker Hub search miss does not start bw until a login."""
+        fake_bw.reset()
+        hub = "https://index.docker.io/v1/"
+
+        with pytest.raises(SystemExit):
+            _cmd_get_docker_hub(hub, "DockerHub")
+        fake_bw.clear_calls()
+
+        with pytest.raises(SystemExit):
+            _cmd_get_docker_hub(hub, "DockerHub")
+        assert fake_bw.calls == []
+
+        with pytest.raises(SystemExit):
+            _cmd_store_noop({"ServerURL": hub, "Username": "u", "Secret": "s"})
+        with pytest.raises(SystemExit):
+            _cmd_get_docker_hub(hub, "DockerHub")
+        assert fake_bw.calls
+
+
+class TestWarm:
+    """Tests for prefetching credentials."""
+
+    def test_warm_storage_fills_cache(
+        self, session: str, fake_bw: FakeBw, capsys: pytest.CaptureFixture[str]
+    ) -> None:
+        """After warm, get is answered without bw and reports timing."""
+        fake_bw.reset([secure_note({_URL: {"Username": "u", "Secret": "s"}})])
+
+        with pytest.raises(SystemExit) as exc_info:
+            _cmd_warm_storage()
+
+        assert exc_info.value.code == 0
+        report = json.loads(capsys.readouterr().out)
+        assert report["credentials"] == 1
+        assert report["total_seconds"] >= report["load_seconds"] >= 0
+        assert "status_seconds" in report
+
+        fake_bw.clear_calls()
+        _cmd_get_storage(_URL)
+        assert fake_bw.calls == []
+
+    def test_warm_docker_hub(
+        self, session: str, fake_bw: FakeBw, capsys: pytest.CaptureFixture[str]
+    ) -> None:
+        """warm runs the search once and reports the matches."""
+        fake_bw.reset(
+            [
+                {
+                    "id": "login-1",
+                    "name": "DockerHub",
+                    "type": 1,
+                    "login": {"username": "u", "password": "p"},
+                }
+            ]
+        )
+
+        with pytest.raises(SystemExit) as exc_info:
+            _cmd_warm_docker_hub("DockerHub")
+
+        assert exc_info.value.code == 0
+        report = json.loads(capsys.readouterr().out)
+        assert report["items"] == 1
+        assert set(report) == {
+            "items",
+            "status_seconds",
+            "search_seconds",
+            "total_seconds",
+        }
+
+
+def _hub_login(username: str = "u", password: str = "p") -> dict[str, object]:
+    return {
+        "id": "login-1",
+        "name": "DockerHub",
+        "type": 1,
+        "login": {
+            "username": username,
+            "password": password,
+            "uris": [{"uri": _URL}],
+        },
+    }
+
+
+class TestCachedSearch:
+    """Tests for the search result cache of docker-credential-bw-docker."""
+
+    def test_get_and_list_served_from_cache(
+        self, session: str, fake_bw: FakeBw, capsys: pytest.CaptureFixture[str]
+    ) -> None:
+        """After one search, get and list do not call bw."""
+        fake_bw.reset([_hub_login()])
+
+        _cmd_get_docker_hub("https://index.docker.io/v1/", "DockerHub")
+        capsys.readouterr()
+        fake_bw.clear_calls()
+        _cmd_get_docker_hub("https://index.docker.io/v1/", "DockerHub")
+        _cmd_list_docker_hub("DockerHub")
+
+        assert fake_bw.calls == []
+        get_output, list_output = capsys.readouterr().out.splitlines()
+        assert json.loads(get_output)["Secret"] == "p"
+        assert json.loads(list_output) == {"https://index.docker.io/v1/": "u"}
+
+    def test_login_uri_served_from_cache(
+        self, session: str, fake_bw: FakeBw, capsys: pytest.CaptureFixture[str]
+    ) -> None:
+        """A registry resolved by login URI is not listed again."""
+        fake_bw.reset([_hub_login()])
+
+        _cmd_get_docker_hub(_URL, "DockerHub")
+        fake_bw.clear_calls()
+        _cmd_get_docker_hub(_URL, "DockerHub")
+
+        assert fake_bw.calls == []
+        assert json.loads(capsys.readouterr().out.splitlines()[-1])["Secret"] == "p"
+
+    def test_refresh(
+        self,
+        session: str,
+        fake_bw: FakeBw,
+        capsys: pytest.CaptureFixture[str],
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        """The refresh flag bypasses cached results and updates them."""
+        fake_bw.reset([_hub_login()])
+        _cmd_list_docker_hub("DockerHub")
+        fake_bw.reset([_hub_login(username="new")])
+
+        docker_credential_bw_docker("list", "DockerHub")
+        assert fake_bw.calls == []
+        docker_credential_bw_docker("list", "DockerHub", refresh=True)
+        assert fake_bw.calls != []
+
+        fake_bw.clear_calls()
+        monkeypatch.setattr("sys.stdin", io.StringIO(_URL))
+        docker_credential_bw_docker("get", "DockerHub", refresh=True)
+        assert fake_bw.calls != []
+
+        outputs = capsys.readouterr().out.splitlines()
+        assert [json.loads(line) for line in outputs[:3]] == [
+            {"https://index.docker.io/v1/": "u"},
+            {"https://index.docker.io/v1/": "u"},
+            {"https://index.docker.io/v1/": "new"},
+        ]
+        assert json.loads(outputs[3])["Username"] == "new"
+
+    def test_search_encrypted_at_rest(self, session: str, fake_bw: FakeBw) -> None:
+        """Cached search results do not reveal secrets or the search term."""
+        fake_bw.reset([_hub_login(password="t0ps3cret")])
+
+        _cmd_list_docker_hub("DockerHub")
+
+        files = list(cache_dir().glob("search-*"))
+        assert len(files) == 1
+        assert "DockerHub" not in files[0].name
+        assert b"t0ps3cret" not in files[0].read_bytes()
+
+    def test_other_session_searches_again(
+        self, session: str, fake_bw: FakeBw, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Results cached for one session are not served to another."""
+        fake_bw.reset([_hub_login()])
+        _cmd_list_docker_hub("DockerHub")
+        fake_bw.clear_calls()
+
+        monkeypatch.setenv(ENV_SESSION, "other-session")
+        _cmd_list_docker_hub("DockerHub")
+
+        assert fake_bw.calls != []
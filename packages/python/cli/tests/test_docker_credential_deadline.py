@@ -0,0 +1,308 @@
+"""Tests for the deadline of one helper invocation."""
+
+import io
+import json
+import threading
+import time
+from collections.abc import Iterator
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+from unittest.mock import patch
+
+import pytest
+from conftest import FakeBw, secure_note
+
+from cli.docker_credential import (
+    _cmd_get_storage,
+    _cmd_list_docker_hub,
+    docker_credential_bw,
+)
+from cli.docker_credential.bitwarden import (
+    BitwardenTimeoutError,
+    check_bw_status,
+    list_items,
+)
+from cli.docker_credential.cache import ENV_CACHE_TTL, ENV_SESSION
+from cli.docker_credential.deadline import (
+    ENV_TIMEOUT,
+    remaining,
+    start_deadline,
+    timeout_from_env,
+)
+from cli.docker_credential.serve import ENV_SERVE_URL
+
+_URL = "https://ghcr.io"
+_NOTE = secure_note({_URL: {"Username": "u", "Secret": "s"}})
+_LOGIN = {
+    "id": "login-1",
+    "name": "DockerHub",
+    "type": 1,
+    "login": {"username": "u", "password": "p"},
+}
+
+
+@pytest.fixture
+def slow_bw(fake_bw: FakeBw, monkeypatch: pytest.MonkeyPatch) -> FakeBw:
+    """Make every bw call take far longer than the tests' deadline."""
+    monkeypatch.setenv("FAKE_BW_DELAY", "30")
+    return fake_bw
+
+
+class SlowServe:
+    """Stub bw serve whose answers, except to the status probe, can be slow."""
+
+    def __init__(self) -> None:
+        self.delay = 0.0
+        self.items: list[dict[str, Any]] = []
+
+    def handler(self) -> type[BaseHTTPRequestHandler]:
+        serve = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+            def do_GET(self) -> None:
+                if self.path == "/status":
+                    data: Any = {"template": {"status": "unlocked"}}
+                else:
+                    time.sleep(serve.delay)
+                    data = {"object": "list", "data": serve.items}
+                body = json.dumps({"success": True, "data": data}).encode()
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+
+@pytest.fixture
+def slow_serve(monkeypatch: pytest.MonkeyPatch) -> Iterator[SlowServe]:
+    """Run the stub bw serve and point BW_SERVE_URL at it."""
+    serve = SlowServe()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), serve.handler())
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setenv(ENV_SERVE_URL, f"http://127.0.0.1:{server.server_port}")
+    try:
+        yield serve
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+class TestDeadline:
+    """Tests for the budget itself."""
+
+    def test_default(self) -> None:
+        """Without configuration, invocations get 30 seconds."""
+        assert timeout_from_env() == 30
+
+    def test_disabled(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """A budget of 0 disables the deadline."""
+        monkeypatch.setenv(ENV_TIMEOUT, "0")
+        start_deadline()
+        assert remaining() is None
+
+    def test_counts_down(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """The time left shrinks and never drops below 0."""
+        monkeypatch.setenv(ENV_TIMEOUT, "5")
+        start_deadline()
+        left = remaining()
+        assert left is not None and 4 < left <= 5
+
+        with patch("time.monotonic", return_value=time.monotonic() + 60):
+            assert remaining() == 0
+
+
+class TestSubprocessTimeouts:
+    """Tests for killing bw at the deadline."""
+
+    def test_run_killed(self, slow_bw: FakeBw) -> None:
+        """A slow bw status is killed instead of waited for."""
+        start_deadline(0.5)
+        started = time.monotonic()
+
+        with pytest.raises(BitwardenTimeoutError, match="0.5 seconds"):
+            check_bw_status()
+
+        assert time.monotonic() - started < 10
+
+    def test_streamed_listing_killed(self, slow_bw: FakeBw) -> None:
+        """A slow streamed listing is killed instead of waited for."""
+        start_deadline(0.5)
+        started = time.monotonic()
+
+        with pytest.raises(BitwardenTimeoutError):
+            list_items()
+
+        assert time.monotonic() - started < 10
+
+    def test_no_call_after_deadline(self, fake_bw: FakeBw) -> None:
+        """Once the budget is spent, bw is not started at all."""
+        start_deadline(0.5)
+
+        with (
+            patch("time.monotonic", return_value=time.monotonic() + 60),
+            pytest.raises(BitwardenTimeoutError),
+        ):
+            check_bw_status()
+
+        assert fake_bw.calls == []
+
+    def test_budget_shared(
+        self, fake_bw: FakeBw, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Each bw call only gets what earlier calls left over."""
+        monkeypatch.setenv("FAKE_BW_DELAY", "0.4")
+        start_deadline(1.0)
+
+        check_bw_status()
+        with pytest.raises(BitwardenTimeoutError):
+            list_items()
+            list_items()
+
+    def test_reported_to_docker(
+        self,
+        slow_bw: FakeBw,
+        monkeypatch: pytest.MonkeyPatch,
+        capsys: pytest.CaptureFixture[str],
+    ) -> None:
+        """The entry point reports the timeout in Docker's error format."""
+        monkeypatch.setenv(ENV_TIMEOUT, "0.5")
+        monkeypatch.setattr("sys.stdin", io.StringIO(_URL))
+
+        with pytest.raises(SystemExit) as exc_info:
+            docker_credential_bw("get")
+
+        assert exc_info.value.code == 1
+        error = json.loads(capsys.readouterr().err)["error"]
+        assert "did not respond within 0.5 seconds" in error
+
+    def test_slow_sync_after_write(
+        self,
+        fake_bw: FakeBw,
+        monkeypatch: pytest.MonkeyPatch,
+        capsys: pytest.CaptureFixture[str],
+    ) -> None:
+        """A sync running out of time does not fail a write that happened."""
+        fake_bw.reset()
+        monkeypatch.setenv("FAKE_BW_SYNC_DELAY", "30")
+        monkeypatch.setenv(ENV_TIMEOUT, "2")
+        credential = {"ServerURL": _URL, "Username": "u", "Secret": "s"}
+        monkeypatch.setattr("sys.stdin", io.StringIO(json.dumps(credential)))
+
+        with pytest.raises(SystemExit) as exc_info:
+            docker_credential_bw("store")
+
+        assert exc_info.value.code == 0, capsys.readouterr().err
+        assert [item["name"] for item in fake_bw.items] == ["docker-credentials"]
+
+
+class TestServeTimeouts:
+    """Tests for bw serve requests running into the deadline."""
+
+    def test_request_timed_out(self, slow_serve: SlowServe) -> None:
+        """A slow bw serve answer is reported as a timeout."""
+        slow_serve.delay = 5
+        start_deadline(1.0)
+        check_bw_status()
+        started = time.monotonic()
+
+        with pytest.raises(BitwardenTimeoutError, match="did not respond"):
+            list_items()
+
+        assert time.monotonic() - started < 4
+
+    def test_no_request_after_deadline(self, slow_serve: SlowServe) -> None:
+        """Once the budget is spent, no request is sent."""
+        start_deadline(1.0)
+        check_bw_status()
+
+        with (
+            patch("time.monotonic", return_value=time.monotonic() + 60),
+            pytest.raises(BitwardenTimeoutError),
+        ):
+            list_items()
+
+    def test_stale_cache(
+        self,
+        slow_serve: SlowServe,
+        monkeypatch: pytest.MonkeyPatch,
+        capsys: pytest.CaptureFixture[str],
+    ) -> None:
+        """An expired credential store is served when bw serve times out."""
+        monkeypatch.setenv(ENV_SESSION, "session-token")
+        monkeypatch.setenv(ENV_CACHE_TTL, "10")
+        slow_serve.items = [_NOTE]
+        _cmd_get_storage(_URL)
+        capsys.readouterr()
+
+        slow_serve.delay = 5
+        start_deadline(1.0)
+        with patch("time.time", return_value=time.time() + 60):
+            _cmd_get_storage(_URL)
+
+        assert json.loads(capsys.readouterr().out)["Secret"] == "s"
+
+
+class TestStaleCache:
+    """Tests for answering from an expired cache entry at the deadline."""
+
+    @pytest.fixture(autouse=True)
+    def session(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        monkeypatch.setenv(ENV_SESSION, "session-token")
+        monkeypatch.setenv(ENV_CACHE_TTL, "10")
+
+    def test_storage_get(
+        self,
+        fake_bw: FakeBw,
+        monkeypatch: pytest.MonkeyPatch,
+        capsys: pytest.CaptureFixture[str],
+    ) -> None:
+        """An expired credential store is served when bw times out."""
+        fake_bw.reset([_NOTE])
+        _cmd_get_storage(_URL)
+        capsys.readouterr()
+
+        monkeypatch.setenv("FAKE_BW_DELAY", "30")
+        start_deadline(0.5)
+        with patch("time.time", return_value=time.time() + 60):
+            _cmd_get_storage(_URL)
+
+        assert json.loads(capsys.readouterr().out)["Secret"] == "s"
+
+    def test_search(
+        self,
+        fake_bw: FakeBw,
+        monkeypatch: pytest.MonkeyPatch,
+        capsys: pytest.CaptureFixture[str],
+    ) -> None:
+        """Expired search results are served when bw times out."""
+        fake_bw.reset([_LOGIN])
+        _cmd_list_docker_hub("DockerHub")
+        capsys.readouterr()
+
+        monkeypatch.setenv("FAKE_BW_DELAY", "30")
+        start_deadline(0.5)
+        with patch("time.time", return_value=time.time() + 60):
+            _cmd_list_docker_hub("DockerHub")
+
+        assert json.loads(capsys.readouterr().out) == {
+            "https://index.docker.io/v1/": "u"
+        }
+
+    def test_nothing_cached(
+        self, slow_bw: FakeBw, capsys: pytest.CaptureFixture[str]
+    ) -> None:
+        """Without any cached value, the timeout is reported."""
+        start_deadline(0.5)
+
+        with pytest.raises(SystemExit) as exc_info:
+            _cmd_get_storage(_URL)
+
+        assert exc_info.value.code == 1
+        assert "did not respond" in capsys.readouterr().err
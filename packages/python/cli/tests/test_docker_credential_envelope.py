@@ -0,0 +1,84 @@
+"""Tests for the versioned credential note format."""
+
+import json
+
+import pytest
+from conftest import FakeBw, secure_note
+
+from cli.docker_credential.bitwarden import (
+    BitwardenError,
+    get_all_credentials,
+    save_all_credentials,
+)
+from cli.docker_credential.envelope import (
+    EnvelopeError,
+    decode_payload,
+    encode_payload,
+    is_enveloped,
+)
+from cli.docker_credential.types import StoredCredential
+
+_ITEM_NAME = "docker-credentials"
+_CREDS = {
+    f"https://{n}.dkr.ecr.eu-west-1.amazonaws.com": {
+        "Username": "AWS",
+        "Secret": "eyJwYXlsb2FkIjoi" + "A" * 200 + str(n),
+    }
+    for n in range(10)
+}
+
+
+class TestEnvelope:
+    """Tests for encoding and decoding payloads."""
+
+    def test_round_trip(self) -> None:
+        """Test encoded data decodes to the same value."""
+        text = encode_payload(_CREDS)
+
+        assert text.startswith("docker-credential-bw:1:")
+        assert is_enveloped(text)
+        assert decode_payload(text) == _CREDS
+
+    def test_smaller_than_plain_json(self) -> None:
+        """Test the envelope is more compact than the old format."""
+        assert len(encode_payload(_CREDS)) < len(json.dumps(_CREDS)) / 2
+
+    def test_plain_json(self) -> None:
+        """Test notes written before the envelope existed are still read."""
+        assert not is_enveloped(json.dumps(_CREDS))
+        assert decode_payload(json.dumps(_CREDS)) == _CREDS
+
+    def test_unknown_version(self) -> None:
+        """Test a newer format is rejected instead of read as empty."""
+        with pytest.raises(EnvelopeError, match="version: 2"):
+            decode_payload("docker-credential-bw:2:AAAA")
+
+    def test_corrupted(self) -> None:
+        """Test a damaged payload is rejected."""
+        with pytest.raises(EnvelopeError, match="Corrupted"):
+            decode_payload("docker-credential-bw:1:not-base64!")
+
+
+class TestStoredNotes:
+    """Tests for the format of the secure note in the vault."""
+
+    def test_plain_note_upgraded_on_write(self, fake_bw: FakeBw) -> None:
+        """Test an old plain JSON note is read and rewritten as an envelope."""
+        fake_bw.reset([secure_note(json.dumps(_CREDS))])
+
+        credentials = get_all_credentials(_ITEM_NAME)
+        assert set(credentials) == set(_CREDS)
+
+        credentials["https://ghcr.io"] = StoredCredential(Username="u", Secret="s")
+        save_all_credentials(_ITEM_NAME, credentials)
+
+        notes = fake_bw.items[0]["notes"]
+        assert is_enveloped(notes)
+        assert set(decode_payload(notes)) == {*_CREDS, "https://ghcr.io"}
+
+    def test_unknown_version_is_an_error(self, fake_bw: FakeBw) -> None:
+        """Test a note from a newer helper is not treated as an empty store."""
+        fake_bw.reset([secure_note("docker-credential-bw:9:AAAA")])
+
+        with pytest.raises(BitwardenError, match="Unsupported"):
+            get_all_credentials(_ITEM_NAME)
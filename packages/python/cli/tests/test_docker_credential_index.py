@@ -0,0 +1,97 @@
+"""Tests for the local item-ID index."""
+
+from conftest import FakeBw, secure_note
+
+from cli.docker_credential.bitwarden import get_all_credentials, save_all_credentials
+from cli.docker_credential.envelope import decode_payload
+from cli.docker_credential.index import (
+    forget_item_id,
+    lookup_item_id,
+    remember_item_id,
+)
+from cli.docker_credential.types import StoredCredential
+
+_ITEM_NAME = "docker-credentials"
+
+
+_CREDS = {"https://ghcr.io": {"Username": "user", "Secret": "pass"}}
+_OTHER_ITEMS = [{"id": f"login-{n}", "name": f"Login {n}", "type": 1} for n in range(3)]
+
+
+class TestItemIndex:
+    """Tests for the index file itself."""
+
+    def test_round_trip(self) -> None:
+        """Remembered IDs can be looked up and forgotten."""
+        assert lookup_item_id(_ITEM_NAME, 2) is None
+
+        remember_item_id(_ITEM_NAME, 2, "abc")
+        assert lookup_item_id(_ITEM_NAME, 2) == "abc"
+        assert lookup_item_id(_ITEM_NAME, 1) is None
+
+        forget_item_id(_ITEM_NAME, 2)
+        assert lookup_item_id(_ITEM_NAME, 2) is None
+
+
+class TestIndexedLookup:
+    """Tests for storage lookups through the index."""
+
+    def test_first_read_lists_then_uses_id(self, fake_bw: FakeBw) -> None:
+        """Only the first read lists the vault."""
+        fake_bw.reset([*_OTHER_ITEMS, secure_note(_CREDS)])
+
+        assert get_all_credentials(_ITEM_NAME)["https://ghcr.io"].Username == "user"
+        assert fake_bw.calls == [["list", "items"]]
+        assert lookup_item_id(_ITEM_NAME, 2) == "note-1"
+
+        fake_bw.clear_calls()
+        assert get_all_credentials(_ITEM_NAME)["https://ghcr.io"].Username == "user"
+        assert fake_bw.calls == [["get", "item", "note-1"]]
+
+    def test_deleted_item_falls_back(self, fake_bw: FakeBw) -> None:
+        """A deleted item is found again by listing."""
+        fake_bw.reset([secure_note(_CREDS, item_id="note-2")])
+        remember_item_id(_ITEM_NAME, 2, "note-1")
+
+        assert "https://ghcr.io" in get_all_credentials(_ITEM_NAME)
+        assert fake_bw.calls == [["get", "item", "note-1"], ["list", "items"]]
+        assert lookup_item_id(_ITEM_NAME, 2) == "note-2"
+
+    def test_mismatched_item_falls_back(self, fake_bw: FakeBw) -> None:
+        """An ID pointing at another item is not trusted."""
+        fake_bw.reset([*_OTHER_ITEMS, secure_note(_CREDS)])
+        remember_item_id(_ITEM_NAME, 2, "login-0")
+
+        assert "https://ghcr.io" in get_all_credentials(_ITEM_NAME)
+        assert lookup_item_id(_ITEM_NAME, 2) == "note-1"
+
+    def test_missing_item(self, fake_bw: FakeBw) -> None:
+        """No note means no credentials and no index entry."""
+        fake_bw.reset(_OTHER_ITEMS)
+
+        assert get_all_credentials(_ITEM_NAME) == {}
+        assert lookup_item_id(_ITEM_NAME, 2) is None
+
+    def test_save_uses_index(self, fake_bw: FakeBw) -> None:
+        """Saving an indexed note skips the listing."""
+        fake_bw.reset([secure_note(_CREDS)])
+        remember_item_id(_ITEM_NAME, 2, "note-1")
+
+        save_all_credentials(
+            _ITEM_NAME, {"https://quay.io": StoredCredential(Username="q", Secret="s")}
+        )
+
+        assert ["list", "items"] not in fake_bw.calls
+        assert decode_payload(fake_bw.items[0]["notes"]) == {
+            "https://quay.io": {"Username": "q", "Secret": "s"}
+        }
+
+    def test_create_remembers_id(self, fake_bw: FakeBw) -> None:
+        """A newly created note is indexed."""
+        fake_bw.reset()
+
+        save_all_credentials(
+            _ITEM_NAME, {"https://quay.io": StoredCredential(Username="q", Secret="s")}
+        )
+
+        assert lookup_item_id(_ITEM_NAME, 2) == fake_bw.items[0]["id"]
@@ -0,0 +1,180 @@
+"""Tests for cross-process write coalescing."""
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import pytest
+from conftest import FakeBw
+
+from cli.docker_credential.bitwarden import BitwardenError
+from cli.docker_credential.cache import ENV_SESSION, cache_dir
+from cli.docker_credential.envelope import decode_payload
+from cli.docker_credential.journal import (
+    JOURNAL_NAME,
+    _add_entry,
+    _journal_cipher,
+    merge_changes,
+    submit_changes,
+)
+from cli.docker_credential.types import StoredCredential
+
+_GHCR = StoredCredential(Username="g", Secret="1")
+_QUAY = StoredCredential(Username="q", Secret="2")
+
+
+@pytest.fixture(autouse=True)
+def session(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Provide the session journal entries are encrypted with."""
+    monkeypatch.setenv(ENV_SESSION, "session-token")
+
+
+def _queue(changes: dict[str, StoredCredential | None]) -> Path:
+    """Queue changes as a concurrent writer would."""
+    cipher = _journal_cipher(JOURNAL_NAME)
+    assert cipher is not None
+    return _add_entry(changes, cipher)
+
+
+class TestSubmitChanges:
+    """Tests for the journal protocol within one process."""
+
+    def test_merges_queued_entries(self) -> None:
+        """Test the leader applies its own and queued changes in one update."""
+        _queue({"https://quay.io": _QUAY, "https://ghcr.io": None})
+        apply = MagicMock()
+
+        submit_changes({"https://ghcr.io": _GHCR}, apply)
+
+        apply.assert_called_once_with(
+            {"https://quay.io": _QUAY, "https://ghcr.io": _GHCR}
+        )
+        assert list((cache_dir() / "journal").glob("*.bin")) == []
+
+    def test_equivalent_urls_keep_order(self) -> None:
+        """Test the latest change to any form of a URL wins when merging."""
+        _queue({"ghcr.io": StoredCredential(Username="g", Secret="0")})
+        _queue({"https://ghcr.io": None})
+        apply = MagicMock()
+
+        submit_changes({"ghcr.io/": _GHCR}, apply)
+
+        apply.assert_called_once_with({"ghcr.io/": _GHCR})
+
+    def test_merge_erase_after_store(self) -> None:
+        """Test an erase of another form removes an earlier store."""
+        merged = merge_changes(
+            [{"https://quay.io": _QUAY, "ghcr.io": _GHCR}, {"https://ghcr.io/": None}]
+        )
+
+        assert merged == {"https://quay.io": _QUAY, "https://ghcr.io/": None}
+
+    def test_follower_gets_recorded_result(self) -> None:
+        """Test a writer whose entry was applied by the leader does not apply."""
+        other = _queue({"https://quay.io": _QUAY})
+        submit_changes({"https://ghcr.io": _GHCR}, MagicMock())
+
+        assert not other.exists()
+        assert json.loads(other.with_suffix(".done").read_text()) == {"error": None}
+
+    def test_failure_is_reported_to_all(self) -> None:
+        """Test a failed merged update is reported to every writer in it."""
+        other = _queue({"https://quay.io": _QUAY})
+        apply = MagicMock(side_effect=BitwardenError("Failed to update item"))
+
+        with pytest.raises(BitwardenError, match="Failed to update item"):
+            submit_changes({"https://ghcr.io": _GHCR}, apply)
+
+        result = json.loads(other.with_suffix(".done").read_text())
+        assert result == {"error": "Failed to update item"}
+
+    def test_encrypted_at_rest(self) -> None:
+        """Test queued credentials are not readable on disk."""
+        secret = StoredCredential(Username="g", Secret="s3cret-token")
+        entry = _queue({"https://ghcr.io": secret})
+
+        assert b"s3cret-token" not in entry.read_bytes()
+        assert b"ghcr.io" not in entry.read_bytes()
+
+    def test_other_session_dropped(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Test entries of an earlier session are dropped, not applied."""
+        stale = _queue({"https://quay.io": _QUAY})
+        monkeypatch.setenv(ENV_SESSION, "new-session")
+        apply = MagicMock()
+
+        submit_changes({"https://ghcr.io": _GHCR}, apply)
+
+        apply.assert_called_once_with({"https://ghcr.io": _GHCR})
+        assert not stale.exists()
+
+    def test_without_session(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Test nothing is journaled without a key to encrypt it with."""
+        monkeypatch.delenv(ENV_SESSION)
+        apply = MagicMock()
+
+        submit_changes({"https://ghcr.io": _GHCR}, apply)
+
+        apply.assert_called_once_with({"https://ghcr.io": _GHCR})
+        assert not (cache_dir() / JOURNAL_NAME).exists()
+
+    def test_crashed_leader_work_is_finished(self) -> None:
+        """Test entries left by a crashed writer are applied by the next one."""
+        apply = MagicMock(side_effect=[RuntimeError("crash"), None])
+
+        with pytest.raises(RuntimeError):
+            submit_changes({"https://quay.io": _QUAY}, apply)
+        submit_changes({"https://ghcr.io": _GHCR}, apply)
+
+        assert apply.call_args.args[0] == {
+            "https://quay.io": _QUAY,
+            "https://ghcr.io": _GHCR,
+        }
+
+
+_STORE_SCRIPT = (
+    "from cli.docker_credential import docker_credential_bw; "
+    "docker_credential_bw('store')"
+)
+
+
+class TestConcurrentStores:
+    """Stress test with many helpers storing at the same time."""
+
+    def test_no_lost_updates(
+        self, fake_bw: FakeBw, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Test parallel stores all land in the note with fewer writes."""
+        monkeypatch.setenv("FAKE_BW_DELAY", "0.2")
+        fake_bw.reset()
+        urls = [f"https://registry-{n}.example.com" for n in range(8)]
+
+        procs = [
+            subprocess.Popen(
+                [sys.executable, "-c", _STORE_SCRIPT],
+                stdin=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                env=os.environ.copy(),
+            )
+            for _ in urls
+        ]
+        for proc, url in zip(procs, urls, strict=True):
+            assert proc.stdin is not None
+            proc.stdin.write(
+                json.dumps({"ServerURL": url, "Username": "u", "Secret": url}).encode()
+            )
+            proc.stdin.close()
+        for proc in procs:
+            assert proc.stderr is not None
+            stderr = proc.stderr.read()
+            assert proc.wait(timeout=60) == 0, stderr
+
+        assert len(fake_bw.items) == 1
+        stored = decode_payload(fake_bw.items[0]["notes"])
+        assert {url: cred["Secret"] for url, cred in stored.items()} == {
+            url: url for url in urls
+        }
+        writes = [call for call in fake_bw.calls if call[0] in ("create", "edit")]
+        assert len(writes) < len(urls)
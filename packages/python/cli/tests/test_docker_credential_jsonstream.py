@@ -0,0 +1,130 @@
+"""Tests for the streaming JSON array parser and streamed vault listings."""
+
+import io
+import json
+
+import pytest
+from conftest import FakeBw, secure_note
+
+from cli.docker_credential.bitwarden import (
+    BitwardenError,
+    get_all_credentials,
+    list_items,
+)
+from cli.docker_credential.deadline import start_deadline
+from cli.docker_credential.jsonstream import iter_json_array
+
+_ITEMS = [
+    {"id": "1", "name": "Grüße 🐳", "type": 1, "notes": None},
+    {"id": "2", "name": "日本語", "type": 2, "fields": [1, 2.5, -3e2, True]},
+    12345,
+    'string with \\" escapes and ] brackets [',
+    [],
+    {},
+]
+
+
+class _CountingStream(io.BytesIO):
+    """BytesIO that records how many bytes were read."""
+
+    bytes_read = 0
+
+    def read(self, size: int | None = -1) -> bytes:
+        data = super().read(size)
+        self.bytes_read += len(data)
+        return data
+
+
+class TestIterJsonArray:
+    """Tests for iter_json_array."""
+
+    @pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 64, 65536])
+    def test_matches_json_loads(self, chunk_size: int) -> None:
+        """Test every chunking decodes the same elements as json.loads."""
+        raw = json.dumps(_ITEMS, ensure_ascii=False, indent=2).encode()
+
+        assert list(iter_json_array(io.BytesIO(raw), chunk_size)) == _ITEMS
+
+    @pytest.mark.parametrize("raw", [b"[]", b"  [ ]\n", b"[\n]\n"])
+    def test_empty(self, raw: bytes) -> None:
+        """Test empty arrays yield nothing."""
+        assert list(iter_json_array(io.BytesIO(raw), 1)) == []
+
+    @pytest.mark.parametrize(
+        "raw",
+        [
+            b"",
+            b'{"id": 1}',
+            b'[{"id": 1}',
+            b'[{"id": 1} {"id": 2}]',
+            b'[{"id": 1},]',
+            b'[{"id": 1}] x',
+            b'[{"id": ',
+        ],
+    )
+    def test_malformed(self, raw: bytes) -> None:
+        """Test malformed input raises ValueError."""
+        with pytest.raises(ValueError):
+            list(iter_json_array(io.BytesIO(raw), 4))
+
+    def test_reads_lazily(self) -> None:
+        """Test the first element is available before the stream is consumed."""
+        raw = json.dumps([{"id": n, "name": "x" * 100} for n in range(10000)]).encode()
+        stream = _CountingStream(raw)
+
+        first = next(iter_json_array(stream, 4096))
+
+        assert first["id"] == 0
+        assert stream.bytes_read <= 4096
+
+
+_CREDS = {"https://ghcr.io": {"Username": "u", "Secret": "s"}}
+_FILLER = [
+    {"id": f"login-{n}", "name": f"Login {n}", "type": 1, "notes": "x" * 200}
+    for n in range(3000)
+]
+
+
+class TestStreamedListing:
+    """Tests for vault listings read from the bw pipe."""
+
+    def test_stops_at_first_match(self, fake_bw: FakeBw) -> None:
+        """Test the credential note is found in a large vault."""
+        fake_bw.reset([secure_note(_CREDS), *_FILLER])
+
+        assert (
+            get_all_credentials("docker-credentials")["https://ghcr.io"].Username == "u"
+        )
+        assert fake_bw.calls == [["list", "items"]]
+
+    def test_match_at_end(self, fake_bw: FakeBw) -> None:
+        """Test a match after thousands of items is found."""
+        fake_bw.reset([*_FILLER, secure_note(_CREDS)])
+
+        assert "https://ghcr.io" in get_all_credentials("docker-credentials")
+
+    def test_list_items(self, fake_bw: FakeBw) -> None:
+        """Test the full listing validates every streamed item."""
+        fake_bw.reset(_FILLER[:50])
+
+        assert [item.id for item in list_items()] == [f"login-{n}" for n in range(50)]
+
+    def test_locked(self, fake_bw: FakeBw, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Test a failing bw is reported with its classified error."""
+        fake_bw.reset()
+        monkeypatch.setenv("FAKE_BW_LOCKED", "1")
+
+        with pytest.raises(BitwardenError, match="Bitwarden is locked"):
+            list_items()
+
+    def test_invalid_output_does_not_hang(
+        self, fake_bw: FakeBw, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Test bw is stopped when its output turns out to be invalid."""
+        fake_bw.reset()
+        monkeypatch.setenv("FAKE_BW_GARBAGE", "1")
+        # A bw blocked on the full pipe would only end at the deadline
+        start_deadline(10)
+
+        with pytest.raises(BitwardenError, match="Failed to parse"):
+            list_items()
@@ -0,0 +1,244 @@
+"""Tests for registry URL normalization."""
+
+import json
+
+import pytest
+from conftest import FakeBw, secure_note
+
+from cli.docker_credential import (
+    _cmd_erase_storage,
+    _cmd_get_storage,
+    _cmd_list_storage,
+    _cmd_store_storage,
+)
+from cli.docker_credential.envelope import decode_payload
+from cli.docker_credential.registry import RegistryIndex, registry_key
+from cli.docker_credential.types import StoredCredential
+
+_OLD = StoredCredential(Username="old", Secret="1")
+_NEW = StoredCredential(Username="new", Secret="2")
+
+
+class TestRegistryKey:
+    """Tests for the canonical key of server URLs."""
+
+    @pytest.mark.parametrize(
+        "url",
+        [
+            "ghcr.io",
+            "https://ghcr.io",
+            "https://ghcr.io/",
+            "http://GHCR.io",
+            "ghcr.io:443",
+        ],
+    )
+    def test_equivalent_forms(self, url: str) -> None:
+        """Test scheme, trailing slash, port and host case are ignored."""
+        assert registry_key(url) == "ghcr.io"
+
+    @pytest.mark.parametrize(
+        "url",
+        [
+            "https://index.docker.io/v1/",
+            "docker.io",
+            "index.docker.io",
+            "https://registry-1.docker.io/v2/",
+            "registry.hub.docker.com",
+        ],
+    )
+    def test_docker_hub_aliases(self, url: str) -> None:
+        """Test the Docker Hub aliases share one key."""
+        assert registry_key(url) == registry_key("https://index.docker.io/v1/")
+
+    def test_distinct(self) -> None:
+        """Test different registries and paths keep different keys."""
+        assert registry_key("ghcr.io") != registry_key("gcr.io")
+        assert registry_key("example.com:5000") != registry_key("example.com")
+        assert registry_key("example.com/a") != registry_key("example.com/b")
+        # Path case is significant
+        assert registry_key("example.com/Team") == "example.com/Team"
+
+
+class TestRegistryIndex:
+    """Tests for the normalized view of a credential store."""
+
+    def test_get(self) -> None:
+        """Test lookups find the stored entry in any form."""
+        index = RegistryIndex({"https://ghcr.io/": _OLD})
+
+        assert index.get("ghcr.io") == _OLD
+        assert index.resolve("GHCR.io") == "https://ghcr.io/"
+        assert index.get("gcr.io") is None
+
+    def test_set_replaces_equivalents(self) -> None:
+        """Test storing under one form drops every equivalent entry."""
+        store = {"ghcr.io": _OLD, "https://ghcr.io/": _OLD, "quay.io": _OLD}
+        index = RegistryIndex(store)
+
+        assert index.set("https://ghcr.io", _NEW)
+        assert store == {"quay.io": _OLD, "https://ghcr.io": _NEW}
+        assert not index.set("https://ghcr.io", _NEW)
+
+    def test_remove(self) -> None:
+        """Test removal drops every equivalent entry."""
+        store = {"ghcr.io": _OLD, "https://ghcr.io/": _OLD}
+        index = RegistryIndex(store)
+
+        assert index.remove("https://GHCR.io")
+        assert store == {}
+        assert not index.remove("ghcr.io")
+
+    def test_items_one_per_registry(self) -> None:
+        """Test duplicates are listed once, preferring the last entry."""
+        index = RegistryIndex({"ghcr.io": _OLD, "https://ghcr.io/": _NEW})
+
+        assert list(index.items()) == [("https://ghcr.io/", _NEW)]
+
+
+class TestNormalizedCommands:
+    """Tests for commands with equivalent server URL forms."""
+
+    def test_get_other_form(
+        self, fake_bw: FakeBw, capsys: pytest.CaptureFixture[str]
+    ) -> None:
+        """Test get finds a credential stored under another form."""
+        fake_bw.reset(
+            [secure_note({"https://ghcr.io/": {"Username": "u", "Secret": "s"}})]
+        )
+
+        _cmd_get_storage("ghcr.io")
+
+        output = json.loads(capsys.readouterr().out)
+        assert output == {"ServerURL": "ghcr.io", "Username": "u", "Secret": "s"}
+
+    def test_store_deduplicates(self, fake_bw: FakeBw) -> None:
+        """Test storing replaces equivalent entries instead of adding one."""
+        fake_bw.reset(
+            [
+                secure_note(
+                    {
+                        "ghcr.io": {"Username": "a", "Secret": "1"},
+                        "https://ghcr.io/": {"Username": "b", "Secret": "2"},
+                    }
+                )
+            ]
+        )
+
+        with pytest.raises(SystemExit):
+            _cmd_store_storage(
+                {"ServerURL": "https://ghcr.io", "Username": "c", "Secret": "3"}
+            )
+
+        assert decode_payload(fake_bw.items[0]["notes"]) == {
+            "https://ghcr.io": {"Username": "c", "Secret": "3"}
+        }
+
+    def test_erase_other_form(self, fake_bw: FakeBw) -> None:
+        """Test erase removes a credential stored under another form."""
+        fake_bw.reset(
+            [
+                secure_note(
+                    {"https://index.docker.io/v1/": {"Username": "u", "Secret": "s"}}
+                )
+            ]
+        )
+
+        with pytest.raises(SystemExit):
+            _cmd_erase_storage("docker.io")
+
+        assert decode_payload(fake_bw.items[0]["notes"]) == {}
+
+    def test_list_one_per_registry(
+        self, fake_bw: FakeBw, capsys: pytest.CaptureFixture[str]
+    ) -> None:
+        """Test list does not show duplicate entries twice."""
+        fake_bw.reset(
+            [
+                secure_note(
+                    {
+                        "ghcr.io": {"Username": "a", "Secret": "1"},
+                        "https://ghcr.io/": {"Username": "b", "Secret": "2"},
+                    }
+                )
+            ]
+        )
+
+        with pytest.raises(SystemExit):
+            _cmd_list_storage()
+
+        assert json.loads(capsys.readouterr().out) == {"https://ghcr.io/": "b"}
+
+
+_ECR = "*.dkr.ecr.*.amazonaws.com"
+
+
+class TestPatterns:
+    """Tests for wildcard registry patterns."""
+
+    def test_match(self) -> None:
+        """Test a pattern matches any host with one label per wildcard."""
+        index = RegistryIndex({_ECR: _OLD})
+
+        assert index.get("123456789012.dkr.ecr.eu-west-1.amazonaws.com") == _OLD
+        assert index.get("https://1.dkr.ecr.us-east-1.amazonaws.com/") == _OLD
+        assert index.get("dkr.ecr.eu-west-1.amazonaws.com") is None
+        assert index.get("a.b.dkr.ecr.eu-west-1.amazonaws.com") is None
+
+    def test_most_specific_wins(self) -> None:
+        """Test concrete entries and literal labels beat wildcards."""
+        host = "1.dkr.ecr.eu-west-1.amazonaws.com"
+        index = RegistryIndex(
+            {
+                _ECR: _OLD,
+                "*.dkr.ecr.eu-west-1.amazonaws.com": _NEW,
+                "*.*.*.*.amazonaws.com": _OLD,
+            }
+        )
+
+        assert index.resolve(host) == "*.dkr.ecr.eu-west-1.amazonaws.com"
+        assert index.resolve("1.dkr.ecr.us-east-1.amazonaws.com") == _ECR
+        assert index.resolve("1.x.y.z.amazonaws.com") == "*.*.*.*.amazonaws.com"
+
+        index.set(host, StoredCredential(Username="exact", Secret="3"))
+        assert index.resolve(host) == host
+
+    def test_many_patterns(self) -> None:
+        """Test resolution among hundreds of patterns."""
+        store = {f"*.registry-{n}.example.com": _OLD for n in range(500)}
+        store["*.registry-250.example.com"] = _NEW
+
+        assert RegistryIndex(store).get("team.registry-250.example.com") == _NEW
+
+    def test_remove_pattern(self) -> None:
+        """Test patterns are only removed by name, not by a matching host."""
+        store = {_ECR: _OLD}
+        index = RegistryIndex(store)
+
+        assert not index.remove("1.dkr.ecr.eu-west-1.amazonaws.com")
+        assert index.remove(_ECR)
+        assert index.get("1.dkr.ecr.eu-west-1.amazonaws.com") is None
+        assert store == {}
+
+    def test_get_and_list(
+        self, fake_bw: FakeBw, capsys: pytest.CaptureFixture[str]
+    ) -> None:
+        """Test get resolves patterns while list only shows concrete entries."""
+        fake_bw.reset(
+            [
+                secure_note(
+                    {
+                        _ECR: {"Username": "AWS", "Secret": "token"},
+                        "ghcr.io": {"Username": "u", "Secret": "s"},
+                    }
+                )
+            ]
+        )
+
+        _cmd_get_storage("123.dkr.ecr.eu-west-1.amazonaws.com")
+        output = json.loads(capsys.readouterr().out)
+        assert output["Username"] == "AWS"
+        assert output["ServerURL"] == "123.dkr.ecr.eu-west-1.amazonaws.com"
+
+        with pytest.raises(SystemExit):
+            _cmd_list_storage()
+        assert json.loads(capsys.readouterr().out) == {"ghcr.io": "u"}
@@ -0,0 +1,187 @@
+"""Tests for the tiered backend and its write-behind replication."""
+
+import json
+import time
+from collections.abc import Iterator
+from unittest.mock import MagicMock, patch
+
+import pytest
+from conftest import FakeBw, secure_note
+
+from cli.docker_credential import (
+    _cmd_erase_storage,
+    _cmd_get_storage,
+    _cmd_store_storage,
+)
+from cli.docker_credential.backend import ENV_BACKEND
+from cli.docker_credential.bitwarden import BitwardenError
+from cli.docker_credential.envelope import decode_payload
+from cli.docker_credential.local import ENV_LOCAL_KEY, LocalFileBackend
+from cli.docker_credential.replication import (
+    enqueue,
+    main,
+    pending_changes,
+    run_worker,
+)
+from cli.docker_credential.types import StoredCredential
+
+_URL = "https://ghcr.io"
+_CRED = StoredCredential(Username="u", Secret="s")
+
+
+@pytest.fixture
+def tiered(monkeypatch: pytest.MonkeyPatch) -> Iterator[MagicMock]:
+    """Select the tiered backend; yields the mocked worker spawn."""
+    monkeypatch.setenv(ENV_BACKEND, "tiered")
+    monkeypatch.setenv(ENV_LOCAL_KEY, "k" * 32)
+    with patch("cli.docker_credential.worker.spawn_worker") as mock_spawn:
+        yield mock_spawn
+
+
+def _store(url: str = _URL, secret: str = "s") -> None:
+    with pytest.raises(SystemExit) as exc_info:
+        _cmd_store_storage({"ServerURL": url, "Username": "u", "Secret": secret})
+    assert exc_info.value.code == 0
+
+
+def _vault_credentials(fake_bw: FakeBw) -> dict[str, dict[str, str]]:
+    return decode_payload(fake_bw.items[0]["notes"])
+
+
+class TestTieredBackend:
+    """Tests for the local tier in front of Bitwarden."""
+
+    def test_store_is_local(self, tiered: MagicMock, fake_bw: FakeBw) -> None:
+        """Test store only writes locally and starts a worker."""
+        fake_bw.reset()
+
+        _store()
+
+        assert fake_bw.calls == [["status"], ["list", "items"]]
+        assert LocalFileBackend().load() == {_URL: _CRED}
+        assert [c for _, c in pending_changes(LocalFileBackend())] == [{_URL: _CRED}]
+        tiered.assert_called_once()
+
+    def test_get_reads_local_tier(
+        self, tiered: MagicMock, fake_bw: FakeBw, capsys: pytest.CaptureFixture[str]
+    ) -> None:
+        """Test get does not touch Bitwarden once the local tier exists."""
+        fake_bw.reset()
+        _store()
+        fake_bw.clear_calls()
+
+        _cmd_get_storage(_URL)
+
+        assert json.loads(capsys.readouterr().out)["Secret"] == "s"
+        assert fake_bw.calls == []
+
+    def test_seeds_from_bitwarden(
+        self, tiered: MagicMock, fake_bw: FakeBw, capsys: pytest.CaptureFixture[str]
+    ) -> None:
+        """Test the first read on a machine copies the vault into the tier."""
+        fake_bw.reset([secure_note({_URL: {"Username": "bw", "Secret": "x"}})])
+
+        _cmd_get_storage(_URL)
+        capsys.readouterr()
+        fake_bw.clear_calls()
+        _cmd_get_storage(_URL)
+
+        assert json.loads(capsys.readouterr().out)["Username"] == "bw"
+        assert fake_bw.calls == []
+
+
+class TestReplication:
+    """Tests for replaying the outbox against Bitwarden."""
+
+    def test_worker_replicates(self, tiered: MagicMock, fake_bw: FakeBw) -> None:
+        """Test queued stores and erases reach the secure note in one write."""
+        fake_bw.reset()
+        _store()
+        _store("https://quay.io")
+        with pytest.raises(SystemExit):
+            _cmd_erase_storage(_URL)
+        fake_bw.clear_calls()
+
+        main()
+
+        assert _vault_credentials(fake_bw) == {
+            "https://quay.io": {"Username": "u", "Secret": "s"}
+        }
+        assert [call[0] for call in fake_bw.calls].count("create") == 1
+        assert pending_changes(LocalFileBackend()) == []
+
+    def test_equivalent_urls_keep_order(self, tiered: MagicMock) -> None:
+        """Test queued changes to equivalent URLs replay in arrival order."""
+        local = LocalFileBackend()
+        enqueue(local, {"ghcr.io": StoredCredential(Username="u", Secret="x")})
+        enqueue(local, {"https://ghcr.io": None})
+        enqueue(local, {"ghcr.io": _CRED})
+        apply = MagicMock()
+
+        run_worker(local, apply, delays=[])
+
+        apply.assert_called_once_with({"ghcr.io": _CRED})
+
+    def test_retries_with_backoff(self, tiered: MagicMock) -> None:
+        """Test a failing replication is retried until it succeeds."""
+        local = LocalFileBackend()
+        enqueue(local, {_URL: _CRED})
+        apply = MagicMock(side_effect=[BitwardenError("down"), None])
+
+        with patch("cli.docker_credential.replication.time.sleep") as mock_sleep:
+            run_worker(local, apply, delays=[1.0, 2.0])
+
+        assert apply.call_count == 2
+        mock_sleep.assert_called_once_with(1.0)
+        assert pending_changes(local) == []
+
+    def test_keeps_changes_when_giving_up(self, tiered: MagicMock) -> None:
+        """Test changes stay queued while Bitwarden keeps failing."""
+        local = LocalFileBackend()
+        enqueue(local, {_URL: _CRED})
+        apply = MagicMock(side_effect=BitwardenError("down"))
+
+        run_worker(local, apply, delays=[0.0, 0.0])
+
+        assert apply.call_count == 3
+        assert [c for _, c in pending_changes(local)] == [{_URL: _CRED}]
+
+    def test_crashed_write_is_replicated(
+        self, tiered: MagicMock, fake_bw: FakeBw
+    ) -> None:
+        """Test a change queued by a helper that died is still replicated."""
+        fake_bw.reset()
+        enqueue(LocalFileBackend(), {_URL: _CRED})
+
+        main()
+
+        assert _vault_credentials(fake_bw) == {_URL: {"Username": "u", "Secret": "s"}}
+
+    def test_outbox_encrypted(self, tiered: MagicMock) -> None:
+        """Test queued secrets are not stored in clear text."""
+        local = LocalFileBackend()
+        enqueue(local, {_URL: StoredCredential(Username="u", Secret="t0ps3cret")})
+
+        ((path, _),) = pending_changes(local)
+        assert b"t0ps3cret" not in path.read_bytes()
+
+
+class TestDetachedWorker:
+    """End-to-end test with a real background worker."""
+
+    def test_store_reaches_vault(
+        self, fake_bw: FakeBw, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Test a store returns before the worker writes it to Bitwarden."""
+        monkeypatch.setenv(ENV_BACKEND, "tiered")
+        monkeypatch.setenv(ENV_LOCAL_KEY, "k" * 32)
+        fake_bw.reset()
+
+        _store()
+
+        deadline = time.monotonic() + 30
+        while not fake_bw.items and time.monotonic() < deadline:
+            time.sleep(0.1)
+        while pending_changes(LocalFileBackend()) and time.monotonic() < deadline:
+            time.sleep(0.1)
+        assert _vault_credentials(fake_bw) == {_URL: {"Username": "u", "Secret": "s"}}
@@ -0,0 +1,173 @@
+"""Tests for retrying transient Bitwarden failures."""
+
+import json
+from collections.abc import Iterator
+from unittest.mock import MagicMock, patch
+
+import pytest
+from conftest import FakeBw
+
+from cli.docker_credential import _cmd_warm_docker_hub
+from cli.docker_credential.bitwarden import (
+    BitwardenError,
+    _create_item,
+    list_items,
+    search_items,
+    sync_vault,
+)
+from cli.docker_credential.deadline import start_deadline
+from cli.docker_credential.retry import ENV_RETRIES, is_transient, retry_counts
+
+_LOGIN = {
+    "id": "login-1",
+    "name": "DockerHub",
+    "type": 1,
+    "login": {"username": "u", "password": "p"},
+}
+
+
+@pytest.fixture(autouse=True)
+def default_retries(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Retry with the default settings, which conftest turns off."""
+    monkeypatch.delenv(ENV_RETRIES)
+
+
+@pytest.fixture
+def sleep() -> Iterator[MagicMock]:
+    """Make the backoff deterministic and instant; yields the mocked sleep."""
+    with (
+        patch("cli.docker_credential.retry.random.uniform", side_effect=max),
+        patch("cli.docker_credential.retry.time.sleep") as mock_sleep,
+    ):
+        yield mock_sleep
+
+
+def _fail(monkeypatch: pytest.MonkeyPatch, count: int, message: str) -> None:
+    monkeypatch.setenv("FAKE_BW_FAIL", f"{count}:{message}")
+
+
+@pytest.mark.parametrize(
+    ("stderr", "transient"),
+    [
+        ("Too Many Requests", True),
+        ("Request failed with status code 429", True),
+        ("503 Service Unavailable", True),
+        ("Request failed with status code 502", True),
+        ("Error: read ECONNRESET", True),
+        ("getaddrinfo EAI_AGAIN vault.bitwarden.com", True),
+        ("socket hang up", True),
+        ("Invalid master password.", False),
+        ("Not found.", False),
+        ("Item 5030e1c2-429a-4f1e-b504-1c4290a5e503 not found.", False),
+        ("Cannot reach https://registry.example.com:5030/v2/", False),
+        ("The request could not be validated.", False),
+    ],
+)
+def test_is_transient(stderr: str, transient: bool) -> None:
+    """Only rate limits, overload and network errors are retried."""
+    assert is_transient(stderr) is transient
+
+
+class TestRetries:
+    """Tests for retries of bw subprocesses."""
+
+    def test_rate_limit_retried(
+        self, fake_bw: FakeBw, monkeypatch: pytest.MonkeyPatch, sleep: MagicMock
+    ) -> None:
+        """A rate-limited search succeeds after backing off exponentially."""
+        fake_bw.reset([_LOGIN])
+        _fail(monkeypatch, 2, "Request failed with status code 429")
+
+        items = search_items("DockerHub")
+
+        assert [item.id for item in items] == ["login-1"]
+        assert len(fake_bw.calls) == 3
+        assert [c.args[0] for c in sleep.call_args_list] == [0.5, 1.0]
+        assert retry_counts() == {"list items": 2}
+
+    def test_streamed_listing_retried(
+        self, fake_bw: FakeBw, monkeypatch: pytest.MonkeyPatch, sleep: MagicMock
+    ) -> None:
+        """A streamed listing that failed before any item is retried."""
+        fake_bw.reset([_LOGIN])
+        _fail(monkeypatch, 1, "Error: read ECONNRESET")
+
+        assert [item.id for item in list_items()] == ["login-1"]
+        assert retry_counts() == {"list items": 1}
+
+    def test_fatal_not_retried(
+        self, fake_bw: FakeBw, monkeypatch: pytest.MonkeyPatch, sleep: MagicMock
+    ) -> None:
+        """Errors a retry cannot fix fail on the first attempt."""
+        _fail(monkeypatch, 1, "The request could not be validated.")
+
+        with pytest.raises(BitwardenError, match="could not be validated"):
+            search_items("DockerHub")
+
+        assert len(fake_bw.calls) == 1
+        sleep.assert_not_called()
+
+    def test_gives_up(
+        self, fake_bw: FakeBw, monkeypatch: pytest.MonkeyPatch, sleep: MagicMock
+    ) -> None:
+        """A failure that persists is reported after the configured retries."""
+        monkeypatch.setenv(ENV_RETRIES, "2")
+        _fail(monkeypatch, 5, "503 Service Unavailable")
+
+        with pytest.raises(BitwardenError, match="503"):
+            search_items("DockerHub")
+
+        assert len(fake_bw.calls) == 3
+
+    def test_stays_within_deadline(
+        self, fake_bw: FakeBw, monkeypatch: pytest.MonkeyPatch, sleep: MagicMock
+    ) -> None:
+        """No backoff is started that would outlast the deadline."""
+        _fail(monkeypatch, 5, "Too Many Requests")
+        start_deadline(1.8)
+
+        with pytest.raises(BitwardenError, match="Too Many Requests"):
+            search_items("DockerHub")
+
+        # Waiting 0.5 and 1 seconds fits, a third wait of 2 seconds does not
+        assert retry_counts() == {"list items": 2}
+        assert len(fake_bw.calls) == 3
+
+    def test_create_not_retried(
+        self, fake_bw: FakeBw, monkeypatch: pytest.MonkeyPatch, sleep: MagicMock
+    ) -> None:
+        """A create is never sent twice, as it may have been applied."""
+        _fail(monkeypatch, 1, "Error: read ECONNRESET")
+
+        with pytest.raises(BitwardenError, match="ECONNRESET"):
+            _create_item({"type": 2, "name": "docker-credentials", "notes": "{}"})
+
+        assert fake_bw.calls == [["create", "item"]]
+
+    def test_warm_reports_retries(
+        self,
+        fake_bw: FakeBw,
+        monkeypatch: pytest.MonkeyPatch,
+        sleep: MagicMock,
+        capsys: pytest.CaptureFixture[str],
+    ) -> None:
+        """warm shows how many retries each operation needed."""
+        fake_bw.reset([_LOGIN])
+        _fail(monkeypatch, 1, "Too Many Requests")
+
+        with pytest.raises(SystemExit):
+            _cmd_warm_docker_hub("DockerHub")
+
+        report = json.loads(capsys.readouterr().out)
+        assert report["retries"] == {"list items": 1}
+
+    def test_sync_not_retried(
+        self, fake_bw: FakeBw, monkeypatch: pytest.MonkeyPatch, sleep: MagicMock
+    ) -> None:
+        """A failed sync after a write is ignored without backing off."""
+        _fail(monkeypatch, 1, "503 Service Unavailable")
+
+        sync_vault()
+
+        assert fake_bw.calls == [["sync"]]
+        assert retry_counts() == {}
@@ -0,0 +1,212 @@
+"""Tests for the bw serve backend of the Docker credential helper."""
+
+import json
+import threading
+from collections.abc import Iterator
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+from unittest.mock import MagicMock, patch
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+from cli.docker_credential.bitwarden import (
+    BitwardenError,
+    check_bw_status,
+    get_all_credentials,
+    save_all_credentials,
+    search_items,
+)
+from cli.docker_credential.serve import (
+    ENV_SERVE_URL,
+    BwServeClient,
+    BwServeError,
+    BwServeUnavailableError,
+    get_serve_client,
+)
+from cli.docker_credential.types import StoredCredential
+
+
+class StubVault:
+    """In-memory state shared by the stub bw serve handler."""
+
+    def __init__(self) -> None:
+        self.status = "unlocked"
+        self.items: dict[str, dict[str, Any]] = {}
+        self.requests: list[tuple[str, str]] = []
+        self.connections: set[tuple[str, int]] = set()
+        self.next_id = 1
+
+    def add(self, item: dict[str, Any]) -> dict[str, Any]:
+        item = dict(item)
+        item.setdefault("id", f"id-{self.next_id}")
+        self.next_id += 1
+        self.items[item["id"]] = item
+        return item
+
+
+def _make_handler(vault: StubVault) -> type[BaseHTTPRequestHandler]:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format: str, *args: Any) -> None:
+            pass
+
+        def _reply(self, code: int, payload: dict[str, Any]) -> None:
+            body = json.dumps(payload).encode()
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _body(self) -> Any:
+            length = int(self.headers.get("Content-Length", "0"))
+            return json.loads(self.rfile.read(length)) if length else None
+
+        def _handle(self) -> None:
+            vault.connections.add(self.client_address)
+            url = urlsplit(self.path)
+            vault.requests.append((self.command, url.path))
+            ok = {"success": True}
+
+            if url.path == "/status":
+                template = {"status": vault.status}
+                self._reply(200, ok | {"data": {"template": template}})
+            elif url.path == "/list/object/items":
+                search = parse_qs(url.query).get("search", [""])[0]
+                items = [i for i in vault.items.values() if search in i["name"]]
+                self._reply(200, ok | {"data": {"object": "list", "data": items}})
+            elif url.path == "/object/item" and self.command == "POST":
+                self._reply(200, ok | {"data": vault.add(self._body())})
+            elif url.path.startswith("/object/item/"):
+                item_id = url.path.rsplit("/", 1)[1]
+                if item_id not in vault.items:
+                    self._reply(404, {"success": False, "message": "Not found."})
+                elif self.command == "PUT":
+                    vault.items[item_id] = self._body()
+                    self._reply(200, ok | {"data": vault.items[item_id]})
+                else:
+                    self._reply(200, ok | {"data": vault.items[item_id]})
+            elif url.path == "/sync":
+                self._reply(200, ok | {"data": {"object": "message"}})
+            else:
+                self._reply(404, {"success": False, "message": "Unknown route"})
+
+        do_GET = do_POST = do_PUT = _handle
+
+    return Handler
+
+
+@pytest.fixture
+def stub_vault(monkeypatch: pytest.MonkeyPatch) -> Iterator[StubVault]:
+    """Run a stub bw serve on localhost and point BW_SERVE_URL at it."""
+    vault = StubVault()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _make_handler(vault))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setenv(ENV_SERVE_URL, f"http://127.0.0.1:{server.server_port}")
+    try:
+        yield vault
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+class TestBwServeClient:
+    """Tests for the HTTP client itself."""
+
+    def test_reuses_connection(self, stub_vault: StubVault) -> None:
+        """All requests share one keep-alive connection."""
+        client = get_serve_client()
+        assert client is not None
+
+        client.status()
+        client.list_items()
+        client.sync()
+
+        assert len(stub_vault.requests) == 4  # probe + 3 calls
+        assert len(stub_vault.connections) == 1
+
+    def test_error_message(self, stub_vault: StubVault) -> None:
+        """Failures reported by bw serve surface their message."""
+        client = get_serve_client()
+        assert client is not None
+
+        with pytest.raises(BwServeError, match="Not found."):
+            client.get_item("missing")
+
+    def test_unreachable(self) -> None:
+        """Connection failures raise BwServeUnavailableError."""
+        client = BwServeClient("http://127.0.0.1:1")
+        with pytest.raises(BwServeUnavailableError):
+            client.status()
+
+    def test_unset_env(self) -> None:
+        """Without BW_SERVE_URL no client is created."""
+        assert get_serve_client() is None
+
+
+class TestServeBackend:
+    """Tests for the Bitwarden functions routed through bw serve."""
+
+    @patch("subprocess.run")
+    def test_check_status_unlocked(
+        self, mock_run: MagicMock, stub_vault: StubVault
+    ) -> None:
+        """Status comes from bw serve without spawning bw."""
+        check_bw_status()
+        mock_run.assert_not_called()
+
+    @patch("subprocess.run")
+    def test_check_status_locked(
+        self, mock_run: MagicMock, stub_vault: StubVault
+    ) -> None:
+        """A locked vault is reported with the usual message."""
+        stub_vault.status = "locked"
+        with pytest.raises(BitwardenError, match="Bitwarden is locked"):
+            check_bw_status()
+        mock_run.assert_not_called()
+
+    @patch("subprocess.run")
+    def test_search_items(self, mock_run: MagicMock, stub_vault: StubVault) -> None:
+        """Search is forwarded to bw serve."""
+        stub_vault.add(
+            {
+                "name": "DockerHub",
+                "type": 1,
+                "login": {"username": "user", "password": "pass"},
+            }
+        )
+        stub_vault.add({"name": "Other", "type": 2, "notes": ""})
+
+        items = search_items("DockerHub")
+
+        assert [item.name for item in items] == ["DockerHub"]
+        mock_run.assert_not_called()
+
+    @patch("subprocess.run")
+    def test_save_and_load(self, mock_run: MagicMock, stub_vault: StubVault) -> None:
+        """Credentials round-trip through bw serve, creating then editing."""
+        creds = {"https://ghcr.io": StoredCredential(Username="u", Secret="s")}
+        save_all_credentials("docker-credentials", creds)
+        assert get_all_credentials("docker-credentials") == creds
+
+        creds["https://quay.io"] = StoredCredential(Username="q", Secret="t")
+        save_all_credentials("docker-credentials", creds)
+
+        assert get_all_credentials("docker-credentials") == creds
+        assert len(stub_vault.items) == 1
+        assert ("PUT", "/object/item/id-1") in stub_vault.requests
+        mock_run.assert_not_called()
+
+    @patch("subprocess.run")
+    def test_fallback_to_cli(
+        self, mock_run: MagicMock, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """An unreachable bw serve falls back to the bw CLI."""
+        monkeypatch.setenv(ENV_SERVE_URL, "http://127.0.0.1:1")
+        mock_run.return_value = MagicMock(returncode=0, stdout="[]")
+
+        assert search_items("DockerHub") == []
+        mock_run.assert_called_once()
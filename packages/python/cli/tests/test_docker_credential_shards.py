@@ -0,0 +1,154 @@
+"""Tests for sharded credential storage."""
+
+import json
+
+import pytest
+from conftest import FakeBw, secure_note
+
+from cli.docker_credential import (
+    _cmd_erase_storage,
+    _cmd_get_storage,
+    _cmd_list_storage,
+    _cmd_store_storage,
+)
+from cli.docker_credential.envelope import decode_payload
+from cli.docker_credential.shards import ENV_SHARDS, shard_index, shard_name
+
+_ITEM_NAME = "docker-credentials"
+_URLS = ["https://index.docker.io/v1/", "https://gcr.io", "https://quay.io"]
+
+
+def _notes_by_name(fake_bw: FakeBw) -> dict[str, dict]:
+    return {item["name"]: decode_payload(item["notes"]) for item in fake_bw.items}
+
+
+def _store(url: str, secret: str = "s") -> None:
+    with pytest.raises(SystemExit) as exc_info:
+        _cmd_store_storage({"ServerURL": url, "Username": "u", "Secret": secret})
+    assert exc_info.value.code == 0
+
+
+@pytest.fixture
+def sharded(monkeypatch: pytest.MonkeyPatch) -> int:
+    """Enable a four-way sharded layout."""
+    monkeypatch.setenv(ENV_SHARDS, "4")
+    return 4
+
+
+class TestShardIndex:
+    """Tests for the URL to shard mapping."""
+
+    def test_stable(self) -> None:
+        """Test the mapping does not depend on the process."""
+        assert [shard_index(url, 4) for url in _URLS] == [2, 3, 0]
+        assert shard_index("https://ghcr.io", 4) == 1
+
+    def test_equivalent_forms(self) -> None:
+        """Test equivalent forms of a URL share a shard."""
+        forms = ["ghcr.io", "https://ghcr.io/", "https://GHCR.io:443", "ghcr.io/"]
+        assert {shard_index(url, 4) for url in forms} == {shard_index(forms[0], 4)}
+
+    def test_single_shard(self) -> None:
+        """Test everything maps to shard 0 without sharding."""
+        assert {shard_index(url, 1) for url in _URLS} == {0}
+
+
+class TestShardedStore:
+    """Tests for reading and writing a sharded store."""
+
+    def test_fresh_layout(self, fake_bw: FakeBw, sharded: int) -> None:
+        """Test the first write creates every shard."""
+        fake_bw.reset()
+
+        _store("https://ghcr.io")
+
+        notes = _notes_by_name(fake_bw)
+        assert set(notes) == {shard_name(_ITEM_NAME, i) for i in range(sharded)}
+        assert notes[shard_name(_ITEM_NAME, 1)] == {
+            "https://ghcr.io": {"Username": "u", "Secret": "s"}
+        }
+
+    def test_write_touches_one_shard(self, fake_bw: FakeBw, sharded: int) -> None:
+        """Test a later write reads and writes only its own shard."""
+        fake_bw.reset()
+        _store("https://ghcr.io")
+        shard_ids = {item["name"]: item["id"] for item in fake_bw.items}
+        fake_bw.clear_calls()
+
+        _store("https://quay.io")
+
+        assert fake_bw.calls == [
+            ["status"],
+            ["get", "item", shard_ids[shard_name(_ITEM_NAME, 0)]],
+            ["edit", "item", shard_ids[shard_name(_ITEM_NAME, 0)]],
+            ["sync"],
+        ]
+
+    def test_full_read_lists_once(
+        self, fake_bw: FakeBw, sharded: int, capsys: pytest.CaptureFixture[str]
+    ) -> None:
+        """Test reading every shard costs one search, not one get per shard."""
+        fake_bw.reset()
+        for url in _URLS:
+            _store(url)
+        fake_bw.clear_calls()
+
+        with pytest.raises(SystemExit):
+            _cmd_list_storage()
+
+        assert set(json.loads(capsys.readouterr().out)) == set(_URLS)
+        assert fake_bw.calls == [
+            ["status"],
+            ["list", "items", "--search", _ITEM_NAME],
+        ]
+
+    def test_migrates_single_note(self, fake_bw: FakeBw, sharded: int) -> None:
+        """Test an existing single-note store is moved into the shards."""
+        legacy = {url: {"Username": "old", "Secret": url} for url in _URLS}
+        fake_bw.reset([secure_note(legacy, item_id="legacy")])
+
+        _store("https://ghcr.io")
+
+        notes = _notes_by_name(fake_bw)
+        assert _ITEM_NAME not in notes
+        for url in _URLS:
+            shard = notes[shard_name(_ITEM_NAME, shard_index(url, sharded))]
+            assert shard[url] == {"Username": "old", "Secret": url}
+        assert ["delete", "item", "legacy"] in fake_bw.calls
+
+    def test_read_before_migration(
+        self, fake_bw: FakeBw, sharded: int, capsys: pytest.CaptureFixture[str]
+    ) -> None:
+        """Test reads see a single-note store that was not migrated yet."""
+        fake_bw.reset(
+            [
+                secure_note(
+                    {"https://gcr.io": {"Username": "old", "Secret": "x"}},
+                    item_id="legacy",
+                )
+            ]
+        )
+
+        _cmd_get_storage("https://gcr.io")
+
+        assert json.loads(capsys.readouterr().out)["Username"] == "old"
+        assert [call[0] for call in fake_bw.calls] == ["status", "list"]
+
+    def test_equivalent_urls(
+        self, fake_bw: FakeBw, sharded: int, capsys: pytest.CaptureFixture[str]
+    ) -> None:
+        """Test another form of a stored URL replaces, reads and erases it."""
+        fake_bw.reset()
+        _store("ghcr.io", "s1")
+        _store("https://ghcr.io/", "s2")
+
+        _cmd_get_storage("ghcr.io")
+        assert json.loads(capsys.readouterr().out)["Secret"] == "s2"
+        with pytest.raises(SystemExit):
+            _cmd_list_storage()
+        assert json.loads(capsys.readouterr().out) == {"https://ghcr.io/": "u"}
+
+        with pytest.raises(SystemExit) as exc_info:
+            _cmd_erase_storage("https://ghcr.io")
+        assert exc_info.value.code == 0
+        assert all(not notes for notes in _notes_by_name(fake_bw).values())
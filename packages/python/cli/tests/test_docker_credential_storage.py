@@ -1,26 +1,35 @@
 """Tests for Docker credential storage helper."""
 
+import base64
+import hashlib
 import json
 from unittest.mock import MagicMock, patch
 
+import pytest
+from conftest import FakeBw, secure_note
 
 from cli.docker_credential import (
+    _cmd_erase_batch_storage,
     _cmd_erase_storage,
     _cmd_get_storage,
     _cmd_list_storage,
+    _cmd_store_batch_storage,
     _cmd_store_storage,
     docker_credential_bw,
 )
 from cli.docker_credential.bitwarden import (
     BitwardenError,
+    encode_item,
 )
+from cli.docker_credential.envelope import decode_payload
+from cli.docker_credential.types import StoredCredential
 
 
 class TestCmdGet:
     """Tests for the get command."""
 
-    @patch("cli.docker_credential.check_bw_status")
-    @patch("cli.docker_credential.get_all_credentials")
+    @patch("cli.docker_credential.backend.check_bw_status")
+    @patch("cli.docker_credential.backend.get_all_credentials")
     @patch("builtins.print")
     def test_get_success(
         self, mock_print: MagicMock, mock_get_all: MagicMock, mock_check: MagicMock
@@ -42,8 +51,8 @@ class TestCmdGet:
         assert output["Username"] == "testuser"
         assert output["Secret"] == "testpass"
 
-    @patch("cli.docker_credential.check_bw_status")
-    @patch("cli.docker_credential.get_all_credentials")
+    @patch("cli.docker_credential.backend.check_bw_status")
+    @patch("cli.docker_credential.backend.get_all_credentials")
     @patch("cli.docker_credential.output_error")
     def test_get_not_found(
         self,
@@ -56,8 +65,8 @@ class TestCmdGet:
         _cmd_get_storage("https://index.docker.io/v1/")
         mock_error.assert_called_once_with("credentials not found")
 
-    @patch("cli.docker_credential.check_bw_status")
-    @patch("cli.docker_credential.get_all_credentials")
+    @patch("cli.docker_credential.backend.check_bw_status")
+    @patch("cli.docker_credential.backend.get_all_credentials")
     @patch("cli.docker_credential.output_error")
     def test_get_invalid_format(
         self,
@@ -75,7 +84,7 @@ class TestCmdGet:
         _cmd_get_storage("https://index.docker.io/v1/")
         mock_error.assert_called_once_with("invalid credentials format")
 
-    @patch("cli.docker_credential.check_bw_status")
+    @patch("cli.docker_credential.backend.check_bw_status")
     @patch("cli.docker_credential.output_error")
     def test_get_bitwarden_error(
         self, mock_error: MagicMock, mock_check: MagicMock
@@ -89,19 +98,18 @@ class TestCmdGet:
 class TestCmdStore:
     """Tests for the store command."""
 
-    @patch("cli.docker_credential.check_bw_status")
-    @patch("cli.docker_credential.get_all_credentials")
-    @patch("cli.docker_credential.save_all_credentials")
+    @patch("cli.docker_credential.backend.check_bw_status")
+    @patch("cli.docker_credential.backend.CredentialTransaction")
     @patch("sys.exit")
     def test_store_success(
         self,
         mock_exit: MagicMock,
-        mock_save: MagicMock,
-        mock_get_all: MagicMock,
+        mock_txn_cls: MagicMock,
         mock_check: MagicMock,
     ) -> None:
         """Test successful store command."""
-        mock_get_all.return_value = {}
+        txn = mock_txn_cls.begin.return_value
+        txn.credentials = {}
 
         input_data = {
             "ServerURL": "https://index.docker.io/v1/",
@@ -110,53 +118,55 @@ class TestCmdStore:
         }
         _cmd_store_storage(input_data)
 
-        # Verify save was called with updated credentials
-        mock_save.assert_called_once()
-        saved_creds = mock_save.call_args[0][1]
-        assert saved_creds["https://index.docker.io/v1/"]["Username"] == "testuser"
-        assert saved_creds["https://index.docker.io/v1/"]["Secret"] == "testpass"
+        # Verify the transaction was committed with updated credentials
+        txn.commit.assert_called_once()
+        saved = txn.credentials["https://index.docker.io/v1/"]
+        assert saved == StoredCredential(Username="testuser", Secret="testpass")
         mock_exit.assert_called_once_with(0)
 
     @patch("cli.docker_credential.output_error")
     def test_store_invalid_input(self, mock_error: MagicMock) -> None:
         """Test store with invalid input."""
+        mock_error.side_effect = SystemExit(1)
         input_data = {
             "ServerURL": "https://index.docker.io/v1/",
             # Missing Username and Secret
         }
-        _cmd_store_storage(input_data)
+        with pytest.raises(SystemExit):
+            _cmd_store_storage(input_data)
         mock_error.assert_called_once()
         assert "invalid input" in mock_error.call_args[0][0]
 
-    @patch("cli.docker_credential.check_bw_status")
+    @patch("cli.docker_credential.backend.check_bw_status")
     @patch("cli.docker_credential.output_error")
     def test_store_check_status_error(
         self, mock_error: MagicMock, mock_check: MagicMock
     ) -> None:
         """Test store when Bitwarden status check fails."""
+        mock_error.side_effect = SystemExit(1)
         mock_check.side_effect = BitwardenError("Bitwarden is locked")
         input_data = {
             "ServerURL": "https://index.docker.io/v1/",
             "Username": "testuser",
             "Secret": "testpass",
         }
-        _cmd_store_storage(input_data)
+        with pytest.raises(SystemExit):
+            _cmd_store_storage(input_data)
         mock_error.assert_called_once_with("Bitwarden is locked")
 
-    @patch("cli.docker_credential.check_bw_status")
-    @patch("cli.docker_credential.get_all_credentials")
-    @patch("cli.docker_credential.save_all_credentials")
+    @patch("cli.docker_credential.backend.check_bw_status")
+    @patch("cli.docker_credential.backend.CredentialTransaction")
     @patch("cli.docker_credential.output_error")
     def test_store_save_error(
         self,
         mock_error: MagicMock,
-        mock_save: MagicMock,
-        mock_get_all: MagicMock,
+        mock_txn_cls: MagicMock,
         mock_check: MagicMock,
     ) -> None:
         """Test store when save fails."""
-        mock_get_all.return_value = {}
-        mock_save.side_effect = BitwardenError("Failed to save")
+        txn = mock_txn_cls.begin.return_value
+        txn.credentials = {}
+        txn.commit.side_effect = BitwardenError("Failed to save")
         input_data = {
             "ServerURL": "https://index.docker.io/v1/",
             "Username": "testuser",
@@ -165,88 +175,210 @@ class TestCmdStore:
         _cmd_store_storage(input_data)
         mock_error.assert_called_once_with("Failed to save")
 
+    def test_store_single_fetch(self, fake_bw: FakeBw) -> None:
+        """Test store reads the vault once and writes it once."""
+        fake_bw.reset()
+        for url in ("https://ghcr.io", "https://quay.io"):
+            with pytest.raises(SystemExit):
+                _cmd_store_storage({"ServerURL": url, "Username": "u", "Secret": "s"})
+
+        fake_bw.clear_calls()
+        with pytest.raises(SystemExit):
+            _cmd_store_storage(
+                {"ServerURL": "https://gcr.io", "Username": "u", "Secret": "s"}
+            )
+
+        commands = [call[0] for call in fake_bw.calls]
+        assert commands == ["status", "get", "edit", "sync"]
+        assert set(decode_payload(fake_bw.items[0]["notes"])) == {
+            "https://ghcr.io",
+            "https://quay.io",
+            "https://gcr.io",
+        }
+
+    def test_store_unchanged_skips_write(self, fake_bw: FakeBw) -> None:
+        """Test storing an identical credential does not write the vault."""
+        cred = {"ServerURL": "https://ghcr.io", "Username": "u", "Secret": "s"}
+        fake_bw.reset()
+        with pytest.raises(SystemExit):
+            _cmd_store_storage(cred)
+
+        fake_bw.clear_calls()
+        with pytest.raises(SystemExit) as exc_info:
+            _cmd_store_storage(cred)
+
+        assert exc_info.value.code == 0
+        assert [call[0] for call in fake_bw.calls] == ["status", "get"]
+
 
 class TestCmdErase:
     """Tests for the erase command."""
 
-    @patch("cli.docker_credential.check_bw_status")
-    @patch("cli.docker_credential.get_all_credentials")
+    @patch("cli.docker_credential.backend.check_bw_status")
+    @patch("cli.docker_credential.backend.CredentialTransaction")
     @patch("sys.exit")
     def test_erase_not_exists(
         self,
         mock_exit: MagicMock,
-        mock_get_all: MagicMock,
+        mock_txn_cls: MagicMock,
         mock_check: MagicMock,
     ) -> None:
         """Test erase when credential doesn't exist."""
-        mock_get_all.return_value = {}
-        _cmd_erase_storage("https://index.docker.io/v1/")
+        mock_exit.side_effect = SystemExit(0)
+        txn = mock_txn_cls.begin.return_value
+        txn.credentials = {}
+        with pytest.raises(SystemExit):
+            _cmd_erase_storage("https://index.docker.io/v1/")
         mock_exit.assert_called_once_with(0)
+        txn.commit.assert_not_called()
 
-    @patch("cli.docker_credential.check_bw_status")
-    @patch("cli.docker_credential.get_all_credentials")
-    @patch("cli.docker_credential.save_all_credentials")
+    @patch("cli.docker_credential.backend.check_bw_status")
+    @patch("cli.docker_credential.backend.CredentialTransaction")
     @patch("sys.exit")
     def test_erase_success(
         self,
         mock_exit: MagicMock,
-        mock_save: MagicMock,
-        mock_get_all: MagicMock,
+        mock_txn_cls: MagicMock,
         mock_check: MagicMock,
     ) -> None:
         """Test successful erase command."""
-        mock_get_all.return_value = {
-            "https://index.docker.io/v1/": {
-                "Username": "testuser",
-                "Secret": "testpass",
-            }
+        txn = mock_txn_cls.begin.return_value
+        txn.credentials = {
+            "https://index.docker.io/v1/": StoredCredential(
+                Username="testuser", Secret="testpass"
+            )
         }
         _cmd_erase_storage("https://index.docker.io/v1/")
 
-        # Verify save was called with credential removed
-        mock_save.assert_called_once()
-        saved_creds = mock_save.call_args[0][1]
-        assert "https://index.docker.io/v1/" not in saved_creds
+        # Verify the transaction was committed with the credential removed
+        txn.commit.assert_called_once()
+        assert "https://index.docker.io/v1/" not in txn.credentials
         mock_exit.assert_called_once_with(0)
 
-    @patch("cli.docker_credential.check_bw_status")
+    @patch("cli.docker_credential.backend.check_bw_status")
     @patch("cli.docker_credential.output_error")
     def test_erase_check_status_error(
         self, mock_error: MagicMock, mock_check: MagicMock
     ) -> None:
         """Test erase when Bitwarden status check fails."""
+        mock_error.side_effect = SystemExit(1)
         mock_check.side_effect = BitwardenError("Bitwarden is locked")
-        _cmd_erase_storage("https://index.docker.io/v1/")
+        with pytest.raises(SystemExit):
+            _cmd_erase_storage("https://index.docker.io/v1/")
         mock_error.assert_called_once_with("Bitwarden is locked")
 
-    @patch("cli.docker_credential.check_bw_status")
-    @patch("cli.docker_credential.get_all_credentials")
-    @patch("cli.docker_credential.save_all_credentials")
+    @patch("cli.docker_credential.backend.check_bw_status")
+    @patch("cli.docker_credential.backend.CredentialTransaction")
     @patch("cli.docker_credential.output_error")
     def test_erase_save_error(
         self,
         mock_error: MagicMock,
-        mock_save: MagicMock,
-        mock_get_all: MagicMock,
+        mock_txn_cls: MagicMock,
         mock_check: MagicMock,
     ) -> None:
         """Test erase when save fails."""
-        mock_get_all.return_value = {
-            "https://index.docker.io/v1/": {
-                "Username": "testuser",
-                "Secret": "testpass",
-            }
+        txn = mock_txn_cls.begin.return_value
+        txn.credentials = {
+            "https://index.docker.io/v1/": StoredCredential(
+                Username="testuser", Secret="testpass"
+            )
         }
-        mock_save.side_effect = BitwardenError("Failed to save")
+        txn.commit.side_effect = BitwardenError("Failed to save")
         _cmd_erase_storage("https://index.docker.io/v1/")
         mock_error.assert_called_once_with("Failed to save")
 
 
+class TestCmdBatch:
+    """Tests for the store-batch and erase-batch commands."""
+
+    @staticmethod
+    def _records(*urls: str) -> list[str]:
+        return [
+            json.dumps({"ServerURL": url, "Username": "u", "Secret": "s"}) + "\n"
+            for url in urls
+        ]
+
+    def test_store_batch_single_write(self, fake_bw: FakeBw) -> None:
+        """Test many records are stored with one read and one write."""
+        fake_bw.reset()
+        urls = [f"https://registry-{n}.example.com" for n in range(20)]
+
+        with pytest.raises(SystemExit) as exc_info:
+            _cmd_store_batch_storage([*self._records(*urls), "\n"])
+
+        assert exc_info.value.code == 0
+        assert [call[0] for call in fake_bw.calls] == [
+            "status",
+            "list",
+            "create",
+            "sync",
+        ]
+        assert set(decode_payload(fake_bw.items[0]["notes"])) == set(urls)
+
+    @patch("cli.docker_credential.output_error")
+    def test_store_batch_validates_first(
+        self, mock_error: MagicMock, fake_bw: FakeBw
+    ) -> None:
+        """Test an invalid record rejects the batch before touching the vault."""
+        mock_error.side_effect = SystemExit(1)
+        fake_bw.reset()
+        lines = [
+            *self._records("https://ghcr.io"),
+            '{"ServerURL": "https://quay.io", "Username": ""}\n',
+        ]
+
+        with pytest.raises(SystemExit):
+            _cmd_store_batch_storage(lines)
+
+        assert "line 2" in mock_error.call_args[0][0]
+        assert fake_bw.calls == []
+
+    def test_erase_batch_single_write(self, fake_bw: FakeBw) -> None:
+        """Test several URLs are erased with one read and one write."""
+        fake_bw.reset()
+        with pytest.raises(SystemExit):
+            _cmd_store_batch_storage(
+                self._records("https://ghcr.io", "https://quay.io", "https://gcr.io")
+            )
+        fake_bw.clear_calls()
+
+        with pytest.raises(SystemExit) as exc_info:
+            _cmd_erase_batch_storage(
+                ["https://ghcr.io\n", "https://missing.io\n", "https://gcr.io\n"]
+            )
+
+        assert exc_info.value.code == 0
+        assert [call[0] for call in fake_bw.calls] == ["status", "get", "edit", "sync"]
+        assert set(decode_payload(fake_bw.items[0]["notes"])) == {"https://quay.io"}
+
+    def test_erase_batch_nothing_to_erase(self, fake_bw: FakeBw) -> None:
+        """Test erasing only absent URLs does not write."""
+        fake_bw.reset()
+
+        with pytest.raises(SystemExit) as exc_info:
+            _cmd_erase_batch_storage(["https://ghcr.io\n"])
+
+        assert exc_info.value.code == 0
+        assert [call[0] for call in fake_bw.calls] == ["status", "list"]
+
+    @patch("sys.stdin")
+    @patch("cli.docker_credential._cmd_store_batch_storage")
+    def test_main_store_batch_command(
+        self, mock_cmd: MagicMock, mock_stdin: MagicMock
+    ) -> None:
+        """Test main function with store-batch command."""
+        mock_stdin.readlines.return_value = self._records("https://ghcr.io")
+
+        docker_credential_bw("store-batch")
+
+        mock_cmd.assert_called_once_with(self._records("https://ghcr.io"))
+
+
 class TestCmdList:
     """Tests for the list command."""
 
-    @patch("cli.docker_credential.check_bw_status")
-    @patch("cli.docker_credential.get_all_credentials")
+    @patch("cli.docker_credential.backend.check_bw_status")
+    @patch("cli.docker_credential.backend.get_all_credentials")
     @patch("builtins.print")
     @patch("sys.exit")
     def test_list_success(
@@ -277,8 +409,8 @@ class TestCmdList:
         assert output["https://gcr.io"] == "gcr-user"
         mock_exit.assert_called_once_with(0)
 
-    @patch("cli.docker_credential.check_bw_status")
-    @patch("cli.docker_credential.get_all_credentials")
+    @patch("cli.docker_credential.backend.check_bw_status")
+    @patch("cli.docker_credential.backend.get_all_credentials")
     @patch("builtins.print")
     @patch("sys.exit")
     def test_list_empty(
@@ -296,7 +428,7 @@ class TestCmdList:
         mock_print.assert_called_once_with("{}")
         mock_exit.assert_called_once_with(0)
 
-    @patch("cli.docker_credential.check_bw_status")
+    @patch("cli.docker_credential.backend.check_bw_status")
     @patch("cli.docker_credential.output_error")
     def test_list_check_status_error(
         self, mock_error: MagicMock, mock_check: MagicMock
@@ -371,3 +503,72 @@ class TestMainFunction:
 
         mock_error.assert_called_once()
         assert "Unknown command" in mock_error.call_args[0][0]
+
+
+_UNICODE_ITEM = secure_note(
+    {
+        "https://ghcr.io": {
+            "Username": "j\u00fcrgen",
+            "Secret": "p\u00e4ssw\u00f6rd-\u65e5\u672c\u8a9e-\U0001f433",
+        }
+    },
+    item_id=None,
+)
+_LARGE_ITEM = secure_note(
+    {
+        f"https://registry-{n}.example.com": {
+            "Username": f"user-{n}-\u00f1",
+            "Secret": "s3cr3t-" * 20 + "\U0001f433",
+        }
+        for n in range(2000)
+    },
+    item_id=None,
+)
+
+
+class TestEncodeItem:
+    """Tests for in-process item encoding.
+
+    Expected values are the base64 of the UTF-8 JSON, as ``bw encode`` prints it.
+    """
+
+    def test_unicode_note(self) -> None:
+        """Test a note with non-ASCII characters."""
+        encoded = encode_item(_UNICODE_ITEM)
+
+        # The characters are sent as UTF-8, not as JSON escapes
+        assert "j\u00fcrgen".encode() in base64.b64decode(encoded)
+        assert encoded == (
+            "eyJuYW1lIjogImRvY2tlci1jcmVkZW50aWFscyIsICJ0eXBlIjogMiwgIm5vdGVz"
+            "IjogIntcImh0dHBzOi8vZ2hjci5pb1wiOiB7XCJVc2VybmFtZVwiOiBcImrDvHJn"
+            "ZW5cIiwgXCJTZWNyZXRcIjogXCJww6Rzc3fDtnJkLeaXpeacrOiqni3wn5CzXCJ9"
+            "fSIsICJzZWN1cmVOb3RlIjogeyJ0eXBlIjogMH19\n"
+        )
+
+    def test_large_note(self) -> None:
+        """Test a note holding thousands of registries."""
+        encoded = encode_item(_LARGE_ITEM).encode()
+
+        assert len(encoded) == 623817
+        assert (
+            hashlib.sha256(encoded).hexdigest()
+            == "dfe64267d29fcc29ac8776b7bd502586b0ef4ca0f0cf5bca69f89ca092e2f75a"
+        )
+
+    def test_store_does_not_spawn_encode(self, fake_bw: FakeBw) -> None:
+        """Test the encoded item is accepted by bw without a separate encode."""
+        fake_bw.reset()
+
+        with pytest.raises(SystemExit):
+            _cmd_store_storage(
+                {
+                    "ServerURL": "https://ghcr.io",
+                    "Username": "j\u00fcrgen",
+                    "Secret": "s",
+                }
+            )
+
+        assert ["encode"] not in fake_bw.calls
+        assert decode_payload(fake_bw.items[0]["notes"]) == {
+            "https://ghcr.io": {"Username": "j\u00fcrgen", "Secret": "s"}
+        }
@@ -0,0 +1,128 @@
+"""Tests for the deferred background sync."""
+
+import fcntl
+import time
+from pathlib import Path
+from typing import IO
+from unittest.mock import MagicMock, patch
+
+import pytest
+from conftest import FakeBw
+
+from cli.docker_credential import _cmd_store_storage
+from cli.docker_credential.cache import cache_dir
+from cli.docker_credential.sync import (
+    ENV_DEFER_SYNC,
+    ENV_SYNC_DELAY,
+    request_sync,
+    run_worker,
+)
+
+
+def _pending() -> Path:
+    return cache_dir() / "sync.pending"
+
+
+def _hold_lock() -> IO[bytes]:
+    cache_dir().mkdir(parents=True, exist_ok=True)
+    f = open(cache_dir() / "sync.lock", "ab")  # noqa: SIM115
+    fcntl.flock(f, fcntl.LOCK_EX)
+    return f
+
+
+class TestRequestSync:
+    """Tests for scheduling a sync."""
+
+    @patch("cli.docker_credential.worker.subprocess.Popen")
+    def test_spawns_worker(self, mock_popen: MagicMock) -> None:
+        """Test a worker is started when none is running."""
+        request_sync()
+
+        assert _pending().exists()
+        mock_popen.assert_called_once()
+        assert mock_popen.call_args.kwargs["start_new_session"] is True
+
+    @patch("cli.docker_credential.worker.subprocess.Popen")
+    def test_running_worker_is_reused(self, mock_popen: MagicMock) -> None:
+        """Test no second worker is started while the lock is held."""
+        with _hold_lock():
+            request_sync()
+
+        assert _pending().exists()
+        mock_popen.assert_not_called()
+
+
+class TestRunWorker:
+    """Tests for the background worker."""
+
+    def test_burst_is_coalesced(self) -> None:
+        """Test several pending requests produce one sync."""
+        cache_dir().mkdir(parents=True)
+        for _ in range(3):
+            _pending().touch()
+        sync = MagicMock()
+
+        run_worker(sync, delay=0)
+
+        sync.assert_called_once()
+        assert not _pending().exists()
+
+    def test_write_during_sync_syncs_again(self) -> None:
+        """Test a write arriving while syncing triggers another sync."""
+        cache_dir().mkdir(parents=True)
+        _pending().touch()
+        sync = MagicMock()
+
+        def touch_once() -> None:
+            if sync.call_count == 1:
+                _pending().touch()
+
+        sync.side_effect = touch_once
+        run_worker(sync, delay=0)
+
+        assert sync.call_count == 2
+
+    def test_nothing_pending(self) -> None:
+        """Test the worker exits without syncing when nothing is pending."""
+        sync = MagicMock()
+
+        run_worker(sync, delay=0)
+
+        sync.assert_not_called()
+
+    def test_other_worker_running(self) -> None:
+        """Test a second worker never syncs concurrently."""
+        _pending().parent.mkdir(parents=True)
+        _pending().touch()
+        sync = MagicMock()
+
+        with _hold_lock():
+            run_worker(sync, delay=0)
+
+        sync.assert_not_called()
+
+
+class TestDeferredStore:
+    """Tests for store with deferred sync."""
+
+    def test_store_returns_before_sync(
+        self, fake_bw: FakeBw, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Test store skips bw sync and the worker syncs once for a burst."""
+        monkeypatch.setenv(ENV_DEFER_SYNC, "1")
+        monkeypatch.setenv(ENV_SYNC_DELAY, "1")
+        fake_bw.reset()
+
+        for url in ("https://ghcr.io", "https://quay.io", "https://gcr.io"):
+            with pytest.raises(SystemExit):
+                _cmd_store_storage({"ServerURL": url, "Username": "u", "Secret": "s"})
+
+        assert ["sync"] not in fake_bw.calls
+
+        deadline = time.monotonic() + 20
+        while _pending().exists() or ["sync"] not in fake_bw.calls:
+            assert time.monotonic() < deadline, "background sync did not run"
+            time.sleep(0.1)
+        # Let a straggling worker finish before counting
+        time.sleep(1)
+        assert fake_bw.calls.count(["sync"]) == 1